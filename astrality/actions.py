@@ -20,8 +20,8 @@ which could be imported and accessed independently from other modules.
 import abc
 import logging
 import os
-import shutil
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from tempfile import NamedTemporaryFile
 from typing import (
@@ -29,6 +29,7 @@ from typing import (
     Callable,
     DefaultDict,
     Dict,
+    Iterable,
     List,
     Optional,
     Set,
@@ -39,7 +40,7 @@ from typing import (
 
 from mypy_extensions import TypedDict
 
-from astrality import compiler, utils
+from astrality import compiler, shell, utils
 from astrality.config import expand_path, GlobalModulesConfig
 from astrality.context import Context
 from astrality import executed_actions
@@ -211,6 +212,8 @@ class CompileDict(RequiredCompileDict, total=False):
     target: str
     include: str
     permissions: str
+    stream: bool
+    skip_unchanged: bool
 
 
 class CompileAction(Action):
@@ -220,12 +223,21 @@ class CompileAction(Action):
 
     priority = 400
 
+    # Maximum number of templates rendered concurrently
+    max_workers = min(8, (os.cpu_count() or 1) + 4)
+
     def __init__(self, *args, **kwargs) -> None:
         """Construct compile action object."""
         super().__init__(*args, **kwargs)
         self._performed_compilations: DefaultDict[Path, Set[Path]] = \
             defaultdict(set)
 
+        # Dependencies of the last compilation of each template/target pair
+        self._dependencies: Dict[
+            Tuple[Path, Path],
+            compiler.TemplateDependencies,
+        ] = {}
+
     def execute(self, dry_run: bool = False) -> Dict[Path, Path]:
         """
         Compile template source to target destination.
@@ -254,14 +266,33 @@ class CompileAction(Action):
             )
             return {}
 
-        compile_pairs = utils.resolve_targets(
-            content=template_source,
-            target=target_source,
-            include=self.option(key='include', default=r'(.+)'),
+        return self._execute(
+            pairs=utils.iterate_targets(
+                content=template_source,
+                target=target_source,
+                include=self.option(key='include', default=r'(.+)'),
+            ),
+            dry_run=dry_run,
         )
+
+    def _execute(
+        self,
+        pairs: Iterable[Tuple[Path, Path]],
+        dry_run: bool,
+    ) -> Dict[Path, Path]:
+        """
+        Compile already resolved template/target pairs.
+
+        :param pairs: Iterable of (template file, target file) tuples.
+        :param dry_run: If True, skip and log compilation(s).
+        :return: Dictionary with template content keys and target path values.
+        """
         permissions = self.option(key='permissions')
 
-        for content_file, target_file in compile_pairs.items():
+        compile_pairs: Dict[Path, Path] = {}
+        pending: List[Tuple[Path, Path]] = []
+        for content_file, target_file in pairs:
+            compile_pairs[content_file] = target_file
             if dry_run:
                 logger = logging.getLogger(__name__)
                 logger.info(
@@ -269,18 +300,159 @@ class CompileAction(Action):
                     f'[Compiling] Template: "{content_file}" '
                     f'-> Target: "{target_file}"',
                 )
+            elif self._up_to_date(template=content_file, target=target_file):
+                logger = logging.getLogger(__name__)
+                logger.debug(
+                    f'[Compiling] Template: "{content_file}" unchanged '
+                    f'since last compilation to "{target_file}".',
+                )
             else:
-                compiler.compile_template(
-                    template=content_file,
-                    target=target_file,
+                pending.append((content_file, target_file))
+
+            self._performed_compilations[content_file].add(target_file)
+
+        self._compile(pairs=pending, permissions=permissions)
+        return compile_pairs
+
+    def _compile(
+        self,
+        pairs: List[Tuple[Path, Path]],
+        permissions: Optional[str],
+    ) -> None:
+        """
+        Compile template/target pairs, rendering them concurrently.
+
+        Templates are rendered by a bounded pool of worker threads against a
+        snapshot of the context store, while logging and writing of targets
+        happen in this thread in the same order as `pairs`.
+
+        :param pairs: List of (template, target) tuples to be compiled.
+        :param permissions: Optional permissions given to all targets.
+        """
+        # Context generation before compilation, allowing later checks of
+        # context changes to skip unchanged context values.
+        generation = None
+        if isinstance(self.context_store, Context):
+            generation = self.context_store.generation
+
+        # Streamed templates are written while they are rendered, and are
+        # therefore compiled one at a time.
+        stream = self.option(key='stream', default=False)
+        if stream or len(pairs) <= 1 or self.max_workers <= 1:
+            compile_template = (
+                compiler.stream_template if stream
+                else compiler.compile_template
+            )
+            for template, target in pairs:
+                dependencies = compiler.TemplateDependencies(
+                    generation=generation,
+                )
+                compile_template(
+                    template=template,
+                    target=target,
                     context=self.context_store,
                     shell_command_working_directory=self.directory,
                     permissions=permissions,
+                    dependencies=dependencies,
                 )
+                dependencies.record_target(target)
+                self._dependencies[(template, target)] = dependencies
+            return
 
-            self._performed_compilations[content_file].add(target_file)
+        # Shallow copy, as context imports replace entire top-level sections
+        snapshot = self.context_store.copy()
+        workers = min(self.max_workers, len(pairs))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            renders = []
+            for template, target in pairs:
+                dependencies = compiler.TemplateDependencies(
+                    generation=generation,
+                )
+                future = executor.submit(
+                    compiler.compile_template_to_string,
+                    template=template,
+                    context=snapshot,
+                    shell_command_working_directory=self.directory,
+                    dependencies=dependencies,
+                )
+                renders.append((template, target, dependencies, future))
 
-        return compile_pairs
+            logger = logging.getLogger(__name__)
+            for template, target, dependencies, future in renders:
+                logger.info(
+                    f'[Compiling] Template: "{template}" '
+                    f'-> Target: "{target}"',
+                )
+                compiler.write_compilation(
+                    template=template,
+                    target=target,
+                    result=future.result(),
+                    permissions=permissions,
+                )
+                dependencies.record_target(target)
+                self._dependencies[(template, target)] = dependencies
+
+    def _remove(
+        self,
+        pairs: Iterable[Tuple[Path, Path]],
+        dry_run: bool,
+    ) -> Dict[Path, Path]:
+        """
+        Remove compilation targets of templates which no longer exist.
+
+        Only targets which have been compiled by this action are removed.
+
+        :param pairs: Iterable of (template file, target file) tuples.
+        :param dry_run: If True, skip and log removal(s).
+        :return: Dictionary with template keys and removed target values.
+        """
+        removed: Dict[Path, Path] = {}
+        logger = logging.getLogger(__name__)
+        for template, target in pairs:
+            if target not in self._performed_compilations.get(template, ()):
+                continue
+
+            removed[template] = target
+            log_msg = (
+                f'[compile] Template "{template}" removed. '
+                f'Removing target: "{target}".'
+            )
+            if dry_run:
+                logger.info('SKIPPED: ' + log_msg)
+                continue
+
+            logger.info(log_msg)
+            self._performed_compilations[template].discard(target)
+            if not self._performed_compilations[template]:
+                del self._performed_compilations[template]
+            self._dependencies.pop((template, target), None)
+            if target.exists() or target.is_symlink():
+                target.unlink()
+
+        return removed
+
+    def _up_to_date(self, template: Path, target: Path) -> bool:
+        """
+        Return True if recompilation of template would not change target.
+
+        This is the case if neither the template files, the context values
+        read during the last compilation, nor the target itself have been
+        changed since. Always False if the `skip_unchanged` option is disabled.
+
+        :param template: Path to template.
+        :param target: Path to compilation target.
+        """
+        if not self.option(key='skip_unchanged', default=True):
+            return False
+
+        dependencies = self._dependencies.get((template, target))
+        if dependencies is None:
+            return False
+
+        return dependencies.up_to_date(
+            context=self.context_store,
+            target=target,
+        )
 
     def performed_compilations(self) -> DefaultDict[Path, Set[Path]]:
         """
@@ -313,14 +485,11 @@ class CompileAction(Action):
         return Path(temp_file.name)
 
     def __contains__(self, other) -> bool:
-        """Return True if run action is responsible for template."""
+        """Return True if compile action is responsible for template."""
         assert other.is_absolute()
 
-        if not self.option(key='content', path=True) == other:
-            # This is not a managed template, so we will not recompile
-            return False
-
-        # Return True if the template has been compiled
+        # Templates within content directories are compiled individually, so
+        # we only need to check if the template has been compiled.
         return other in self.performed_compilations()
 
 
@@ -360,17 +529,31 @@ class SymlinkAction(Action):
         if self.null_object:
             return {}
 
-        content = self.option(key='content', path=True)
-        target = self.option(key='target', path=True)
-        include = self.option(key='include', default=r'(.+)')
-        links = utils.resolve_targets(
-            content=content,
-            target=target,
-            include=include,
+        return self._execute(
+            pairs=utils.iterate_targets(
+                content=self.option(key='content', path=True),
+                target=self.option(key='target', path=True),
+                include=self.option(key='include', default=r'(.+)'),
+            ),
+            dry_run=dry_run,
         )
 
+    def _execute(
+        self,
+        pairs: Iterable[Tuple[Path, Path]],
+        dry_run: bool,
+    ) -> Dict[Path, Path]:
+        """
+        Create symlinks for already resolved content/symlink pairs.
+
+        :param pairs: Iterable of (content file, symlink) tuples.
+        :param dry_run: If True, skip and log symlink creation(s).
+        :return: Dictionary with content keys and symlink values.
+        """
+        links: Dict[Path, Path] = {}
         logger = logging.getLogger(__name__)
-        for content, symlink in links.items():
+        for content, symlink in pairs:
+            links[content] = symlink
             self.symlinked_files[content].add(symlink)
             log_msg = f'[symlink] Content "{content}" -> Target: "{symlink}".'
 
@@ -378,18 +561,89 @@ class SymlinkAction(Action):
                 logger.info('SKIPPED: ' + log_msg)
                 continue
 
-            if symlink.resolve() == content:
+            # A single readlink is enough to verify existing symlinks
+            try:
+                destination: Optional[str] = os.readlink(str(symlink))
+                exists = True
+            except FileNotFoundError:
+                destination, exists = None, False
+            except OSError:
+                # Something other than a symlink is located at the path
+                destination, exists = None, True
+
+            if destination == str(content):
+                continue
+            elif exists and \
+                    Path(os.path.realpath(symlink.parent)) / symlink.name \
+                    == content:
+                # The target directory leads back to the content directory
+                continue
+            elif exists and destination is None and not symlink.is_file():
+                logger.error(
+                    f'[symlink] Could not create symlink "{symlink}" to '
+                    f'"{content}". Path exists, and is not a file!',
+                )
                 continue
 
-            if symlink.is_file() and not symlink.is_symlink():
+            logger.info(log_msg)
+            if destination is not None:
+                # Atomically replace symlink pointing elsewhere
+                temp_symlink = symlink.parent \
+                    / f'.{symlink.name}.{os.urandom(4).hex()}.tmp'
+                os.symlink(str(content), str(temp_symlink))
+                os.replace(str(temp_symlink), str(symlink))
+                continue
+            elif exists:
                 symlink.rename(symlink.parent / (str(symlink.name) + '.bak'))
 
-            logger.info(log_msg)
-            symlink.parent.mkdir(parents=True, exist_ok=True)
-            symlink.symlink_to(content)
+            try:
+                os.symlink(str(content), str(symlink))
+            except FileNotFoundError:
+                # Parent directories are only created when found missing,
+                # i.e. once per directory, as files are grouped by directory.
+                symlink.parent.mkdir(parents=True, exist_ok=True)
+                os.symlink(str(content), str(symlink))
 
         return links
 
+    def _remove(
+        self,
+        pairs: Iterable[Tuple[Path, Path]],
+        dry_run: bool,
+    ) -> Dict[Path, Path]:
+        """
+        Remove symlinks pointing to content files which no longer exist.
+
+        Symlinks pointing elsewhere are left untouched.
+
+        :param pairs: Iterable of (content file, symlink) tuples.
+        :param dry_run: If True, skip and log removal(s).
+        :return: Dictionary with content keys and removed symlink values.
+        """
+        removed: Dict[Path, Path] = {}
+        logger = logging.getLogger(__name__)
+        for content, symlink in pairs:
+            if not symlink.is_symlink() \
+                    or Path(os.readlink(symlink)) != content:
+                continue
+
+            removed[content] = symlink
+            log_msg = (
+                f'[symlink] Content "{content}" removed. '
+                f'Removing symlink: "{symlink}".'
+            )
+            if dry_run:
+                logger.info('SKIPPED: ' + log_msg)
+                continue
+
+            logger.info(log_msg)
+            self.symlinked_files[content].discard(symlink)
+            if not self.symlinked_files[content]:
+                del self.symlinked_files[content]
+            symlink.unlink()
+
+        return removed
+
 
 class RequiredCopyDict(TypedDict):
     """Required fields of copy action user config."""
@@ -403,6 +657,8 @@ class CopyDict(RequiredCopyDict, total=False):
 
     include: str
     permissions: str
+    compare: str
+    mode: str
 
 
 class CopyAction(Action):
@@ -410,6 +666,12 @@ class CopyAction(Action):
 
     priority = 300
 
+    # Ways of determining if a copy is already up to date
+    compare_policies = ('mtime+size', 'hash', 'always')
+
+    # Ways of creating copies
+    modes = ('copy', 'reflink', 'hardlink')
+
     _options: CopyDict
 
     def __init__(self, *args, **kwargs) -> None:
@@ -428,46 +690,174 @@ class CopyAction(Action):
         if self.null_object:
             return {}
 
-        content = self.option(key='content', path=True)
-        target = self.option(key='target', path=True)
-        include = self.option(key='include', default=r'(.+)')
+        return self._execute(
+            pairs=utils.iterate_targets(
+                content=self.option(key='content', path=True),
+                target=self.option(key='target', path=True),
+                include=self.option(key='include', default=r'(.+)'),
+            ),
+            dry_run=dry_run,
+        )
+
+    def _execute(
+        self,
+        pairs: Iterable[Tuple[Path, Path]],
+        dry_run: bool,
+    ) -> Dict[Path, Path]:
+        """
+        Copy already resolved content/copy pairs.
+
+        :param pairs: Iterable of (content file, copy) tuples.
+        :param dry_run: If True, skip and log copy creation(s).
+        :return: Dictionary with content keys and copy values.
+        """
         permissions = self.option(key='permissions', default=None)
+        compare = self.option(key='compare', default='mtime+size')
 
-        copies = utils.resolve_targets(
-            content=content,
-            target=target,
-            include=include,
-        )
         logger = logging.getLogger(__name__)
-        for content, copy in copies.items():
+        if compare not in self.compare_policies:
+            logger.error(
+                f'Invalid copy compare parameter: "{compare}". '
+                'Should be one of "mtime+size", "hash", or "always"!',
+            )
+            compare = 'always'
+
+        mode = self.option(key='mode', default='copy')
+        if mode not in self.modes:
+            logger.error(
+                f'Invalid copy mode parameter: "{mode}". '
+                'Should be one of "copy", "reflink", or "hardlink"!',
+            )
+            mode = 'copy'
+        elif mode == 'hardlink' and permissions:
+            # Changing the permissions of a hard link would change the
+            # permissions of the content file as well.
+            logger.error(
+                f'[copy] Can not set "{permissions}" permissions for hard '
+                'links without changing the original files. '
+                'Copying files instead!',
+            )
+            mode = 'copy'
+
+        copies: Dict[Path, Path] = {}
+        for content, copy in pairs:
+            copies[content] = copy
             self.copied_files[content].add(copy)
 
-            log_msg = f'[copy] Content: "{content}" -> Target: "{target}".'
+            log_msg = f'[copy] Content: "{content}" -> Target: "{copy}".'
             if dry_run:
                 logger.info('SKIPPED: ' + log_msg)
                 continue
 
+            # Hard links created without permissions must be replaced by copies
+            if self._up_to_date(content=content, copy=copy, compare=compare) \
+                    and not (permissions and utils.same_file(content, copy)):
+                logger.debug(
+                    f'[copy] Content: "{content}" unchanged '
+                    f'since last copy to "{copy}".',
+                )
+                continue
+
             logger.info(log_msg)
-            copy.parent.mkdir(parents=True, exist_ok=True)
-            shutil.copy(str(content), str(copy))
+            if mode == 'hardlink':
+                utils.atomic_hardlink(content=content, target=copy)
+            else:
+                utils.atomic_copy(
+                    content=content,
+                    target=copy,
+                    reflink=mode == 'reflink',
+                )
 
-        if permissions and not dry_run:
-            for copy in copies.values():
-                result = utils.run_shell(
-                    command=f'chmod {permissions} "{copy}"',
-                    timeout=1,
-                    fallback=False,
+            if compare == 'hash':
+                utils.digest_cache.update(
+                    path=copy,
+                    digest=utils.digest_cache.digest(path=content),
                 )
 
-                if result is False:
+        if compare == 'hash' and not dry_run:
+            utils.digest_cache.write()
+
+        if permissions and not dry_run:
+            for copy in copies.values():
+                try:
+                    utils.chmod(path=copy, permissions=permissions)
+                except (ValueError, OSError) as error:
                     logger = logging.getLogger(__name__)
                     logger.error(
                         f'Could not set "{permissions}" '
-                        f'permissions for copy "{target}"',
+                        f'permissions for copy "{copy}": {error}',
                     )
 
         return copies
 
+    @staticmethod
+    def _up_to_date(content: Path, copy: Path, compare: str) -> bool:
+        """
+        Return True if copy already is identical to its content file.
+
+        :param content: Path to content file.
+        :param copy: Path to copy of content file.
+        :param compare: Either 'mtime+size', comparing file sizes and
+            modification times, 'hash', comparing file sizes and content
+            digests, or 'always', considering copies to always be outdated.
+        """
+        if compare == 'always':
+            return False
+
+        try:
+            content_stat = content.stat()
+            copy_stat = copy.stat()
+        except OSError:
+            return False
+
+        if content_stat.st_size != copy_stat.st_size:
+            return False
+        elif compare == 'hash':
+            return utils.digest_cache.digest(
+                path=content,
+                file_stat=content_stat,
+            ) == utils.digest_cache.digest(path=copy, file_stat=copy_stat)
+        else:
+            return content_stat.st_mtime_ns == copy_stat.st_mtime_ns
+
+    def _remove(
+        self,
+        pairs: Iterable[Tuple[Path, Path]],
+        dry_run: bool,
+    ) -> Dict[Path, Path]:
+        """
+        Remove copies of content files which no longer exist.
+
+        Only files which have been copied by this action are removed.
+
+        :param pairs: Iterable of (content file, copy) tuples.
+        :param dry_run: If True, skip and log removal(s).
+        :return: Dictionary with content keys and removed copy values.
+        """
+        removed: Dict[Path, Path] = {}
+        logger = logging.getLogger(__name__)
+        for content, copy in pairs:
+            if copy not in self.copied_files.get(content, ()):
+                continue
+
+            removed[content] = copy
+            log_msg = (
+                f'[copy] Content "{content}" removed. '
+                f'Removing copy: "{copy}".'
+            )
+            if dry_run:
+                logger.info('SKIPPED: ' + log_msg)
+                continue
+
+            logger.info(log_msg)
+            self.copied_files[content].discard(copy)
+            if not self.copied_files[content]:
+                del self.copied_files[content]
+            if copy.exists() or copy.is_symlink():
+                copy.unlink()
+
+        return removed
+
     def __contains__(self, other) -> bool:
         """Return True if path has been copied *from*."""
         return other in self.copied_files
@@ -486,6 +876,10 @@ class StowDict(RequiredStowDict, total=False):
     templates: str
     non_templates: str
     permissions: str
+    stream: bool
+    skip_unchanged: bool
+    compare: str
+    mode: str
 
 
 class StowAction(Action):
@@ -510,6 +904,11 @@ class StowAction(Action):
         }
         if 'permissions' in self._options:
             compile_options['permissions'] = self._options['permissions']
+        if 'stream' in self._options:
+            compile_options['stream'] = self._options['stream']
+        if 'skip_unchanged' in self._options:
+            compile_options['skip_unchanged'] = \
+                self._options['skip_unchanged']
 
         self.compile_action = CompileAction(
             options=compile_options,
@@ -545,6 +944,10 @@ class StowAction(Action):
             'include': excluded,
             'permissions': self._options.get('permissions'),
         }
+        for copy_option in ('compare', 'mode'):
+            if copy_option in self._options:
+                non_templates_options[copy_option] = \
+                    self._options[copy_option]
 
         # Create action object based on parameter `non_templates`
         NonTemplatesAction: Union[Type[CopyAction], Type[SymlinkAction]]
@@ -572,13 +975,121 @@ class StowAction(Action):
         if self.null_object:
             return {}
 
-        if self.ignore_non_templates:
+        content = self.compile_action.option(key='content', path=True)
+        if self.ignore_non_templates or not content.exists():
+            # Only one walk is required, and compile actions log missing paths
             return self.compile_action.execute(dry_run=dry_run)
-        else:
-            copies_or_links = self.non_templates_action.execute(dry_run=dry_run)
-            compilations = self.compile_action.execute(dry_run=dry_run)
-            compilations.update(copies_or_links)
-            return compilations
+
+        # Walk the content directory once, partitioning files into templates
+        # and non-templates, instead of letting both actions do it separately
+        templates, non_templates = utils.partition_targets(
+            content=content,
+            target=self.compile_action.option(key='target', path=True),
+            includes=(
+                self.compile_action.option(key='include'),
+                self.non_templates_action.option(key='include'),
+            ),
+        )
+        copies_or_links = self.non_templates_action._execute(
+            pairs=non_templates.items(),
+            dry_run=dry_run,
+        )
+        compilations = self.compile_action._execute(
+            pairs=templates.items(),
+            dry_run=dry_run,
+        )
+        compilations.update(copies_or_links)
+        return compilations
+
+    def stow_file(
+        self,
+        content_file: Path,
+        dry_run: bool = False,
+    ) -> Dict[Path, Path]:
+        """
+        Stow single file which has been created within the content directory.
+
+        The rest of the content directory is neither walked nor stowed again.
+
+        :param content_file: Path to new content file.
+        :param dry_run: If True, skip and log copy, symlink, or compilation.
+        :return: Dictionary with source key and target value, empty if the
+            file is not stowed by this action.
+        """
+        if self.null_object or not content_file.is_file():
+            return {}
+
+        templates, non_templates = self._targets(content_file)
+        compilations = self.compile_action._execute(
+            pairs=templates.items(),
+            dry_run=dry_run,
+        )
+        if non_templates:
+            compilations.update(self.non_templates_action._execute(
+                pairs=non_templates.items(),
+                dry_run=dry_run,
+            ))
+        return compilations
+
+    def unstow_file(
+        self,
+        content_file: Path,
+        dry_run: bool = False,
+    ) -> Dict[Path, Path]:
+        """
+        Remove stale target of file deleted from the content directory.
+
+        Only targets created by this action are removed, i.e. compilations,
+        copies, and symlinks pointing to `content_file`.
+
+        :param content_file: Path to deleted content file.
+        :param dry_run: If True, skip and log removal.
+        :return: Dictionary with source key and removed target value.
+        """
+        if self.null_object:
+            return {}
+
+        templates, non_templates = self._targets(content_file)
+        removed = self.compile_action._remove(
+            pairs=templates.items(),
+            dry_run=dry_run,
+        )
+        if non_templates:
+            removed.update(self.non_templates_action._remove(
+                pairs=non_templates.items(),
+                dry_run=dry_run,
+            ))
+        return removed
+
+    def _targets(
+        self,
+        content_file: Path,
+    ) -> Tuple[Dict[Path, Path], Dict[Path, Path]]:
+        """
+        Return template and non-template target of single content file.
+
+        :param content_file: Path to file within the content directory.
+        :return: Two dictionaries, for templates and non-templates
+            respectively, each containing at most `content_file` as key.
+        """
+        content = self.compile_action.option(key='content', path=True)
+        target = self.compile_action.option(key='target', path=True)
+        targets: Tuple[Dict[Path, Path], Dict[Path, Path]] = ({}, {})
+        actions: List[Action] = [self.compile_action]
+        if not self.ignore_non_templates:
+            actions.append(self.non_templates_action)
+
+        for action, partition in zip(actions, targets):
+            target_file = utils.resolve_target(
+                content_file=content_file,
+                content=content,
+                target=target,
+                include=action.option(key='include'),
+            )
+            if target_file:
+                partition[content_file] = target_file
+
+        return targets
 
     def managed_files(self) -> Dict[Path, Set[Path]]:
         """
@@ -641,9 +1152,26 @@ class RunAction(Action):
         :return: 2-tuple containing the executed command and its resulting
             stdout.
         """
+        return self.start(default_timeout=default_timeout, dry_run=dry_run)()
+
+    def start(
+        self,
+        default_timeout: Union[int, float] = 0,
+        dry_run: bool = False,
+        output_log: Optional[shell.OutputLog] = None,
+    ) -> Callable[[], Optional[Tuple[str, str]]]:
+        """
+        Start shell command action, without waiting for it to finish.
+
+        See :meth:`execute` for the other parameters.
+
+        :param output_log: Log which command output is written to, if any.
+        :return: Function which waits for the command to finish, returning the
+            same as :meth:`execute`.
+        """
         if self.null_object:
             # Null objects do nothing
-            return None
+            return lambda: None
 
         command = self.option(key='shell')
         timeout = self.option(key='timeout')
@@ -653,15 +1181,16 @@ class RunAction(Action):
             logger.info(
                 f'SKIPPED: [run] Command: "{command}" (timeout={timeout}).',
             )
-            return command, ''
+            return lambda: (command, '')
 
         logger.info(f'Running command "{command}".')
-        result = utils.run_shell(
+        output = utils.start_shell(
             command=command,
             timeout=timeout or default_timeout,
             working_directory=self.directory,
+            output_log=output_log,
         )
-        return command, result
+        return lambda: (command, output())
 
 
 class TriggerDictRequired(TypedDict):
@@ -870,15 +1399,34 @@ class ActionBlock:
         """
         Run shell commands.
 
+        Commands are executed concurrently if allowed by
+        :func:`astrality.shell.set_max_concurrent_commands`, but the results
+        are always returned in the order of the run actions. Command output
+        is written to the output log of the module, see
+        :func:`astrality.shell.module_output_log`.
+
         :param default_timeout: How long to wait for run commands to exit
         :return: Tuple of 2-tuples containing (shell_command, stdout,)
         """
-        results: Tuple[Tuple[str, str], ...] = tuple()
-        for run_action in self._run_actions:
-            result = run_action.execute(
+        output_log = None
+        if self.module_name:
+            output_log = shell.module_output_log(self.module_name)
+
+        # All commands are started before waiting for any of them, such that
+        # they are executed concurrently if max_concurrent_commands allows it.
+        started = [
+            run_action.start(
                 default_timeout=default_timeout or self.run_timeout,
                 dry_run=dry_run,
+                output_log=output_log,
             )
+            for run_action
+            in self._run_actions
+        ]
+
+        results: Tuple[Tuple[str, str], ...] = tuple()
+        for wait in started:
+            result = wait()
             if result:
                 # Run action is not null object, so we can return results
                 command, stdout = result
@@ -1,39 +1,715 @@
 """Module for compilation of templates."""
 
+import hashlib
 import logging
 import os
 import shutil
+import threading
+import time
+from collections import defaultdict
 from functools import partial
 from pathlib import Path
-from typing import Any, Dict, Optional
+from tempfile import NamedTemporaryFile
+from typing import (
+    Any,
+    Callable,
+    DefaultDict,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
 
 from jinja2 import (
     Environment,
+    FileSystemBytecodeCache,
     FileSystemLoader,
+    Template,
+    TemplateSyntaxError,
     Undefined,
     make_logging_undefined,
+    meta,
 )
+from jinja2.bccache import Bucket
+from jinja2.utils import missing
+
+try:
+    from jinja2 import pass_context
+except ImportError:  # Jinja2 < 3.0
+    from jinja2 import contextfilter as pass_context  # type: ignore
 
 from astrality import utils
-from astrality.context import Context
+from astrality.context import (
+    MISSING,
+    Context,
+    KeyPath,
+    Value,
+    equal_values,
+    lookup,
+    recording_view,
+)
+from astrality.xdg import XDG
 
 ApplicationConfig = Dict[str, Dict[str, Any]]
 logger = logging.getLogger(__name__)
 
+# Process-wide registry of jinja environments, keyed by templates folder and
+# shell command working directory. Reusing environments lets jinja keep its
+# cache of parsed and compiled templates between compilations.
+_environments: Dict[Tuple[Path, Path], Environment] = {}
+_environments_lock = threading.Lock()
+
+# Bytecode caches shared by all jinja environments, keyed by cache directory
+_bytecode_caches: Dict[Path, 'PersistentBytecodeCache'] = {}
+_bytecode_caches_lock = threading.Lock()
+
+# Dependencies of the template currently being rendered by this thread
+_recording = threading.local()
+
+# Stat signature and content digest of compilation targets, as they were after
+# they were last compiled by this process. Keyed by target path, with values
+# (st_mtime_ns, st_size, st_mode, digest).
+_compiled_targets: Dict[Path, Tuple[int, int, int, bytes]] = {}
+
+
+class TemplateDependencies:
+    """
+    Everything a template compilation depended upon.
+
+    Populated during compilation when passed to :func:`compile_template`.
+
+    :ivar context: Dictionary with key path keys and values as read from the
+        context during compilation.
+    :ivar templates: Dictionary with template filename keys, including any
+        included or extended templates, and modification time values.
+    :ivar volatile: True if the compilation result can change independently
+        of the context, for instance when the shell filter has been used.
+    :ivar generation: Context generation before compilation, if known. Used
+        in order to skip comparisons of context values which are unchanged.
+    :ivar target: Modification time and size of the compilation target after
+        it was written, if recorded with :meth:`record_target`.
+    """
+
+    def __init__(self, generation: Optional[int] = None) -> None:
+        """Construct empty template dependencies object."""
+        self.context: Dict[KeyPath, Value] = {}
+        self.templates: Dict[str, int] = {}
+        self.volatile = False
+        self.generation = generation
+        self.target: Optional[Tuple[int, int]] = None
+
+    def record_target(self, target: Path) -> None:
+        """
+        Record modification time and size of written compilation target.
+
+        :param target: Path to compilation target.
+        """
+        try:
+            stat = os.stat(target)
+        except OSError:
+            self.target = None
+        else:
+            self.target = (stat.st_mtime_ns, stat.st_size)
+
+    def up_to_date(
+        self,
+        context: Union[Context, dict],
+        target: Optional[Path] = None,
+    ) -> bool:
+        """
+        Return True if compilation with `context` would give the same result.
+
+        :param context: Context which would be used for a new compilation.
+        :param target: Optional compilation target, which is considered out of
+            date if it has been modified since :meth:`record_target`.
+        """
+        if self.volatile:
+            return False
+
+        if target is not None:
+            try:
+                stat = os.stat(target)
+            except OSError:
+                return False
+            if (stat.st_mtime_ns, stat.st_size) != self.target:
+                return False
+
+        for filename, modified in self.templates.items():
+            try:
+                if os.stat(filename).st_mtime_ns != modified:
+                    return False
+            except OSError:
+                return False
+
+        for path, value in self.context.items():
+            # Lists might have been modified in place, and are always compared
+            if self.generation is not None \
+                    and isinstance(context, Context) \
+                    and not isinstance(value, list) \
+                    and not context.changed_since(path, self.generation):
+                continue
+
+            if not equal_values(lookup(context, path), value):
+                return False
+
+        return True
+
+    def __repr__(self) -> str:
+        """Return string representation of TemplateDependencies object."""
+        return (
+            f'TemplateDependencies(context={list(self.context)}, '
+            f'templates={list(self.templates)}, volatile={self.volatile})'
+        )
+
+
+def _recorded_dependencies() -> Optional[TemplateDependencies]:
+    """Return dependencies being recorded by the current thread, if any."""
+    return getattr(_recording, 'dependencies', None)
+
+
+class TemplateGraph:
+    """
+    Graph of templates referencing other templates.
+
+    References are made with the ``include``, ``extends``, ``import``, and
+    ``from`` jinja tags, and are found when templates are loaded. Finding the
+    references requires parsing the template, which is deferred until the
+    graph is queried.
+    """
+
+    def __init__(self) -> None:
+        """Construct empty template graph."""
+        self._references: Dict[Path, Set[Path]] = {}
+        self._referenced_by: DefaultDict[Path, Set[Path]] = defaultdict(set)
+        self._unresolved: Dict[Path, Callable[[], Set[Path]]] = {}
+        self._lock = threading.Lock()
+
+    def defer(
+        self,
+        template: Path,
+        references: Callable[[], Set[Path]],
+    ) -> None:
+        """
+        Set the templates referenced by a template, once needed.
+
+        :param template: Path to referencing template.
+        :param references: Callable returning the paths to all templates
+            referenced by `template`.
+        """
+        with self._lock:
+            self._unresolved[template] = references
+
+    def update(self, template: Path, references: Set[Path]) -> None:
+        """
+        Set the templates referenced by a template.
+
+        :param template: Path to referencing template.
+        :param references: Paths to all templates referenced by `template`.
+        """
+        with self._lock:
+            for reference in self._references.get(template, set()):
+                self._referenced_by[reference].discard(template)
+
+            self._references[template] = references
+            for reference in references:
+                self._referenced_by[reference].add(template)
+
+    def dependents(self, template: Path) -> Set[Path]:
+        """
+        Return all templates which transitively reference a template.
+
+        :param template: Path to referenced template.
+        :return: Set of template paths, not including `template` itself.
+        """
+        with self._lock:
+            unresolved = self._unresolved
+            self._unresolved = {}
+        for referencing_template, references in unresolved.items():
+            self.update(referencing_template, references())
+
+        dependents: Set[Path] = set()
+        with self._lock:
+            unvisited = [template]
+            while unvisited:
+                for dependent in self._referenced_by.get(unvisited.pop(), ()):
+                    if dependent not in dependents:
+                        dependents.add(dependent)
+                        unvisited.append(dependent)
+
+        dependents.discard(template)
+        return dependents
+
+
+# Process-wide graph of template references
+template_graph = TemplateGraph()
+
+
+class ReferenceRecordingLoader(FileSystemLoader):
+    """
+    File system loader which adds loaded templates to the template graph.
+
+    Templates are only parsed for references when the template graph is
+    queried, so loads served from the bytecode cache stay cheap. Referenced
+    template names are cached by source digest, and templates are only parsed
+    again when their source has changed.
+    """
+
+    # Process-wide cache of referenced template names, keyed by filename
+    _referenced_names: Dict[str, Tuple[bytes, Tuple[str, ...]]] = {}
+    _referenced_names_lock = threading.Lock()
+
+    def get_source(
+        self,
+        environment: Environment,
+        template: str,
+    ) -> Tuple[str, str, Callable[[], bool]]:
+        """Return template source, recording the templates it references."""
+        source, filename, uptodate = super().get_source(environment, template)
+        template_graph.defer(
+            Path(filename),
+            partial(
+                self._references,
+                environment=environment,
+                source=source,
+                filename=filename,
+            ),
+        )
+        return source, filename, uptodate
+
+    def _references(
+        self,
+        environment: Environment,
+        source: str,
+        filename: str,
+    ) -> Set[Path]:
+        """
+        Return paths to templates statically referenced by template source.
+
+        :param environment: Environment used for parsing the source.
+        :param source: Template source.
+        :param filename: Path to template file.
+        :return: Set of referenced template paths.
+        """
+        references = set()
+        for name in self._referenced_template_names(
+            environment=environment,
+            source=source,
+            filename=filename,
+        ):
+            paths = [Path(folder, name) for folder in self.searchpath]
+            references.add(next(
+                (path for path in paths if path.exists()),
+                paths[0],
+            ))
+
+        return references
+
+    def _referenced_template_names(
+        self,
+        environment: Environment,
+        source: str,
+        filename: str,
+    ) -> Tuple[str, ...]:
+        """
+        Return names of templates statically referenced by template source.
+
+        :param environment: Environment used for parsing the source.
+        :param source: Template source.
+        :param filename: Path to template file, used as cache key.
+        :return: Tuple of referenced template names.
+        """
+        digest = hashlib.sha1(source.encode('utf-8', 'surrogatepass')).digest()
+        with self._referenced_names_lock:
+            cached = self._referenced_names.get(filename)
+        if cached and cached[0] == digest:
+            return cached[1]
+
+        try:
+            names = tuple(
+                name
+                for name
+                in meta.find_referenced_templates(environment.parse(source))
+                # Dynamically referenced template names can not be resolved
+                if name is not None
+            )
+        except TemplateSyntaxError:
+            # The error is raised when the template itself is compiled
+            names = ()
+
+        with self._referenced_names_lock:
+            self._referenced_names[filename] = (digest, names)
+        return names
+
+
+class RecordingEnvironment(Environment):
+    """Jinja environment which records loaded templates as dependencies."""
+
+    def get_template(self, *args, **kwargs) -> Template:
+        """Load template, recording it as a dependency."""
+        template = super().get_template(*args, **kwargs)
+        self._record(template)
+        return template
+
+    def select_template(self, *args, **kwargs) -> Template:
+        """Load first existing template, recording it as a dependency."""
+        template = super().select_template(*args, **kwargs)
+        self._record(template)
+        return template
+
+    @staticmethod
+    def _record(template: Template) -> None:
+        """Record template file as a dependency, if recording."""
+        dependencies = _recorded_dependencies()
+        if dependencies is None or not template.filename:
+            return
+
+        try:
+            modified = os.stat(template.filename).st_mtime_ns
+        except OSError:
+            dependencies.volatile = True
+            return
+
+        dependencies.templates[template.filename] = modified
+
+
+class RecordingUndefined(Undefined):
+    """Undefined type which records undefined context variables."""
+
+    __slots__ = ()
+
+    def __init__(self, hint=None, obj=missing, name=None, *args, **kwargs):
+        """Construct undefined object, recording undefined variables."""
+        super().__init__(hint, obj, name, *args, **kwargs)
+
+        dependencies = _recorded_dependencies()
+        if dependencies is not None and obj is missing and name is not None:
+            # Undefined top level variables could be defined later on
+            dependencies.context[(name,)] = MISSING
+
+
+class ShellFilterCache:
+    """
+    Cache of ``shell`` filter results, keyed by command and working directory.
+
+    Only successful command results are cached. The `hits` and `misses`
+    attributes count cache lookups, and can be used for diagnostics.
+
+    :param ttl: Number of seconds results are kept. Caching is disabled if 0,
+        and results are kept for the rest of the run if None.
+    """
+
+    def __init__(self, ttl: Optional[Union[int, float]] = 0) -> None:
+        """Construct empty shell filter cache."""
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._results: Dict[Tuple[str, Path], Tuple[Optional[float], str]] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, ttl: Union[int, float, str]) -> None:
+        """
+        Set time to live of cached results, clearing the cache.
+
+        :param ttl: Seconds, or 'forever' for caching during the entire run.
+        """
+        if ttl == 'forever':
+            self.ttl = None
+        elif isinstance(ttl, (int, float)) and ttl >= 0:
+            self.ttl = ttl
+        else:
+            logger.error(
+                f'Invalid shell_filter_cache_ttl "{ttl}". '
+                'Disabling shell filter cache.',
+            )
+            self.ttl = 0
+
+        self.clear()
+
+    @property
+    def enabled(self) -> bool:
+        """Return True if results are cached."""
+        return self.ttl is None or self.ttl > 0
+
+    def get(self, command: str, working_directory: Path) -> Optional[str]:
+        """Return cached result of command, or None if not cached."""
+        key = (command, working_directory)
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None:
+                expires, result = cached
+                if expires is None or time.monotonic() < expires:
+                    self.hits += 1
+                    return result
+
+                del self._results[key]
+
+            self.misses += 1
+            return None
+
+    def set(self, command: str, working_directory: Path, result: str) -> None:
+        """Cache result of command run from working directory."""
+        if self.ttl is None:
+            expires = None
+        else:
+            expires = time.monotonic() + self.ttl
+
+        with self._lock:
+            self._results[(command, working_directory)] = (expires, result)
+
+    def clear(self) -> None:
+        """Remove all cached results and reset counters."""
+        with self._lock:
+            self._results.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# Process-wide shell filter cache, configured from astrality.yml
+shell_filter_cache = ShellFilterCache()
+
+# Fallback value used in order to detect failing shell commands
+_FAILED = object()
+
+
+def run_shell_filter(
+    context: Any,
+    command: str,
+    timeout: Union[int, float] = 2,
+    fallback: Any = '',
+    cache: bool = True,
+    working_directory: Path = Path.home(),
+    **kwargs,
+) -> str:
+    """
+    Run shell command from a template, see :func:`astrality.utils.run_shell`.
+
+    Templates using this filter are marked as volatile, as the output of shell
+    commands might change between compilations, unless results are cached for
+    the entire run.
+
+    :param context: Jinja context of the template being rendered, unused.
+    :param cache: If False, bypass :data:`shell_filter_cache`.
+    """
+    cache = cache and shell_filter_cache.enabled
+    cached_forever = cache and shell_filter_cache.ttl is None
+    dependencies = _recorded_dependencies()
+    if dependencies is not None and not cached_forever:
+        dependencies.volatile = True
+
+    if cache:
+        result = shell_filter_cache.get(command, working_directory)
+        if result is not None:
+            logger.debug(f'[shell] Using cached result of "{command}".')
+            return result
+
+    result = utils.run_shell(
+        command=command,
+        timeout=timeout,
+        fallback=_FAILED,
+        working_directory=working_directory,
+        **kwargs,
+    )
+    if result is _FAILED:
+        # Failing commands should be retried on the next compilation
+        if dependencies is not None:
+            dependencies.volatile = True
+        return fallback
+
+    if cache:
+        shell_filter_cache.set(command, working_directory, result)
+    return result
+
 
 def jinja_environment(
     templates_folder: Path,
     shell_command_working_directory: Path,
 ) -> Environment:
-    """Return a jinja Environment instance for templates in a folder."""
+    """
+    Return a cached jinja Environment instance for templates in a folder.
+
+    The same environment is returned for repeated calls with identical
+    arguments, until invalidated by :func:`invalidate_jinja_environments`.
+    Templates are still reloaded when modified on disk, as the environments
+    are created with ``auto_reload=True``.
+
+    :param templates_folder: Directory used as jinja template search path.
+    :param shell_command_working_directory: Working directory for the shell
+        filter.
+    :return: Jinja Environment object.
+    """
+    key = (templates_folder, shell_command_working_directory)
+    with _environments_lock:
+        env = _environments.get(key)
+        if env is None:
+            env = create_jinja_environment(
+                templates_folder=templates_folder,
+                shell_command_working_directory=shell_command_working_directory,
+            )
+            _environments[key] = env
+
+    return env
+
+
+def invalidate_jinja_environments(
+    templates_folder: Optional[Path] = None,
+) -> None:
+    """
+    Remove cached jinja environments, and thereby their template caches.
+
+    :param templates_folder: Only invalidate environments for this templates
+        folder. If not given, all cached environments are invalidated.
+    """
+    with _environments_lock:
+        if templates_folder is None:
+            _environments.clear()
+            return
+
+        for key in list(_environments.keys()):
+            if key[0] == templates_folder:
+                del _environments[key]
+
+
+class PersistentBytecodeCache(FileSystemBytecodeCache):
+    """
+    Jinja bytecode cache persisted to disk, with a cap on total size.
+
+    Cache entries are keyed by template name and path, and jinja discards
+    entries with a source checksum which does not match the current template.
+    Entries are written to temporary files which are atomically renamed into
+    place, so several processes can safely share the same cache directory.
+
+    :param directory: Directory where cache entries are stored.
+    :param max_size: Maximum total size of cache entries, given in bytes.
+        The least recently written entries are removed when exceeded.
+
+    The cache directory is only scanned on the first write, and thereafter
+    when the size of the entries written since exceeds `max_size`.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        max_size: int = 32 * 1024 * 1024,
+    ) -> None:
+        """Construct persistent bytecode cache object."""
+        super().__init__(directory=str(directory), pattern='%s.cache')
+        self.max_size = max_size
+
+        # Total size of cache entries, as of the last scan of the directory
+        # plus the size of entries written since. Overwritten entries are
+        # counted twice, which only makes the next scan happen earlier.
+        self._size: Optional[int] = None
+        self._size_lock = threading.Lock()
+
+    def load_bytecode(self, bucket: Bucket) -> None:
+        """Load bytecode of bucket from disk, if present."""
+        filename = self._get_cache_filename(bucket)
+        try:
+            with open(filename, 'rb') as cache_file:
+                bucket.load_bytecode(cache_file)
+        except (OSError, EOFError, ValueError):
+            # Missing, concurrently pruned, or otherwise unreadable entries
+            # are treated as cache misses.
+            bucket.reset()
+
+    def dump_bytecode(self, bucket: Bucket) -> None:
+        """Atomically persist bytecode of bucket to disk."""
+        filename = self._get_cache_filename(bucket)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with NamedTemporaryFile(
+                mode='wb',
+                dir=self.directory,
+                prefix=os.path.basename(filename),
+                suffix='.tmp',
+                delete=False,
+            ) as temp_file:
+                bucket.write_bytecode(temp_file)
+                size = temp_file.tell()
+            os.replace(temp_file.name, filename)
+        except OSError as error:
+            logger.debug(f'Could not persist template bytecode: {error}')
+            try:
+                os.remove(temp_file.name)
+            except (OSError, UnboundLocalError):
+                pass
+            return
+
+        with self._size_lock:
+            if self._size is not None:
+                self._size += size
+                if self._size <= self.max_size:
+                    return
+
+        self.prune()
+
+    def prune(self) -> None:
+        """Remove the oldest cache entries until below the size cap."""
+        entries = []
+        total_size = 0
+        try:
+            with os.scandir(self.directory) as directory:
+                for entry in directory:
+                    if not entry.name.endswith('.cache'):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+                    total_size += stat.st_size
+        except OSError:
+            return
+
+        if total_size > self.max_size:
+            for _, size, path in sorted(entries):
+                try:
+                    os.remove(path)
+                except OSError:
+                    # Another process might have pruned this entry already
+                    pass
+
+                total_size -= size
+                if total_size <= self.max_size:
+                    break
+
+        with self._size_lock:
+            self._size = total_size
+
+
+def bytecode_cache() -> PersistentBytecodeCache:
+    """
+    Return bytecode cache persisted in $XDG_DATA_HOME/astrality.
+
+    All environments share the same cache object, and therefore the same
+    bookkeeping of the total cache size.
+    """
+    xdg = XDG('astrality')
+    directory = xdg.data_directory('bytecode')
+    with _bytecode_caches_lock:
+        if directory not in _bytecode_caches:
+            _bytecode_caches[directory] = PersistentBytecodeCache(
+                directory=directory,
+            )
+        return _bytecode_caches[directory]
+
+
+def create_jinja_environment(
+    templates_folder: Path,
+    shell_command_working_directory: Path,
+) -> Environment:
+    """Return a new jinja Environment instance for templates in a folder."""
     logger = logging.getLogger(__name__)
     LoggingUndefined = make_logging_undefined(
         logger=logger,
-        base=Undefined,
+        base=RecordingUndefined,
     )
 
-    env = Environment(
-        loader=FileSystemLoader(
+    env = RecordingEnvironment(
+        loader=ReferenceRecordingLoader(
             str(templates_folder),
             followlinks=True,
         ),
@@ -42,18 +718,21 @@ def jinja_environment(
         optimized=True,
         finalize=finalize_variable_expression,
         undefined=LoggingUndefined,
+        bytecode_cache=bytecode_cache(),
     )
 
     # Add env context containing all environment variables
     env.globals['env'] = os.environ
 
-    # Add run shell command filter
+    # Add run shell command filter. It is marked as a context filter in order
+    # to prevent jinja from evaluating constant shell commands only once, when
+    # the template itself is compiled.
     run_shell_from_working_directory = partial(
-        utils.run_shell,
+        run_shell_filter,
         working_directory=shell_command_working_directory,
         log_success=False,
     )
-    env.filters['shell'] = run_shell_from_working_directory
+    env.filters['shell'] = pass_context(run_shell_from_working_directory)
 
     return env
 
@@ -70,12 +749,82 @@ def compile_template_to_string(
     template: Path,
     context: Context,
     shell_command_working_directory: Optional[Path] = None,
+    dependencies: Optional[TemplateDependencies] = None,
 ) -> str:
     """
     Return the compiled template string.
 
     Context placeholder replacements given by `context`, and shell filters
     run with working directory ``shell_command_working_directory``.
+
+    If `dependencies` is provided, it is populated with the context key paths
+    read and templates loaded during compilation.
+    """
+    if not shell_command_working_directory:
+        shell_command_working_directory = template.parent
+
+    env = jinja_environment(
+        templates_folder=template.parent,
+        shell_command_working_directory=shell_command_working_directory,
+    )
+
+    if dependencies is None:
+        jinja_template = env.get_template(name=template.name)
+        return jinja_template.render(context)
+
+    _recording.dependencies = dependencies
+    try:
+        jinja_template = env.get_template(name=template.name)
+        return jinja_template.render(
+            recording_view(context=context, reads=dependencies.context),
+        )
+    finally:
+        _recording.dependencies = None
+
+
+def compile_source_to_string(
+    source: str,
+    templates_folder: Path,
+    context: Context,
+    shell_command_working_directory: Optional[Path] = None,
+    dependencies: Optional[TemplateDependencies] = None,
+) -> str:
+    """
+    Return the compiled template string of template source code.
+
+    Templates referenced by `source` are loaded from ``templates_folder``.
+    See :func:`compile_template_to_string` for the other arguments.
+    """
+    if not shell_command_working_directory:
+        shell_command_working_directory = templates_folder
+
+    env = jinja_environment(
+        templates_folder=templates_folder,
+        shell_command_working_directory=shell_command_working_directory,
+    )
+
+    if dependencies is None:
+        return env.from_string(source).render(context)
+
+    _recording.dependencies = dependencies
+    try:
+        return env.from_string(source).render(
+            recording_view(context=context, reads=dependencies.context),
+        )
+    finally:
+        _recording.dependencies = None
+
+
+def generate_template(
+    template: Path,
+    context: Context,
+    shell_command_working_directory: Optional[Path] = None,
+    dependencies: Optional[TemplateDependencies] = None,
+) -> Iterator[str]:
+    """
+    Yield the compiled template in chunks as it is rendered.
+
+    See :func:`compile_template_to_string` for the meaning of the arguments.
     """
     if not shell_command_working_directory:
         shell_command_working_directory = template.parent
@@ -84,9 +833,20 @@ def compile_template_to_string(
         templates_folder=template.parent,
         shell_command_working_directory=shell_command_working_directory,
     )
-    jinja_template = env.get_template(name=template.name)
 
-    return jinja_template.render(context)
+    if dependencies is None:
+        jinja_template = env.get_template(name=template.name)
+        yield from jinja_template.generate(context)
+        return
+
+    _recording.dependencies = dependencies
+    try:
+        jinja_template = env.get_template(name=template.name)
+        yield from jinja_template.generate(
+            recording_view(context=context, reads=dependencies.context),
+        )
+    finally:
+        _recording.dependencies = None
 
 
 def compile_template(
@@ -95,6 +855,8 @@ def compile_template(
     context: Context,
     shell_command_working_directory: Path,
     permissions: Optional[str] = None,
+    dependencies: Optional[TemplateDependencies] = None,
+    skip_unchanged: bool = True,
 ) -> None:
     """
     Compile template to target destination with specific context.
@@ -103,6 +865,13 @@ def compile_template(
     accordingly.
     permissions='755' -> chmod 755
     permissions='u+x' -> chmod u+x
+
+    If `dependencies` is provided, it is populated with everything the
+    compilation depended upon, see :class:`TemplateDependencies`.
+
+    If `skip_unchanged` is True, the target is not rewritten when it already
+    contains the compilation result. This prevents programs watching the
+    target from needlessly reloading.
     """
     logger.info(f'[Compiling] Template: "{template}" -> Target: "{target}"')
 
@@ -110,25 +879,212 @@ def compile_template(
         template=template,
         context=context,
         shell_command_working_directory=shell_command_working_directory,
+        dependencies=dependencies,
+    )
+    write_compilation(
+        template=template,
+        target=target,
+        result=result,
+        permissions=permissions,
+        skip_unchanged=skip_unchanged,
     )
 
-    # Create parent directories if they do not exist
-    os.makedirs(target.parent, exist_ok=True)
 
-    with open(target, 'w') as target_file:
-        target_file.write(result)
+def write_compilation(
+    template: Path,
+    target: Path,
+    result: str,
+    permissions: Optional[str] = None,
+    skip_unchanged: bool = True,
+) -> None:
+    """
+    Write already compiled template to target destination.
 
-    # Copy template's file permissions to compiled target file
-    shutil.copymode(template, target)
+    This is the second half of :func:`compile_template`, allowing templates to
+    be rendered elsewhere, for instance in a worker thread.
 
-    if permissions:
-        result = utils.run_shell(
-            command=f'chmod {permissions} {target}',
-            timeout=0,
-            fallback=False,
-        )
+    :param template: Path to template which `result` was compiled from.
+    :param target: Path to compilation target.
+    :param result: Compiled template content.
+    :param permissions: Optional permissions given to target, see
+        :func:`compile_template`.
+    :param skip_unchanged: If True, do not rewrite identical targets.
+    """
+    content = result.encode('utf-8')
+    digest = hashlib.sha256(content).digest()
+
+    unchanged = skip_unchanged and _unchanged_target(
+        target=target,
+        size=len(content),
+        digest=digest,
+    )
+    if not unchanged:
+        # Write to temporary file, with the template's file permissions,
+        # which then replaces the target.
+        with utils.atomic_write(
+            path=target,
+            mode='wb',
+            permissions_from=template,
+        ) as target_file:
+            target_file.write(content)
+
+    _finish_compilation(
+        template=template,
+        target=target,
+        digest=digest,
+        permissions=permissions,
+        unchanged=unchanged,
+    )
+
+
+class _UnchangedTarget(Exception):
+    """Raised in order to discard a streamed compilation identical to target."""
+
+
+def stream_template(
+    template: Path,
+    target: Path,
+    context: Context,
+    shell_command_working_directory: Path,
+    permissions: Optional[str] = None,
+    dependencies: Optional[TemplateDependencies] = None,
+    skip_unchanged: bool = True,
+    buffer_size: int = 2 ** 16,
+) -> None:
+    """
+    Compile template to target destination without keeping the entire result.
+
+    Rendered template chunks are written to a temporary file as they are
+    generated, only buffering `buffer_size` characters at a time. The
+    temporary file atomically replaces the target when the compilation is
+    finished. Otherwise equivalent to :func:`compile_template`.
+    """
+    logger.info(f'[Compiling] Template: "{template}" -> Target: "{target}"')
+
+    chunks = generate_template(
+        template=template,
+        context=context,
+        shell_command_working_directory=shell_command_working_directory,
+        dependencies=dependencies,
+    )
+    digest = hashlib.sha256()
+    size = 0
+
+    def write(buffer: List[str]) -> None:
+        nonlocal size
+        content = ''.join(buffer).encode('utf-8')
+        digest.update(content)
+        size += len(content)
+        target_file.write(content)
+        buffer.clear()
+
+    try:
+        with utils.atomic_write(
+            path=target,
+            mode='wb',
+            permissions_from=template,
+        ) as target_file:
+            buffer: List[str] = []
+            buffered = 0
+            for chunk in chunks:
+                buffer.append(chunk)
+                buffered += len(chunk)
+                if buffered >= buffer_size:
+                    write(buffer)
+                    buffered = 0
+            write(buffer)
+
+            if skip_unchanged and _unchanged_target(
+                target=target,
+                size=size,
+                digest=digest.digest(),
+            ):
+                raise _UnchangedTarget
+        unchanged = False
+    except _UnchangedTarget:
+        unchanged = True
+
+    _finish_compilation(
+        template=template,
+        target=target,
+        digest=digest.digest(),
+        permissions=permissions,
+        unchanged=unchanged,
+    )
+
+
+def _finish_compilation(
+    template: Path,
+    target: Path,
+    digest: bytes,
+    permissions: Optional[str],
+    unchanged: bool,
+) -> None:
+    """Set permissions of compilation target and remember its content."""
+    if unchanged:
+        if _compiled_targets.get(target) == _stat_signature(target, digest):
+            logger.debug(f'[Compiling] Target "{target}" already up to date.')
+            return
 
-        if result is False:
+        # Copy template's file permissions to compiled target file
+        shutil.copymode(template, target)
+
+    if permissions:
+        try:
+            utils.chmod(path=target, permissions=permissions)
+        except (ValueError, OSError) as error:
             logger.error(
-                f'Could not set "{permissions}" permissions for "{target}"',
+                f'Could not set "{permissions}" permissions for "{target}": '
+                f'{error}',
             )
+
+    signature = _stat_signature(target, digest)
+    if signature:
+        _compiled_targets[target] = signature
+
+
+def _stat_signature(
+    target: Path,
+    digest: bytes,
+) -> Optional[Tuple[int, int, int, bytes]]:
+    """Return stat signature of target with content digest appended."""
+    try:
+        stat = os.stat(target)
+    except OSError:
+        return None
+
+    return (stat.st_mtime_ns, stat.st_size, stat.st_mode, digest)
+
+
+def _unchanged_target(target: Path, size: int, digest: bytes) -> bool:
+    """
+    Return True if target file already contains the compilation result.
+
+    The target is only read if it has been modified since this process last
+    compiled it, otherwise the stored content digest is compared instead.
+
+    :param target: Path to compilation target.
+    :param size: Size in bytes of the new compilation result.
+    :param digest: SHA-256 digest of the new compilation result.
+    """
+    try:
+        stat = os.stat(target)
+    except OSError:
+        return False
+
+    if stat.st_size != size:
+        return False
+
+    compiled = _compiled_targets.get(target)
+    if compiled and compiled[:2] == (stat.st_mtime_ns, stat.st_size):
+        return compiled[3] == digest
+
+    target_digest = hashlib.sha256()
+    try:
+        with open(target, 'rb') as target_file:
+            for block in iter(partial(target_file.read, 2 ** 16), b''):
+                target_digest.update(block)
+    except OSError:
+        return False
+
+    return target_digest.digest() == digest
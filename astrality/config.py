@@ -66,6 +66,9 @@ class GlobalAstralityConfigDict(TypedDict, total=False):
 
     hot_reload_config: bool
     startup_delay: Union[int, float]
+    shell_filter_cache_ttl: Union[int, float, str]
+    persistent_shell: bool
+    max_concurrent_commands: int
 
 
 class AstralityYAMLConfigDict(TypedDict, total=False):
@@ -79,6 +82,9 @@ ASTRALITY_DEFAULT_GLOBAL_SETTINGS: AstralityYAMLConfigDict = {
     'astrality': {
         'hot_reload_config': False,
         'startup_delay': 0,
+        'shell_filter_cache_ttl': 0,
+        'persistent_shell': False,
+        'max_concurrent_commands': 1,
     },
     'modules': {
         'requires_timeout': 1,
@@ -1,17 +1,25 @@
 """Module defining Context class for templating context handling."""
 
+import copy
+import itertools
+import threading
+from collections import deque
 from math import inf
 from numbers import Number
 from pathlib import Path
 import logging
 from typing import (
     Any,
+    Deque,
     Dict,
     ItemsView,
     Iterable,
+    Iterator,
     KeysView,
     ValuesView,
     Optional,
+    Set,
+    Tuple,
     Union,
 )
 
@@ -20,8 +28,25 @@ from astrality import utils
 
 Real = Union[int, float]
 Key = Union[str, Real]
+KeyPath = Tuple[Key, ...]
 Value = Any
 
+# Placeholder for key paths which are not present in a context
+MISSING = object()
+
+# Generations are shared by all contexts, such that they can be compared
+_generations = itertools.count(1)
+_generation = 0
+_generation_lock = threading.Lock()
+
+
+def _next_generation() -> int:
+    """Return new generation, greater than all earlier generations."""
+    global _generation
+    with _generation_lock:
+        _generation = next(_generations)
+        return _generation
+
 
 class Context:
     """
@@ -37,10 +62,31 @@ class Context:
     >>> 'BACBEB'
     replacements['colors'][3]
     >>> 'BACBEB'
+
+    Copies share their underlying dictionary until either of them is modified,
+    making copying cheap regardless of the size of the context.
+
+    Each change of a key is given a new, monotonically increasing, generation
+    and recorded in a change journal. See :meth:`changed_since` and
+    :meth:`changes_since`.
     """
 
+    __slots__ = (
+        '_dict',
+        '_max_key',
+        '_fallback',
+        '_generations',
+        '_latest',
+        '_journal',
+        '_journal_floor',
+        '_shared',
+    )
+
     _dict: Dict[Key, Value]
 
+    # Maximum number of changes kept in the change journal
+    journal_size = 1024
+
     def __init__(
         self,
         content: Optional[Union['Context', dict, Path]] = None,
@@ -55,7 +101,27 @@ class Context:
         self._dict = {}
         self._max_key: Real = float(-inf)
 
-        if isinstance(content, (dict, Context,)):
+        # Value returned for missing integer keys, i.e. the value of the
+        # greatest integer key, kept up to date by __setitem__.
+        self._fallback: Value = MISSING
+
+        # Generation of the last change of each key, and of this context
+        self._generations: Dict[Key, int] = {}
+        self._latest = 0
+
+        # Journal of (generation, key path) changes, and the latest generation
+        # which has been discarded from it. The journal is only allocated when
+        # first used, as most nested contexts never use it. Until then, the
+        # changes are given by the generations of each key.
+        self._journal: Optional[Deque[Tuple[int, KeyPath]]] = None
+        self._journal_floor = 0
+
+        # True if `_dict` might be shared with copies of this context
+        self._shared = False
+
+        if isinstance(content, Context):
+            content._share_with(self)
+        elif isinstance(content, dict):
             self.update(content)
         elif isinstance(content, Path):
             if content.is_file():
@@ -65,11 +131,6 @@ class Context:
         elif content is not None:
             raise ValueError('Context initialized with wrong argument type.')
 
-        # Determine the greatest number index inserted
-        for key in self._dict.keys():
-            if isinstance(key, Number):
-                self._max_key = max(key, self._max_key)
-
     def import_context(
         self,
         from_path: Path,
@@ -84,30 +145,32 @@ class Context:
         :param from_section: If given, only import specific section from path.
         :param to_section: If given, rename from_section to to_section.
         """
-        new_context = utils.compile_yaml(
-            path=from_path,
-            context=self,
-        )
-
         logger = logging.getLogger(__name__)
         if from_section is None and to_section is None:
             logger.info(
                 f'[import_context] All sections from "{from_path}".',
             )
-            self.update(new_context)
-        elif from_section and to_section:
+            self.update(utils.compile_yaml(path=from_path, context=self))
+            return
+
+        assert from_section
+        section = utils.compile_yaml_section(
+            path=from_path,
+            section=from_section,
+            context=self,
+        )
+        if to_section:
             logger.info(
                 f'[import_context] Section "{from_section}" from "{from_path}" '
                 f'into section "{to_section}".',
             )
-            self[to_section] = new_context[from_section]
+            self[to_section] = section
         else:
-            assert from_section
             logger.info(
                 f'[import_context] Section "{from_section}" '
                 f'from "{from_path}" ',
             )
-            self[from_section] = new_context[from_section]
+            self[from_section] = section
 
     def __eq__(self, other) -> bool:
         """Check if content is identical to other Context or dictionary."""
@@ -122,14 +185,35 @@ class Context:
 
     def __setitem__(self, key: Key, value: Value) -> None:
         """Insert `value` into the `key` index."""
-        if isinstance(key, Number):
-            self._max_key = max(key, self._max_key)
+        if self._shared:
+            # Copy on write, leaving the shared dictionary intact
+            self._dict = self._dict.copy()
+            self._generations = self._generations.copy()
+            if self._journal is not None:
+                self._journal = self._journal.copy()
+            self._shared = False
 
         if isinstance(value, dict):
             # Insterted dictionaries are cast to Context instances
-            self._dict[key] = Context(value)
-        else:
-            self._dict[key] = value
+            value = Context(value)
+
+        if isinstance(key, Number):
+            if key >= self._max_key:
+                self._max_key = key
+                self._fallback = value
+
+        old_value = self._dict.get(key, MISSING)
+        self._dict[key] = value
+        if old_value is value or equal_values(old_value, value):
+            return
+
+        generation = _next_generation()
+        self._generations[key] = generation
+        self._latest = generation
+        if self._journal is not None:
+            if len(self._journal) == self._journal.maxlen:
+                self._journal_floor = self._journal[0][0]
+            self._journal.append((generation, (key,)))
 
     def __getitem__(self, key: Key) -> Value:
         """
@@ -143,26 +227,29 @@ class Context:
             # Return excact hit if present
             return self._dict[key]
         except KeyError:
-            # The key is not present. See if we can resolve the use of another
-            # one through integer key priority.
-            if self._max_key > -inf:
-                # Another integer key has been inserted earlier
-                if isinstance(key, Number):
-                    # We can return the max integer key previously inserted
-                    return self._dict[self._max_key]
-                else:
-                    # Throwing any other ValueErrors just in case
-                    raise
-            else:
-                raise KeyError(f'Integer index "{key}" is non-existent and had '
-                               'no lower index to be substituted for')
+            pass
+
+        # The key is not present. See if we can resolve the use of another
+        # one through integer key priority.
+        if self._fallback is MISSING:
+            raise KeyError(f'Integer index "{key}" is non-existent and had '
+                           'no lower index to be substituted for')
+
+        if isinstance(key, Number):
+            # We can return the max integer key previously inserted
+            return self._fallback
+        raise KeyError(key)
 
     def get(self, key: Key, defualt=None) -> Value:
         """Get value from index with fallback value `default`."""
-        try:
-            return self.__getitem__(key)
-        except KeyError:
-            return defualt
+        value = self._dict.get(key, MISSING)
+        if value is not MISSING:
+            return value
+
+        if self._fallback is not MISSING \
+                and isinstance(key, Number):
+            return self._fallback
+        return defualt
 
     def __iter__(self) -> Iterable[Value]:
         """Return iterable of Context object."""
@@ -202,11 +289,286 @@ class Context:
             self.__setitem__(key, value)
 
     def copy(self) -> 'Context':
-        """Return shallow copy of context."""
-        return Context(self._dict.copy())
+        """
+        Return shallow copy of context.
+
+        The copy is made in constant time, as the underlying dictionary is
+        only copied when either context is modified.
+        """
+        copy = Context()
+        self._share_with(copy)
+        return copy
+
+    def _share_with(self, other: 'Context') -> None:
+        """Let other context share the content of this context."""
+        other._dict = self._dict
+        other._max_key = self._max_key
+        other._fallback = self._fallback
+        other._generations = self._generations
+        other._latest = self._latest
+        other._journal = self._journal
+        other._journal_floor = self._journal_floor
+        other._shared = True
+        self._shared = True
+
+    @property
+    def generation(self) -> int:
+        """
+        Return the current generation.
+
+        All changes made to any context afterwards have greater generations.
+        """
+        return _generation
+
+    def changes_since(self, generation: int) -> Optional[Set[KeyPath]]:
+        """
+        Return key paths changed since generation.
+
+        Only changes of keys of this context are returned, not changes made
+        directly to nested contexts, see :meth:`changed_since`.
+
+        :param generation: Generation, as given by :attr:`generation`.
+        :return: Set of changed key paths, or None if the changes are no longer
+            kept in the change journal.
+        """
+        if self._journal is None:
+            self._start_journal()
+
+        if generation < self._journal_floor:
+            return None
+
+        return {
+            path
+            for change_generation, path
+            in self._journal  # type: ignore
+            if change_generation > generation
+        }
+
+    def _start_journal(self) -> None:
+        """Allocate change journal, containing the latest change of each key."""
+        changes = sorted(
+            (generation, (key,))
+            for key, generation
+            in self._generations.items()
+        )
+        discarded = changes[:-self.journal_size]
+        if discarded:
+            self._journal_floor = discarded[-1][0]
+        self._journal = deque(
+            changes[-self.journal_size:],
+            maxlen=self.journal_size,
+        )
+
+    def changed_since(self, path: KeyPath, generation: int) -> bool:
+        """
+        Return True if value at key path might have changed since generation.
+
+        Changes made directly to nested contexts are taken into account, but
+        not in-place modifications of other mutable values, such as lists.
+
+        :param path: Tuple of keys, one for each level of nested contexts.
+        :param generation: Generation, as given by :attr:`generation`.
+        """
+        node: Value = self
+        for key in path:
+            if not isinstance(node, Context):
+                # Changes can not be tracked beyond context values
+                return True
+
+            if key not in node._dict:
+                if not isinstance(key, Number) or node._max_key == -inf:
+                    # Still missing, and missing keys are never removed
+                    return False
+
+                # Integer index resolution
+                key = node._max_key
+
+            if node._generations.get(key, 0) > generation:
+                return True
+            node = node._dict[key]
+
+        if isinstance(node, Context):
+            return node._modified_since(generation)
+        return False
+
+    def _modified_since(self, generation: int) -> bool:
+        """Return True if this context or nested contexts have changed."""
+        if self._latest > generation:
+            return True
+
+        return any(
+            value._modified_since(generation)
+            for value
+            in self._dict.values()
+            if isinstance(value, Context)
+        )
 
     def reverse_update(self, other: Union['Context', dict]) -> None:
         """Update context while preserving conflicting keys."""
-        other_copy = other.copy()
-        other_copy.update(self._dict)
-        self.update(other_copy)
+        for key, value in other.items():
+            if key not in self._dict:
+                self.__setitem__(key, value)
+
+
+class RecordingContext:
+    """
+    Read-only view of a context which records the values read through it.
+
+    Nested contexts are returned as new recording views, such that only the
+    key paths actually read are recorded. Any use of the context as a whole,
+    such as iteration or string conversion, records a copy of the entire
+    (sub)context instead.
+
+    :param context: Context, or dictionary, to be viewed.
+    :param reads: Dictionary which is populated with read key paths as keys
+        and read values as values. Non-existent key paths are recorded with
+        :data:`MISSING` as value.
+    :param path: Key path of `context` relative to the root context.
+    """
+
+    def __init__(
+        self,
+        context: Union[Context, dict],
+        reads: Dict[KeyPath, Value],
+        path: KeyPath = (),
+    ) -> None:
+        """Construct recording context view."""
+        self._context = context
+        self._reads = reads
+        self._path = path
+
+    def __getitem__(self, key: Key) -> Value:
+        """Return value of `key`, recording the read key path."""
+        path = self._path + (key,)
+        try:
+            value = self._context[key]
+        except KeyError:
+            self._reads[path] = MISSING
+            raise
+
+        if isinstance(value, (Context, dict)):
+            return RecordingContext(
+                context=value,
+                reads=self._reads,
+                path=path,
+            )
+
+        if isinstance(value, list):
+            # Lists might be mutated in-place, so we record a copy
+            self._reads[path] = copy.deepcopy(value)
+        else:
+            self._reads[path] = value
+        return value
+
+    def _read_all(self) -> None:
+        """Record that the entire viewed context has been read."""
+        if self._reads.get(self._path, MISSING) is MISSING:
+            self._reads[self._path] = copy.deepcopy(self._context)
+
+    def __getattr__(self, name: str) -> Any:
+        """Return attribute, such as items(), of the viewed context."""
+        if not hasattr(type(self._context), name):
+            # Jinja tries attribute access before item access, so we should
+            # not record anything here.
+            raise AttributeError(name)
+
+        self._read_all()
+        return getattr(self._context, name)
+
+    def __iter__(self) -> Iterator[Key]:
+        """Return iterator of the viewed context keys."""
+        self._read_all()
+        return iter(self._context)
+
+    def __len__(self) -> int:
+        """Return number of keys in the viewed context."""
+        self._read_all()
+        return len(self._context)
+
+    def __contains__(self, key: Key) -> bool:
+        """Return True if `key` is present in the viewed context."""
+        self._read_all()
+        return key in self._context
+
+    def __eq__(self, other) -> bool:
+        """Compare the viewed context with other object."""
+        self._read_all()
+        return self._context == other
+
+    def __str__(self) -> str:
+        """Return string representation of the viewed context."""
+        self._read_all()
+        return str(self._context)
+
+    def __repr__(self) -> str:
+        """Return representation of RecordingContext object."""
+        return f'RecordingContext({self._context!r}, path={self._path})'
+
+
+def recording_view(
+    context: Union[Context, dict],
+    reads: Dict[KeyPath, Value],
+) -> Dict[Key, Value]:
+    """
+    Return dictionary view of context which records all key paths read.
+
+    Top level values which are not contexts themselves are recorded
+    immediately, as they can not be wrapped.
+
+    :param context: Context to be viewed.
+    :param reads: Dictionary populated with read key paths and their values.
+    :return: Dictionary with top level keys of `context`.
+    """
+    view: Dict[Key, Value] = {}
+    for key, value in context.items():
+        if isinstance(value, (Context, dict)):
+            view[key] = RecordingContext(
+                context=value,
+                reads=reads,
+                path=(key,),
+            )
+        else:
+            # Lists might be mutated in-place, so we record a copy
+            if isinstance(value, list):
+                reads[(key,)] = copy.deepcopy(value)
+            else:
+                reads[(key,)] = value
+            view[key] = value
+
+    return view
+
+
+def lookup(context: Union[Context, dict], path: KeyPath) -> Value:
+    """
+    Return value at key path within context.
+
+    :param context: Context to look up key path in.
+    :param path: Tuple of keys, one for each level of nested contexts.
+    :return: Found value, or :data:`MISSING` if the key path is non-existent.
+    """
+    value = context
+    for key in path:
+        try:
+            value = value[key]
+        except (KeyError, IndexError, TypeError):
+            return MISSING
+
+    return value
+
+
+def equal_values(first: Value, second: Value) -> bool:
+    """
+    Return True if two context values are equal.
+
+    In contrast to ==, this function handles comparisons between contexts and
+    non-dictionary values, and :data:`MISSING` values.
+    """
+    if first is MISSING or second is MISSING:
+        return first is second
+
+    first_is_mapping = isinstance(first, (Context, dict))
+    second_is_mapping = isinstance(second, (Context, dict))
+    if first_is_mapping != second_is_mapping:
+        return False
+
+    return first == second
@@ -1,10 +1,21 @@
 """Module for directory modification watching."""
 
+import os
 from pathlib import Path
 from sys import platform
-from typing import Callable
+from typing import Callable, Optional, Union
 
-from watchdog.events import FileModifiedEvent, FileSystemEventHandler
+from watchdog.events import (
+    DirCreatedEvent,
+    DirDeletedEvent,
+    DirModifiedEvent,
+    DirMovedEvent,
+    FileCreatedEvent,
+    FileDeletedEvent,
+    FileModifiedEvent,
+    FileMovedEvent,
+    FileSystemEventHandler,
+)
 from watchdog.observers import Observer
 
 
@@ -15,20 +26,34 @@ class DirectoryWatcher:
         self,
         directory: Path,
         on_modified: Callable[[Path], None],
+        on_created: Optional[Callable[[Path], None]] = None,
+        on_deleted: Optional[Callable[[Path], None]] = None,
     ) -> None:
         """
         Initialize a watcher which observes modifications in `directory`.
 
         on_modified: A callable which is invoked with the path of modified
                      files within `directory`.
+        on_created: A callable which is invoked with the path of files
+                    created within `directory`, including files moved
+                    into, or renamed within, `directory`.
+        on_deleted: A callable which is invoked with the path of files
+                    deleted from `directory`, including files moved
+                    out of, or renamed within, `directory`.
         """
         self.on_modified = on_modified
+        self.on_created = on_created
+        self.on_deleted = on_deleted
         self.watched_directory = str(directory)
         self.observer = Observer()
 
     def start(self) -> None:
         """Start watching the specified directory for file modifications."""
-        event_handler = DirectoryEventHandler(self.on_modified)
+        event_handler = DirectoryEventHandler(
+            on_modified=self.on_modified,
+            on_created=self.on_created,
+            on_deleted=self.on_deleted,
+        )
         self.observer.schedule(
             event_handler,
             self.watched_directory,
@@ -52,11 +77,55 @@ class DirectoryWatcher:
 class DirectoryEventHandler(FileSystemEventHandler):
     """An event handler for filesystem changes within a directory."""
 
-    def __init__(self, on_modified: Callable[[Path], None]) -> None:
+    def __init__(
+        self,
+        on_modified: Callable[[Path], None],
+        on_created: Optional[Callable[[Path], None]] = None,
+        on_deleted: Optional[Callable[[Path], None]] = None,
+    ) -> None:
         """Initialize event handler with callback functions."""
         self._on_modified = on_modified
+        self._on_created = on_created
+        self._on_deleted = on_deleted
+
+    def on_created(
+        self,
+        event: Union[DirCreatedEvent, FileCreatedEvent],
+    ) -> None:
+        """Call on_created callback function on created file in dir."""
+        if event.is_directory or not self._on_created:
+            return
+
+        self._on_created(Path(os.fsdecode(event.src_path)).absolute())
+
+    def on_deleted(
+        self,
+        event: Union[DirDeletedEvent, FileDeletedEvent],
+    ) -> None:
+        """Call on_deleted callback function on deleted file in dir."""
+        if event.is_directory or not self._on_deleted:
+            return
+
+        self._on_deleted(Path(os.fsdecode(event.src_path)).absolute())
+
+    def on_moved(
+        self,
+        event: Union[DirMovedEvent, FileMovedEvent],
+    ) -> None:
+        """Treat moved files as deleted from source and created at dest."""
+        if event.is_directory:
+            # Watchdog emits separate move events for the directory content
+            return
+
+        if self._on_deleted:
+            self._on_deleted(Path(os.fsdecode(event.src_path)).absolute())
+        if self._on_created:
+            self._on_created(Path(os.fsdecode(event.dest_path)).absolute())
 
-    def on_modified(self, event: FileModifiedEvent) -> None:
+    def on_modified(
+        self,
+        event: Union[DirModifiedEvent, FileModifiedEvent],
+    ) -> None:
         """Call on_modified callback function on modifed event in dir."""
         if event.is_directory:
             if platform != 'darwin':
@@ -67,7 +136,7 @@ class DirectoryEventHandler(FileSystemEventHandler):
             files_in_directory = [
                 path
                 for path
-                in Path(event.src_path).glob('**/*')
+                in Path(os.fsdecode(event.src_path)).glob('**/*')
                 if not path.is_dir()
             ]
             if len(files_in_directory) > 0:
@@ -79,4 +148,4 @@ class DirectoryEventHandler(FileSystemEventHandler):
             else:
                 return None
         else:
-            self._on_modified(Path(event.src_path).absolute())
+            self._on_modified(Path(os.fsdecode(event.src_path)).absolute())
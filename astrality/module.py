@@ -7,6 +7,7 @@ from pathlib import Path
 import psutil
 import re
 from typing import (
+    Any,
     Callable,
     DefaultDict,
     Dict,
@@ -21,6 +22,7 @@ from typing import (
 
 from mypy_extensions import TypedDict
 
+from astrality import compiler, shell
 from astrality.actions import ActionBlock, ActionBlockDict, SetupActionBlock
 from astrality.config import (
     AstralityYAMLConfigDict,
@@ -145,18 +147,18 @@ class Module:
 
         # Create action block object for each available action block type
         action_blocks: ModuleActionBlocks = {'on_modified': {}}  # type: ignore
-        params = {
+        params: Dict[str, Any] = {
             'directory': self.directory,
             'replacer': self.interpolate_string,
             'context_store': self.context_store,
             'global_modules_config': global_modules_config,
+            'module_name': self.name,
         }
 
         # Create special case setup action block, it removes any action already
         # performed.
         action_blocks['on_setup'] = SetupActionBlock(  # type: ignore
             action_block=module_config.get('on_setup', {}),
-            module_name=self.name,
             **params,
         )
 
@@ -440,6 +442,7 @@ class Module:
                 requirements=requirements_dict,
                 directory=requires_working_directory,
                 timeout=requires_timeout,
+                output_log=shell.module_output_log(name),
             )
             for requirements_dict
             in requires
@@ -486,6 +489,19 @@ class ModuleManager:
         self.startup_done = False
         self.last_module_events: Dict[str, str] = {}
 
+        # Configure caching of template shell filter results
+        compiler.shell_filter_cache.configure(
+            ttl=config.get('astrality', {}).get('shell_filter_cache_ttl', 0),
+        )
+
+        # Configure how shell commands are executed
+        shell.use_coprocesses(
+            enabled=config.get('astrality', {}).get('persistent_shell', False),
+        )
+        shell.set_max_concurrent_commands(
+            limit=config.get('astrality', {}).get('max_concurrent_commands', 1),
+        )
+
         # Get module configurations which are externally defined
         self.global_modules_config = GlobalModulesConfig(
             config=config.get('modules', {}),
@@ -567,6 +583,8 @@ class ModuleManager:
         self.directory_watcher = DirectoryWatcher(
             directory=self.config_directory,
             on_modified=self.file_system_modified,
+            on_created=self.file_system_created,
+            on_deleted=self.file_system_deleted,
         )
 
         logger.info('Enabled modules: ' + ', '.join(self.modules.keys()))
@@ -610,12 +628,30 @@ class ModuleManager:
                         f'[module/{module_name}] New event "{event}". '
                         'Executing actions.',
                     )
+                    generation = self.application_context.generation
                     self.execute(
                         action='all',
                         block='on_event',
                         module=self.modules[module_name],
                     )
                     self.last_module_events[module_name] = event
+                    self._log_context_changes(
+                        module_name=module_name,
+                        generation=generation,
+                    )
+
+    def _log_context_changes(self, module_name: str, generation: int) -> None:
+        """Log context sections changed since generation."""
+        changes = self.application_context.changes_since(generation)
+        if changes is None:
+            logger.debug(f'[module/{module_name}] Context changes unknown.')
+        elif changes:
+            sections = ', '.join(sorted(str(path[0]) for path in changes))
+            logger.debug(
+                f'[module/{module_name}] Changed context sections: {sections}.',
+            )
+        else:
+            logger.debug(f'[module/{module_name}] Context unchanged.')
 
     def has_unfinished_tasks(self) -> bool:
         """Return True if there are any module tasks due."""
@@ -763,6 +799,48 @@ class ModuleManager:
             # be recompiled.
             self.recompile_modified_template(modified=modified)
 
+    def file_system_created(self, created: Path) -> None:
+        """
+        Stow files created within stowed content directories.
+
+        Only the new file is copied, symlinked, or compiled, the rest of the
+        content directory is left alone. This requires setting the global
+        setting:
+        reprocess_modified_files: true
+
+        :param created: Path to created file.
+        """
+        if not self.reprocess_modified_files:
+            return
+
+        for module in self.modules.values():
+            for action_block in module.all_action_blocks():
+                for stow_action in action_block._stow_actions:
+                    stow_action.stow_file(
+                        content_file=created,
+                        dry_run=self.dry_run,
+                    )
+
+    def file_system_deleted(self, deleted: Path) -> None:
+        """
+        Remove stale targets of files deleted from stowed content directories.
+
+        This requires setting the global setting:
+        reprocess_modified_files: true
+
+        :param deleted: Path to deleted file.
+        """
+        if not self.reprocess_modified_files:
+            return
+
+        for module in self.modules.values():
+            for action_block in module.all_action_blocks():
+                for stow_action in action_block._stow_actions:
+                    stow_action.unstow_file(
+                        content_file=deleted,
+                        dry_run=self.dry_run,
+                    )
+
     def on_application_config_modified(self):
         """
         Reload the ModuleManager if astrality.yml has been modified.
@@ -783,6 +861,10 @@ class ModuleManager:
 
         # Hot reloading is enabled, get the new configuration dict
         logger.info('Reloading $ASTRALITY_CONFIG_HOME...')
+
+        # Templates are parsed anew with the new configuration
+        compiler.invalidate_jinja_environments()
+
         (
             new_application_config,
             new_modules,
@@ -825,17 +907,31 @@ class ModuleManager:
         if not self.reprocess_modified_files:
             return
 
+        # Templates which include, extend, or import the modified path must
+        # also be recompiled.
+        dependents = compiler.template_graph.dependents(modified)
+        for dependent in sorted(dependents):
+            logger.debug(
+                f'[reprocess] Template "{dependent}" depends on "{modified}".',
+            )
+        templates = {modified} | dependents
+
         # Run any compile action a new if that compile action uses the modifed
-        # path as a template.
+        # path, or any of its dependents, as a template.
         for module in self.modules.values():
             for action_block in module.all_action_blocks():
                 for compile_action in action_block._compile_actions:
-                    if modified in compile_action:
+                    if any(path in compile_action for path in templates):
                         compile_action.execute(dry_run=self.dry_run)
 
+                # Only the affected files of stowed directories are processed
                 for stow_action in action_block._stow_actions:
-                    if modified in stow_action:
-                        stow_action.execute(dry_run=self.dry_run)
+                    for path in sorted(templates):
+                        if path in stow_action:
+                            stow_action.stow_file(
+                                content_file=path,
+                                dry_run=self.dry_run,
+                            )
 
                 # TODO: Test this branch
                 for copy_action in action_block._copy_actions:
@@ -866,9 +962,14 @@ class ModuleManager:
         if any(module.keep_running for module in self.modules.values()):
             return True
 
+        # Idle persistent shells are not considered running processes
         current_process = psutil.Process()
         children = current_process.children(recursive=False)
-        return bool(children)
+        coprocesses = shell.coprocess_pids()
+        return any(
+            child.pid not in coprocesses or child.children()
+            for child in children
+        )
 
     def __len__(self) -> int:
         """Return the number of managed modules."""
@@ -4,11 +4,20 @@ import logging
 import os
 import shutil
 from pathlib import Path
-from typing import Union, Dict, TYPE_CHECKING, Iterable
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Optional,
+    TYPE_CHECKING,
+    Tuple,
+    Union,
+)
 
 from mypy_extensions import TypedDict
 
-from astrality import utils
+from astrality import shell, utils
 
 
 if TYPE_CHECKING:
@@ -31,44 +40,46 @@ class Requirement:
 
     Object is truthy if requirements are satisfied.
 
+    Shell commands are started on construction, and are executed by
+    :func:`astrality.shell.submit`. Their results are only waited for when
+    the object is evaluated, allowing several requirements to be checked
+    concurrently.
+
     :param requirements: Dictionary containing requirements.
     :param directory: Module directory.
     :param timeout: Default timeout for shell commands.
+    :param output_log: Log which shell command output is written to, if any.
     """
 
-    successful: bool
-
     def __init__(
         self,
         requirements: RequirementDict,
         directory: Path,
         timeout: Union[int, float] = 1,
+        output_log: Optional[shell.OutputLog] = None,
     ) -> None:
         """Construct RequirementStatement object."""
-        self.successful: bool = True
+        self._successful: bool = True
         self.repr: str = ''
 
-        # Check shell requirements
+        # Start shell requirements, their results are checked by _wait()
+        self._shell: Optional[Tuple[str, Callable[[], Any]]] = None
         if 'shell' in requirements:
             command = requirements['shell']
-            result = utils.run_shell(
+            self._shell = (command, utils.start_shell(
                 command=command,
                 fallback=False,
                 timeout=requirements.get('timeout') or timeout,
                 working_directory=directory,
-            )
-            if result is False:
-                self.repr = f'Unsuccessful command: "{command}", '
-                self.successful = False
-            else:
-                self.repr = f'Sucessful command: "{command}" (OK), '
+                output_log=output_log,
+            ))
 
         # Check environment requirements
         if 'env' in requirements:
             env_variable = requirements['env']
             if env_variable not in os.environ:
                 self.repr += f'Missing environment variable: "{env_variable}", '
-                self.successful = False
+                self._successful = False
             else:
                 self.repr += 'Found environment variable: ' \
                              f'"{env_variable}" (OK), '
@@ -79,10 +90,29 @@ class Requirement:
             in_path = bool(shutil.which(program))
             if not in_path:
                 self.repr += f'Program not installed: "{program}", '
-                self.successful = False
+                self._successful = False
             else:
                 self.repr += f'Program installed: "{program}" (OK), '
 
+    @property
+    def successful(self) -> bool:
+        """Return True if all requirements are satisfied."""
+        self._wait()
+        return self._successful
+
+    def _wait(self) -> None:
+        """Wait for result of shell command requirement, if any."""
+        if self._shell is None:
+            return
+
+        command, result = self._shell
+        self._shell = None
+        if result() is False:
+            self.repr = f'Unsuccessful command: "{command}", ' + self.repr
+            self._successful = False
+        else:
+            self.repr = f'Sucessful command: "{command}" (OK), ' + self.repr
+
     @staticmethod
     def pop_missing_module_dependencies(
         modules: Dict[str, 'Module'],
@@ -140,5 +170,6 @@ class Requirement:
 
     def __repr__(self) -> str:
         """Return string representation of requirement object."""
+        self._wait()
         self.repr = self.repr if self.repr else 'No requirements (OK), '
         return 'Module requirements: ' + self.repr
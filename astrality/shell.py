@@ -0,0 +1,621 @@
+"""
+Module for executing shell commands.
+
+Shell commands are either run in a new shell process for each command, or, if
+enabled with :func:`use_coprocesses`, in long-lived ``/bin/sh`` coprocesses,
+one for each working directory. Coprocesses avoid paying for process creation
+and shell startup on every command.
+
+Commands submitted with :func:`submit` are executed concurrently, limited by
+:func:`set_max_concurrent_commands`.
+
+Command output is read while the commands are running. Only the last
+:data:`output_tail_size` bytes of each output stream are kept in memory, while
+the complete output can be written to an :class:`OutputLog`.
+"""
+
+import atexit
+import itertools
+import locale
+import logging
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import IO, Dict, List, Optional, Set, Tuple, Union
+
+from astrality.xdg import XDG
+
+logger = logging.getLogger(__name__)
+
+# Return code, standard output, and standard error of a finished command
+ShellResult = Tuple[int, str, str]
+
+# Coprocesses keyed by working directory, only used if enabled
+_coprocesses: Dict[Path, 'Coprocess'] = {}
+_coprocesses_lock = threading.Lock()
+_use_coprocesses = False
+
+# Executor of submitted commands, with one worker per concurrent command.
+# Commands are executed one at a time by default, preserving the order of
+# their side effects.
+_max_concurrent_commands = 1
+_executor = ThreadPoolExecutor(max_workers=_max_concurrent_commands)
+_executor_lock = threading.Lock()
+
+# Maximum number of bytes kept in memory from each output stream of a command
+output_tail_size = 2 ** 20
+
+# Seconds to wait for remaining output after a command has exited, as
+# background processes started by the command might keep the pipes open.
+_PIPE_GRACE_PERIOD = 0.1
+
+# Output logs keyed by log file path
+_output_logs: Dict[Path, 'OutputLog'] = {}
+_output_logs_lock = threading.Lock()
+
+
+def use_coprocesses(enabled: bool) -> None:
+    """
+    Enable or disable execution of shell commands in persistent coprocesses.
+
+    :param enabled: If True, commands are run by persistent shells.
+    """
+    global _use_coprocesses
+    _use_coprocesses = enabled
+    if not enabled:
+        close_coprocesses()
+
+
+def set_max_concurrent_commands(limit: int) -> None:
+    """
+    Set the maximum number of submitted commands executed concurrently.
+
+    :param limit: Maximum number of commands, 1 executes submitted commands
+        one at a time.
+    """
+    global _executor, _max_concurrent_commands
+    if not isinstance(limit, int) or isinstance(limit, bool) or limit < 1:
+        logger.error(
+            f'Invalid max_concurrent_commands "{limit}". '
+            'Executing one command at a time.',
+        )
+        limit = 1
+
+    with _executor_lock:
+        if limit == _max_concurrent_commands:
+            return
+
+        # Already submitted commands are still executed by the old executor
+        _executor.shutdown(wait=False)
+        _executor = ThreadPoolExecutor(max_workers=limit)
+        _max_concurrent_commands = limit
+
+
+def submit(
+    command: str,
+    timeout: Union[int, float],
+    working_directory: Path,
+    output_log: Optional['OutputLog'] = None,
+) -> 'Future[ShellResult]':
+    """
+    Submit shell command for execution, without waiting for it to finish.
+
+    Commands are executed in order of submission, with at most the number of
+    commands set by :func:`set_max_concurrent_commands` running concurrently.
+    Commands which have timed out no longer count towards this limit.
+
+    :param command: Shell command to be executed.
+    :param timeout: Seconds to wait for the command to finish, counted from
+        when the command is started.
+    :param working_directory: Command working directory.
+    :param output_log: Log which command output is written to, if any.
+    :return: Future result, see :func:`execute`.
+    """
+    with _executor_lock:
+        return _executor.submit(
+            execute,
+            command=command,
+            timeout=timeout,
+            working_directory=working_directory,
+            output_log=output_log,
+        )
+
+
+def execute(
+    command: str,
+    timeout: Union[int, float],
+    working_directory: Path,
+    output_log: Optional['OutputLog'] = None,
+) -> ShellResult:
+    """
+    Execute shell command, waiting for it to finish.
+
+    :param command: Shell command to be executed.
+    :param timeout: Seconds to wait for the command to finish.
+    :param working_directory: Command working directory.
+    :param output_log: Log which command output is written to, if any.
+    :return: Tuple of return code, stdout, and stderr of the command. Only the
+        last :data:`output_tail_size` bytes of stdout and stderr are kept.
+    :raises subprocess.TimeoutExpired: If the command does not finish in time.
+    """
+    if output_log:
+        output_log.command(command)
+
+    if _use_coprocesses:
+        coprocess = _coprocess(working_directory)
+
+        # Commands from other threads are run in new processes instead of
+        # waiting for the coprocess to become available.
+        if coprocess.lock.acquire(blocking=False):
+            try:
+                result = coprocess.run(command=command, timeout=timeout)
+            except subprocess.TimeoutExpired:
+                _abandon(coprocess)
+                raise
+            except OSError as error:
+                logger.warning(f'Shell coprocess unavailable: {error}')
+                _abandon(coprocess)
+            else:
+                # Coprocess output is only available when finished
+                if output_log:
+                    _, stdout, stderr = result
+                    output_log.write('stdout', stdout.encode())
+                    output_log.write('stderr', stderr.encode())
+                return result
+            finally:
+                coprocess.lock.release()
+
+    return _run_process(
+        command=command,
+        timeout=timeout,
+        working_directory=working_directory,
+        output_log=output_log,
+    )
+
+
+def _run_process(
+    command: str,
+    timeout: Union[int, float],
+    working_directory: Path,
+    output_log: Optional['OutputLog'] = None,
+) -> ShellResult:
+    """Execute shell command in a new shell process."""
+    process = subprocess.Popen(
+        command,
+        cwd=working_directory,
+        shell=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+
+    # Both pipes are drained while the command is running, such that the
+    # command never blocks on full pipes. Commands which time out are left
+    # running, and their output is still written to the output log.
+    stdout = _OutputCapture(
+        pipe=process.stdout,  # type: ignore
+        stream='stdout',
+        output_log=output_log,
+    )
+    stderr = _OutputCapture(
+        pipe=process.stderr,  # type: ignore
+        stream='stderr',
+        output_log=output_log,
+    )
+    try:
+        process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        # Reap the command when it eventually exits, as it is left running
+        threading.Thread(target=process.wait, daemon=True).start()
+        raise
+
+    for capture in (stdout, stderr):
+        capture.join(timeout=_PIPE_GRACE_PERIOD)
+        if capture.truncated:
+            logger.warning(
+                f'The {capture.stream} of command "{command}" exceeded '
+                f'{output_tail_size} bytes. Only the last part is kept.',
+            )
+
+    return process.returncode, stdout.output(), stderr.output()
+
+
+class _OutputCapture:
+    """
+    Continuously read output pipe in a background thread.
+
+    The last :data:`output_tail_size` bytes are kept in memory, and all output
+    is written line by line to `output_log`, if given.
+    """
+
+    # Partial lines longer than this are written to the output log
+    max_line_length = 2 ** 16
+
+    def __init__(
+        self,
+        pipe: IO[bytes],
+        stream: str,
+        output_log: Optional['OutputLog'],
+    ) -> None:
+        """Start reading from pipe."""
+        self.stream = stream
+        self.truncated = False
+        self._pipe = pipe
+        self._output_log = output_log
+        self._tail = bytearray()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._drain, daemon=True)
+        self._thread.start()
+
+    def join(self, timeout: float) -> None:
+        """Wait for end of output, at most `timeout` seconds."""
+        self._thread.join(timeout=timeout)
+
+    def output(self) -> str:
+        """Return decoded tail of output read so far."""
+        with self._lock:
+            return _decode(self._tail)
+
+    def _drain(self) -> None:
+        """Read pipe until closed by all writers."""
+        line = bytearray()
+        fd = self._pipe.fileno()
+        while True:
+            try:
+                data = os.read(fd, 65536)
+            except OSError:  # pragma: no cover
+                data = b''
+            if not data:
+                break
+
+            with self._lock:
+                self._tail.extend(data)
+                excess = len(self._tail) - output_tail_size
+                if excess > 0:
+                    del self._tail[:excess]
+                    self.truncated = True
+
+            if self._output_log:
+                line.extend(data)
+                end = line.rfind(b'\n')
+                if end != -1:
+                    self._output_log.write(self.stream, bytes(line[:end + 1]))
+                    del line[:end + 1]
+                elif len(line) > self.max_line_length:
+                    self._output_log.write(self.stream, bytes(line))
+                    line.clear()
+
+        if self._output_log and line:
+            self._output_log.write(self.stream, bytes(line))
+        self._pipe.close()
+
+
+def _decode(output: Union[bytes, bytearray]) -> str:
+    """Decode output with universal newlines, as subprocess does."""
+    text = output.decode(locale.getpreferredencoding(False), errors='replace')
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+
+def _read_tail(path: Path) -> str:
+    """Return the decoded tail of an output file, see output_tail_size."""
+    try:
+        with open(path, 'rb') as output_file:
+            size = output_file.seek(0, os.SEEK_END)
+            output_file.seek(max(size - output_tail_size, 0))
+            return _decode(output_file.read())
+    except OSError:
+        return ''
+
+
+class OutputLog:
+    """
+    Size-capped, rotating log file of command output.
+
+    When the log file grows beyond :attr:`max_bytes`, it is renamed with a
+    ``.1`` suffix, shifting earlier rotated files to ``.2`` and so on. At most
+    :attr:`backups` rotated files are kept.
+
+    :param path: Path to log file, created when first written to.
+    """
+
+    max_bytes = 2 ** 20
+    backups = 3
+
+    def __init__(self, path: Path) -> None:
+        """Construct output log, without opening the log file."""
+        self.path = path
+        self._lock = threading.Lock()
+        self._file: Optional[IO[bytes]] = None
+        self._size = 0
+
+    def command(self, command: str) -> None:
+        """
+        Write header for the output of a new command.
+
+        :param command: Shell command about to be executed.
+        """
+        self._write(f'{self._timestamp()} $ {command}\n'.encode())
+
+    def write(self, stream: str, output: bytes) -> None:
+        """
+        Write command output, one log line for each line of output.
+
+        :param stream: Name of the output stream, either stdout or stderr.
+        :param output: Command output.
+        """
+        if not output:
+            return
+
+        prefix = f'{self._timestamp()} [{stream}] '.encode()
+        lines = output.splitlines(keepends=True)
+        if not lines[-1].endswith(b'\n'):
+            lines[-1] += b'\n'
+        self._write(b''.join(prefix + line for line in lines))
+
+    def close(self) -> None:
+        """Close log file, which is reopened by later writes."""
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+    def _write(self, data: bytes) -> None:
+        """Append data to log file, rotating it first if necessary."""
+        with self._lock:
+            try:
+                if self._file is None:
+                    self.path.parent.mkdir(parents=True, exist_ok=True)
+                    self._file = open(self.path, 'ab')
+                    self._size = self._file.tell()
+
+                if self._size and self._size + len(data) > self.max_bytes:
+                    self._rotate()
+
+                self._file.write(data)
+                self._file.flush()
+                self._size += len(data)
+            except OSError as error:
+                logger.error(f'Could not write to "{self.path}": {error}')
+
+    def _rotate(self) -> None:
+        """Rename log file and earlier rotated files, opening a new file."""
+        self._file.close()  # type: ignore
+        for number in range(self.backups - 1, 0, -1):
+            rotated = self.path.with_name(f'{self.path.name}.{number}')
+            if rotated.exists():
+                os.replace(
+                    rotated,
+                    self.path.with_name(f'{self.path.name}.{number + 1}'),
+                )
+
+        if self.backups > 0:
+            os.replace(self.path, self.path.with_name(f'{self.path.name}.1'))
+        else:
+            self.path.unlink()
+
+        self._file = open(self.path, 'ab')
+        self._size = 0
+
+    @staticmethod
+    def _timestamp() -> str:
+        """Return current local time, as used in the log."""
+        return time.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def module_output_log(module_name: str) -> OutputLog:
+    """
+    Return log of command output for module.
+
+    The log is placed in ``$XDG_DATA_HOME/astrality/logs/<module_name>.log``.
+
+    :param module_name: Name of module executing commands.
+    :return: Output log shared by all commands of the module.
+    """
+    filename = re.sub(r'[^\w.-]', '_', module_name) + '.log'
+    path = XDG().data_home / 'logs' / filename
+    with _output_logs_lock:
+        output_log = _output_logs.get(path)
+        if output_log is None:
+            output_log = OutputLog(path=path)
+            _output_logs[path] = output_log
+        return output_log
+
+
+def _coprocess(working_directory: Path) -> 'Coprocess':
+    """Return running coprocess for working directory."""
+    with _coprocesses_lock:
+        coprocess = _coprocesses.get(working_directory)
+        if coprocess is None or not coprocess.alive():
+            coprocess = Coprocess(working_directory=working_directory)
+            _coprocesses[working_directory] = coprocess
+        return coprocess
+
+
+def _abandon(coprocess: 'Coprocess') -> None:
+    """Stop using coprocess, letting its current command run to completion."""
+    with _coprocesses_lock:
+        if _coprocesses.get(coprocess.working_directory) is coprocess:
+            del _coprocesses[coprocess.working_directory]
+    coprocess.close()
+
+
+def coprocess_pids() -> Set[int]:
+    """Return process IDs of all coprocesses in use."""
+    with _coprocesses_lock:
+        return {
+            coprocess.process.pid
+            for coprocess
+            in _coprocesses.values()
+        }
+
+
+@atexit.register
+def close_coprocesses() -> None:
+    """Close all coprocesses."""
+    with _coprocesses_lock:
+        coprocesses = list(_coprocesses.values())
+        _coprocesses.clear()
+
+    for coprocess in coprocesses:
+        coprocess.close()
+
+
+class Coprocess:
+    """
+    Persistent ``/bin/sh`` process executing shell commands one at a time.
+
+    Each command is run in a subshell with standard input redirected from
+    ``/dev/null``, so commands can not affect the state of the coprocess or
+    consume the commands which follow. Standard output and error of each
+    command are redirected to files of their own, so processes started in the
+    background by a command never write into the output of later commands.
+    The end of the command is detected by a sentinel line written to the
+    coprocess after the command has finished.
+
+    :param working_directory: Working directory of all executed commands.
+    """
+
+    def __init__(self, working_directory: Path) -> None:
+        """Start shell coprocess."""
+        self.working_directory = working_directory
+        self.lock = threading.Lock()
+        self.sentinel = f'__astrality_{uuid.uuid4().hex}__'.encode()
+        self._sentinel_room = len(self.sentinel) + 32
+        self.encoding = locale.getpreferredencoding(False)
+        self._output_directory = Path(tempfile.mkdtemp(prefix='astrality-'))
+        self._commands = itertools.count()
+
+        self.process = subprocess.Popen(
+            ['/bin/sh'],
+            cwd=working_directory,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        self.stdin: IO[bytes] = self.process.stdin  # type: ignore
+
+        # Output of the shell itself is continuously drained by reader threads
+        self._output: Dict[int, bytearray] = {1: bytearray(), 2: bytearray()}
+        self._output_changed = threading.Condition()
+        self._closed_streams = 0
+        self._readers: List[threading.Thread] = []
+        pipes = {1: self.process.stdout, 2: self.process.stderr}
+        for stream, pipe in pipes.items():
+            reader = threading.Thread(
+                target=self._read,
+                args=(stream, pipe.fileno()),  # type: ignore
+                daemon=True,
+            )
+            reader.start()
+            self._readers.append(reader)
+
+    def alive(self) -> bool:
+        """Return True if the coprocess accepts new commands."""
+        return self.process.poll() is None and not self.stdin.closed
+
+    def run(self, command: str, timeout: Union[int, float]) -> ShellResult:
+        """
+        Run command in coprocess.
+
+        :param command: Shell command to be executed.
+        :param timeout: Seconds to wait for the command to finish.
+        :return: Tuple of return code, stdout, and stderr of the command.
+        :raises subprocess.TimeoutExpired: If the command does not finish in
+            time. The coprocess should not be used afterwards.
+        :raises OSError: If the coprocess no longer accepts commands.
+        """
+        sentinel = self.sentinel.decode()
+        number = next(self._commands)
+        stdout = self._output_directory / f'{number}.out'
+        stderr = self._output_directory / f'{number}.err'
+        script = (
+            f'( eval {shlex.quote(command)} ) </dev/null '
+            f'>{shlex.quote(str(stdout))} 2>{shlex.quote(str(stderr))}\n'
+            f"printf '\\n{sentinel} %d\\n' $?\n"
+        )
+
+        with self._output_changed:
+            for output in self._output.values():
+                output.clear()
+
+        try:
+            self.stdin.write(script.encode(self.encoding))
+            self.stdin.flush()
+
+            deadline = time.monotonic() + timeout
+            with self._output_changed:
+                while True:
+                    returncode = self._returncode()
+                    if returncode is not None:
+                        break
+
+                    if self._closed_streams == 2:
+                        # The shell itself exited before finishing the command
+                        returncode = self.process.wait() or 1
+                        break
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise subprocess.TimeoutExpired(command, timeout)
+                    self._output_changed.wait(timeout=remaining)
+
+            return returncode, _read_tail(stdout), _read_tail(stderr)
+        finally:
+            # Background processes might still hold the files open, but they
+            # are no longer reachable by later commands.
+            for path in (stdout, stderr):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+    def close(self) -> None:
+        """Close the coprocess after any running command has finished."""
+        try:
+            self.stdin.close()
+        except OSError:  # pragma: no cover
+            pass
+        shutil.rmtree(self._output_directory, ignore_errors=True)
+
+    def _returncode(self) -> Optional[int]:
+        """Return exit code of running command, or None if not yet finished."""
+        stdout = self._output[1]
+        sentinel_start = stdout.find(b'\n' + self.sentinel + b' ')
+        if sentinel_start == -1:
+            return None
+        status_end = stdout.find(b'\n', sentinel_start + 1)
+        if status_end == -1:
+            return None
+
+        status_start = sentinel_start + len(self.sentinel) + 2
+        return int(stdout[status_start:status_end])
+
+    def _read(self, stream: int, fd: int) -> None:
+        """Continuously read output from file descriptor until closed."""
+        while True:
+            try:
+                data = os.read(fd, 65536)
+            except OSError:
+                data = b''
+
+            with self._output_changed:
+                output = self._output[stream]
+                output.extend(data)
+
+                # Keep the output tail, and room for the sentinel line
+                excess = len(output) - output_tail_size - self._sentinel_room
+                if excess > 0:
+                    del output[:excess]
+                if not data:
+                    self._closed_streams += 1
+                self._output_changed.notify_all()
+
+            if not data:
+                return
@@ -1,7 +1,9 @@
 """Tests for ActionBlock class."""
 
 from pathlib import Path
+import time
 
+from astrality import shell
 from astrality.actions import ActionBlock
 from astrality.context import Context
 
@@ -200,3 +202,50 @@ def test_stowing(action_block_factory, create_temp_files):
 
     # Check if non_template has been symlinked
     assert (template.parent / 'symlink_me').resolve() == symlink_target
+
+
+def test_running_commands_concurrently(tmpdir):
+    """Run actions should be started together, keeping results in order."""
+    action_block = ActionBlock(
+        action_block={
+            'run': [
+                {'shell': 'sleep 0.4; echo first'},
+                {'shell': 'sleep 0.2; echo second'},
+                {'shell': 'sleep 0.4; echo third'},
+            ],
+        },
+        directory=Path(tmpdir),
+        replacer=lambda x: x,
+        context_store=Context(),
+    )
+
+    shell.set_max_concurrent_commands(3)
+    try:
+        start = time.perf_counter()
+        results = action_block.run(default_timeout=2)
+        duration = time.perf_counter() - start
+    finally:
+        shell.set_max_concurrent_commands(1)
+
+    assert results == (
+        ('sleep 0.4; echo first', 'first'),
+        ('sleep 0.2; echo second', 'second'),
+        ('sleep 0.4; echo third', 'third'),
+    )
+    assert duration < 0.9
+
+
+def test_command_output_is_logged_to_module_log(tmpdir):
+    """Output of run actions should be written to the module output log."""
+    action_block = ActionBlock(
+        action_block={'run': {'shell': 'echo hello'}},
+        directory=Path(tmpdir),
+        replacer=lambda x: x,
+        context_store=Context(),
+        module_name='logging_module',
+    )
+    assert action_block.run(default_timeout=1) == (('echo hello', 'hello'),)
+
+    output_log = shell.module_output_log('logging_module')
+    output_log.close()
+    assert output_log.path.read_text().endswith('[stdout] hello\n')
@@ -4,6 +4,7 @@ import os
 from pathlib import Path
 
 from astrality.actions import CompileAction
+from astrality.context import Context
 
 
 def test_null_object_pattern():
@@ -372,3 +373,174 @@ def test_renaming_templates(test_config_directory, tmpdir):
     assert len(list((temp_dir / 'recursive').iterdir())) == 1
     assert (temp_dir / 'module').is_file()
     assert (temp_dir / 'recursive' / 'empty').is_file()
+
+
+def test_skipping_compilation_when_read_context_is_unchanged(tmpdir):
+    """Templates should only be recompiled when read context changes."""
+    temp_dir = Path(tmpdir)
+    templates = temp_dir / 'templates'
+    templates.mkdir()
+    (templates / 'colors').write_text('{{ colors.primary }}')
+    (templates / 'fonts').write_text('{{ fonts[1] }}')
+    targets = temp_dir / 'targets'
+
+    context_store = Context({
+        'colors': {'primary': 'red'},
+        'fonts': {1: 'Hack'},
+    })
+    compile_action = CompileAction(
+        options={'content': str(templates), 'target': str(targets)},
+        directory=temp_dir,
+        replacer=lambda x: x,
+        context_store=context_store,
+    )
+    compile_action.execute()
+    assert (targets / 'colors').read_text() == 'red'
+    assert (targets / 'fonts').read_text() == 'Hack'
+
+    # Record which templates are actually compiled
+    compiled = []
+    compile = compile_action._compile
+
+    def recording_compile(pairs, permissions):
+        compiled.extend(template.name for template, _ in pairs)
+        compile(pairs=pairs, permissions=permissions)
+
+    compile_action._compile = recording_compile
+
+    context_store['colors'] = {'primary': 'blue'}
+    compilations = compile_action.execute()
+    assert compiled == ['colors']
+    assert (targets / 'colors').read_text() == 'blue'
+    assert (targets / 'fonts').read_text() == 'Hack'
+
+    # Skipped templates should still be reported as compiled
+    assert templates / 'fonts' in compilations
+    assert targets / 'fonts' in compile_action.performed_compilations()[
+        templates / 'fonts'
+    ]
+
+    # Deleted targets should be recompiled
+    compiled.clear()
+    (targets / 'fonts').unlink()
+    compile_action.execute()
+    assert compiled == ['fonts']
+    assert (targets / 'fonts').read_text() == 'Hack'
+
+
+def test_recompiling_externally_modified_targets(tmpdir):
+    """Targets modified by others should be recompiled."""
+    temp_dir = Path(tmpdir)
+    template = temp_dir / 'template'
+    template.write_text('{{ colors.primary }}')
+    target = temp_dir / 'target'
+
+    compile_action = CompileAction(
+        options={'content': str(template), 'target': str(target)},
+        directory=temp_dir,
+        replacer=lambda x: x,
+        context_store=Context({'colors': {'primary': 'red'}}),
+    )
+    compile_action.execute()
+    assert target.read_text() == 'red'
+
+    target.write_text('tampered')
+    compile_action.execute()
+    assert target.read_text() == 'red'
+
+    # Modifications preserving the size should be detected as well
+    target.write_text('blu')
+    os.utime(target, ns=(0, 0))
+    compile_action.execute()
+    assert target.read_text() == 'red'
+
+
+def test_disabling_skipping_of_unchanged_templates(tmpdir):
+    """Templates should always be compiled if skip_unchanged is disabled."""
+    temp_dir = Path(tmpdir)
+    template = temp_dir / 'template'
+    template.write_text('{{ colors.primary }}')
+    target = temp_dir / 'target'
+
+    compile_action = CompileAction(
+        options={
+            'content': str(template),
+            'target': str(target),
+            'skip_unchanged': False,
+        },
+        directory=temp_dir,
+        replacer=lambda x: x,
+        context_store=Context({'colors': {'primary': 'red'}}),
+    )
+    compile_action.execute()
+    assert not compile_action._up_to_date(template=template, target=target)
+
+
+def test_concurrent_compilation_of_directory(tmpdir, caplog):
+    """Templates should be rendered concurrently, but logged in order."""
+    temp_dir = Path(tmpdir)
+    templates = temp_dir / 'templates'
+    templates.mkdir()
+    for number in range(20):
+        (templates / f'template{number:02}').write_text(
+            f'{number} {{{{ colors.primary }}}}',
+        )
+    targets = temp_dir / 'targets'
+
+    compile_action = CompileAction(
+        options={'content': str(templates), 'target': str(targets)},
+        directory=temp_dir,
+        replacer=lambda x: x,
+        context_store=Context({'colors': {'primary': 'red'}}),
+    )
+    compile_pairs = compile_action.execute()
+
+    for number in range(20):
+        target = targets / f'template{number:02}'
+        assert target.read_text() == f'{number} red'
+
+    compiled_templates = [
+        record.getMessage().split('"')[1]
+        for record in caplog.records
+        if record.getMessage().startswith('[Compiling] Template:')
+    ]
+    assert compiled_templates == [
+        str(template) for template in compile_pairs.keys()
+    ]
+
+    # Dependencies should be recorded by the worker threads
+    compile_action.context_store['colors'] = {'primary': 'red'}
+    assert compile_action._up_to_date(
+        template=templates / 'template00',
+        target=targets / 'template00',
+    )
+
+
+def test_streaming_compilation_option(tmpdir):
+    """Templates should be compiled when the stream option is enabled."""
+    temp_dir = Path(tmpdir)
+    templates = temp_dir / 'templates'
+    templates.mkdir()
+    (templates / 'one').write_text('{{ number }}')
+    (templates / 'two').write_text('{{ number + 1 }}')
+    targets = temp_dir / 'targets'
+
+    compile_action = CompileAction(
+        options={
+            'content': str(templates),
+            'target': str(targets),
+            'stream': True,
+        },
+        directory=temp_dir,
+        replacer=lambda x: x,
+        context_store=Context({'number': 1}),
+    )
+    compile_action.execute()
+    assert (targets / 'one').read_text() == '1'
+    assert (targets / 'two').read_text() == '2'
+
+    # Dependencies should be recorded for streamed compilations as well
+    assert compile_action._up_to_date(
+        template=templates / 'one',
+        target=targets / 'one',
+    )
@@ -1,7 +1,11 @@
 """Tests for astrality.actions.CopyAction."""
 
+import os
 from pathlib import Path
 
+import pytest
+
+from astrality import utils
 from astrality.actions import CopyAction
 
 
@@ -179,3 +183,169 @@ def test_setting_permissions_on_target_copy(tmpdir):
     copy_action.execute()
 
     assert ((target / 'file1').stat().st_mode & 0o000777) == 0o777
+
+
+class TestComparingCopies:
+    """Tests for skipping copies which are already up to date."""
+
+    @pytest.fixture
+    def copies(self, tmpdir, monkeypatch):
+        """Return content file, target file, and list of performed copies."""
+        content = Path(tmpdir) / 'content'
+        content.write_text('content')
+        target = Path(tmpdir) / 'target'
+
+        monkeypatch.setattr(
+            utils,
+            'digest_cache',
+            utils.DigestCache(path=Path(tmpdir) / 'digests.json'),
+        )
+        performed_copies = []
+        atomic_copy = utils.atomic_copy
+
+        def counting_copy(content, target, **kwargs):
+            performed_copies.append(content)
+            atomic_copy(content=content, target=target, **kwargs)
+
+        monkeypatch.setattr(utils, 'atomic_copy', counting_copy)
+        return content, target, performed_copies
+
+    @staticmethod
+    def copy_action(content, target, compare):
+        """Return copy action with given compare policy."""
+        return CopyAction(
+            options={
+                'content': str(content),
+                'target': str(target),
+                'compare': compare,
+            },
+            directory=content.parent,
+            replacer=lambda x: x,
+            context_store={},
+        )
+
+    @pytest.mark.parametrize(
+        'compare, recopied',
+        [('mtime+size', False), ('hash', False), ('always', True)],
+    )
+    def test_unchanged_copies(self, copies, compare, recopied):
+        """Unchanged files should only be copied again with 'always'."""
+        content, target, performed_copies = copies
+        copy_action = self.copy_action(content, target, compare)
+
+        assert copy_action.execute() == {content: target}
+        assert performed_copies == [content]
+        assert target.read_text() == 'content'
+        assert target.stat().st_mtime_ns == content.stat().st_mtime_ns
+
+        assert copy_action.execute() == {content: target}
+        assert len(performed_copies) == (2 if recopied else 1)
+
+    @pytest.mark.parametrize('compare', ['mtime+size', 'hash', 'always'])
+    def test_modified_content_is_copied(self, copies, compare):
+        """Modified files should be copied again."""
+        content, target, performed_copies = copies
+        copy_action = self.copy_action(content, target, compare)
+        copy_action.execute()
+
+        content.write_text('new content')
+        copy_action.execute()
+        assert len(performed_copies) == 2
+        assert target.read_text() == 'new content'
+
+    def test_hash_ignores_modification_times(self, copies):
+        """Identical content with different modification times is skipped."""
+        content, target, performed_copies = copies
+        target.write_text('content')
+        os.utime(str(target), ns=(0, 0))
+
+        self.copy_action(content, target, 'mtime+size').execute()
+        assert len(performed_copies) == 1
+
+        os.utime(str(target), ns=(0, 0))
+        self.copy_action(content, target, 'hash').execute()
+        assert len(performed_copies) == 1
+
+        # Same size, but different content
+        target.write_text('changed')
+        os.utime(str(target), ns=(1, 1))
+        self.copy_action(content, target, 'hash').execute()
+        assert len(performed_copies) == 2
+        assert target.read_text() == 'content'
+
+    def test_invalid_compare_policy_always_copies(self, copies, caplog):
+        """Invalid compare values should be logged, falling back to copying."""
+        content, target, performed_copies = copies
+        copy_action = self.copy_action(content, target, 'invalid')
+        copy_action.execute()
+        copy_action.execute()
+
+        assert len(performed_copies) == 2
+        assert 'Invalid copy compare parameter' in caplog.text
+
+
+@pytest.mark.parametrize('mode', ['copy', 'reflink', 'hardlink'])
+def test_copy_modes(tmpdir, mode):
+    """Only hardlink mode should share the inode of the content file."""
+    temp_dir = Path(tmpdir)
+    content = temp_dir / 'content'
+    (content / 'directory').mkdir(parents=True)
+    (content / 'directory' / 'file').write_text('content')
+    target = temp_dir / 'target'
+
+    copy_action = CopyAction(
+        options={
+            'content': str(content),
+            'target': str(target),
+            'mode': mode,
+        },
+        directory=temp_dir,
+        replacer=lambda x: x,
+        context_store={},
+    )
+    copy_action.execute()
+
+    copy = target / 'directory' / 'file'
+    assert copy.read_text() == 'content'
+    assert os.path.samefile(
+        str(content / 'directory' / 'file'),
+        str(copy),
+    ) == (mode == 'hardlink')
+
+
+def test_permissions_of_hardlinked_content_are_left_alone(tmpdir, caplog):
+    """Setting permissions should not change the modes of content files."""
+    temp_dir = Path(tmpdir)
+    content = temp_dir / 'content'
+    content.write_text('content')
+    content.chmod(0o644)
+    target = temp_dir / 'target'
+
+    options = {
+        'content': str(content),
+        'target': str(target),
+        'mode': 'hardlink',
+    }
+    copy_action = CopyAction(
+        options=options,
+        directory=temp_dir,
+        replacer=lambda x: x,
+        context_store={},
+    )
+    copy_action.execute()
+    assert utils.same_file(content, target)
+
+    # Existing hard links are replaced by copies when permissions are set
+    options['permissions'] = '755'
+    copy_action = CopyAction(
+        options=options,
+        directory=temp_dir,
+        replacer=lambda x: x,
+        context_store={},
+    )
+    copy_action.execute()
+    assert 'Copying files instead' in caplog.text
+    assert not utils.same_file(content, target)
+    assert target.read_text() == 'content'
+    assert (content.stat().st_mode & 0o777) == 0o644
+    assert (target.stat().st_mode & 0o777) == 0o755
@@ -2,6 +2,9 @@
 
 from pathlib import Path
 
+import pytest
+
+from astrality import utils
 from astrality.actions import StowAction
 
 
@@ -141,3 +144,154 @@ def test_copying_non_template_files(test_config_directory, tmpdir):
     # Copied files should be considered as a managed file, as it needs to be
     # copied again if modified.
     assert templates / 'modules.yml' in stow_action.managed_files()
+
+
+def test_content_directory_is_walked_once(
+    test_config_directory,
+    tmpdir,
+    monkeypatch,
+):
+    """Templates and non-templates should be found in the same walk."""
+    temp_dir = Path(tmpdir)
+    templates = \
+        test_config_directory / 'test_modules' / 'using_all_actions'
+    stow_action = StowAction(
+        options={
+            'content': str(templates),
+            'target': str(temp_dir),
+            'templates': r'(.+)\.template',
+        },
+        directory=test_config_directory,
+        replacer=lambda x: x,
+        context_store={'geography': {'capitol': 'Berlin'}},
+    )
+
+    walks = []
+    walk = utils._walk
+
+    def counting_walk(content, target):
+        walks.append(content)
+        return walk(content=content, target=target)
+
+    monkeypatch.setattr(utils, '_walk', counting_walk)
+    stowed = stow_action.execute()
+
+    assert walks == [templates]
+    assert stowed[templates / 'module.template'] == temp_dir / 'module'
+    assert stowed[templates / 'modules.yml'] == temp_dir / 'modules.yml'
+    assert (temp_dir / 'module').is_file()
+    assert (temp_dir / 'modules.yml').is_symlink()
+
+
+class TestStowingSingleFiles:
+    """Tests for stowing and unstowing files without walking directories."""
+
+    @staticmethod
+    def stow_action(content, target, non_templates='symlink'):
+        """Return stow action from content to target directory."""
+        return StowAction(
+            options={
+                'content': str(content),
+                'target': str(target),
+                'non_templates': non_templates,
+            },
+            directory=content,
+            replacer=lambda x: x,
+            context_store={'key': 'value'},
+        )
+
+    @pytest.mark.parametrize('non_templates', ['symlink', 'copy'])
+    def test_stowing_created_files(self, tmpdir, non_templates):
+        """Only the created file should be stowed."""
+        content = Path(tmpdir, 'content')
+        target = Path(tmpdir, 'target')
+        (content / 'directory').mkdir(parents=True)
+        stow_action = self.stow_action(content, target, non_templates)
+        stow_action.execute()
+
+        (content / 'other').touch()
+        created_template = content / 'directory' / 'template.file'
+        created_template.write_text('{{ key }}')
+        assert stow_action.stow_file(created_template) == {
+            created_template: target / 'directory' / 'file',
+        }
+        assert (target / 'directory' / 'file').read_text() == 'value'
+        assert not (target / 'other').exists()
+
+        created_file = content / 'directory' / 'plain'
+        created_file.write_text('content')
+        assert stow_action.stow_file(created_file) == {
+            created_file: target / 'directory' / 'plain',
+        }
+        assert (target / 'directory' / 'plain').read_text() == 'content'
+        assert (target / 'directory' / 'plain').is_symlink() \
+            == (non_templates == 'symlink')
+        assert not (target / 'other').exists()
+
+        # Files outside the content directory are not stowed
+        outside = Path(tmpdir, 'outside')
+        outside.touch()
+        assert stow_action.stow_file(outside) == {}
+
+    @pytest.mark.parametrize('non_templates', ['symlink', 'copy'])
+    def test_unstowing_deleted_files(self, tmpdir, non_templates):
+        """Stale targets of deleted files should be removed."""
+        content = Path(tmpdir, 'content')
+        target = Path(tmpdir, 'target')
+        content.mkdir()
+        (content / 'template.compiled').write_text('{{ key }}')
+        (content / 'file').write_text('content')
+        (content / 'kept').write_text('kept')
+        stow_action = self.stow_action(content, target, non_templates)
+        stow_action.execute()
+        assert content / 'template.compiled' in stow_action
+
+        for deleted in ('template.compiled', 'file'):
+            (content / deleted).unlink()
+
+        assert stow_action.unstow_file(content / 'template.compiled') == {
+            content / 'template.compiled': target / 'compiled',
+        }
+        assert not (target / 'compiled').exists()
+        assert content / 'template.compiled' not in stow_action
+
+        assert stow_action.unstow_file(content / 'file') == {
+            content / 'file': target / 'file',
+        }
+        assert not (target / 'file').exists()
+        assert not (target / 'file').is_symlink()
+        assert (target / 'kept').read_text() == 'kept'
+
+    def test_unstowing_leaves_foreign_targets_alone(self, tmpdir):
+        """Targets not created by the stow action should not be removed."""
+        content = Path(tmpdir, 'content')
+        target = Path(tmpdir, 'target')
+        content.mkdir()
+        target.mkdir()
+        (target / 'file').write_text('user file')
+        (target / 'compiled').write_text('user file')
+        stow_action = self.stow_action(content, target)
+
+        assert stow_action.unstow_file(content / 'file') == {}
+        assert stow_action.unstow_file(content / 'template.compiled') == {}
+        assert (target / 'file').read_text() == 'user file'
+        assert (target / 'compiled').read_text() == 'user file'
+
+    def test_dry_run_of_single_files(self, tmpdir):
+        """Dry runs should neither create nor remove targets."""
+        content = Path(tmpdir, 'content')
+        target = Path(tmpdir, 'target')
+        content.mkdir()
+        stow_action = self.stow_action(content, target)
+        stow_action.execute()
+
+        (content / 'file').touch()
+        assert stow_action.stow_file(content / 'file', dry_run=True) == {
+            content / 'file': target / 'file',
+        }
+        assert not (target / 'file').is_symlink()
+
+        stow_action.stow_file(content / 'file')
+        (content / 'file').unlink()
+        stow_action.unstow_file(content / 'file', dry_run=True)
+        assert (target / 'file').is_symlink()
@@ -1,5 +1,6 @@
 """Tests for astrality.actions.SymlinkAction."""
 
+import os
 from pathlib import Path
 
 from astrality.actions import SymlinkAction
@@ -183,3 +184,93 @@ def test_running_symlink_action_twice(create_temp_files):
     assert target.is_symlink()
     assert target.read_text() == 'content'
     assert (target.parent / (target.name + '.bak')).read_text() == 'target'
+
+
+def symlink_directory(content, target):
+    """Return symlink action from content to target directory."""
+    return SymlinkAction(
+        options={'content': str(content), 'target': str(target)},
+        directory=content,
+        replacer=lambda x: x,
+        context_store={},
+    )
+
+
+def test_existing_symlinks_are_left_alone(tmpdir, monkeypatch):
+    """Correct symlinks should only be verified, not recreated."""
+    content = Path(tmpdir, 'content')
+    (content / 'a' / 'b').mkdir(parents=True)
+    for name in ('file1', 'a/file2', 'a/b/file3'):
+        (content / name).touch()
+    target = Path(tmpdir, 'target')
+
+    symlink_action = symlink_directory(content, target)
+    symlink_action.execute()
+    assert (target / 'a' / 'b' / 'file3').resolve() \
+        == content / 'a' / 'b' / 'file3'
+
+    def fail(*args, **kwargs):
+        raise AssertionError('Symlink should not be recreated!')
+
+    monkeypatch.setattr(os, 'symlink', fail)
+    monkeypatch.setattr(os, 'replace', fail)
+    assert len(symlink_action.execute()) == 3
+
+
+def test_wrong_symlinks_are_replaced(tmpdir):
+    """Symlinks pointing elsewhere should be replaced."""
+    content = Path(tmpdir, 'content')
+    content.mkdir()
+    (content / 'file').write_text('content')
+    target = Path(tmpdir, 'target')
+    target.mkdir()
+    (Path(tmpdir) / 'other').write_text('other')
+    (target / 'file').symlink_to(Path(tmpdir) / 'other')
+
+    symlink_directory(content, target).execute()
+    assert os.readlink(str(target / 'file')) == str(content / 'file')
+    assert (target / 'file').read_text() == 'content'
+    assert (Path(tmpdir) / 'other').read_text() == 'other'
+    assert sorted(target.iterdir()) == [target / 'file']
+
+
+def test_symlinking_content_symlinks(tmpdir):
+    """Content files which are symlinks themselves should be linked to."""
+    content = Path(tmpdir, 'content')
+    content.mkdir()
+    (Path(tmpdir) / 'real_file').write_text('real')
+    (content / 'linked_file').symlink_to(Path(tmpdir) / 'real_file')
+    target = Path(tmpdir, 'target')
+
+    symlink_action = symlink_directory(content, target)
+    for _ in range(2):
+        symlink_action.execute()
+        assert os.readlink(str(target / 'linked_file')) \
+            == str(content / 'linked_file')
+
+
+def test_target_directory_leading_to_content(tmpdir):
+    """Content files should never be replaced by symlinks to themselves."""
+    content = Path(tmpdir, 'content')
+    content.mkdir()
+    (content / 'file').write_text('content')
+    target = Path(tmpdir, 'target')
+    target.symlink_to(content)
+
+    symlink_directory(content, target).execute()
+    assert not (content / 'file').is_symlink()
+    assert (content / 'file').read_text() == 'content'
+    assert list(content.iterdir()) == [content / 'file']
+
+
+def test_directories_are_not_replaced(tmpdir, caplog):
+    """Directories located at symlink paths should be logged and skipped."""
+    content = Path(tmpdir, 'content')
+    content.mkdir()
+    (content / 'file').touch()
+    target = Path(tmpdir, 'target')
+    (target / 'file').mkdir(parents=True)
+
+    symlink_directory(content, target).execute()
+    assert (target / 'file').is_dir()
+    assert 'Path exists, and is not a file!' in caplog.text
@@ -934,3 +934,35 @@ def test_defining_on_startup_block_at_root_indentation(caplog):
     )
     assert module.execute(action='run', block='on_startup') \
         == (('echo overwritten', 'overwritten',),)
+
+
+def test_output_of_module_commands_is_logged(
+    patch_xdg_directory_standard,
+    test_config_directory,
+):
+    """Output of run actions in all action blocks should be logged."""
+    modules = {
+        'logged': {
+            'on_startup': {'run': {'shell': 'echo startup'}},
+            'on_event': {'run': {'shell': 'echo event'}},
+            'on_exit': {'run': {'shell': 'echo exit >&2'}},
+        },
+    }
+    module_manager = ModuleManager(modules=modules)
+    module_manager.finish_tasks()
+    module_manager.execute(action='all', block='on_event')
+    module_manager.exit()
+
+    log = patch_xdg_directory_standard / 'logs' / 'logged.log'
+    retry = Retry()
+    assert retry(lambda: '[stderr] exit' in log.read_text())
+
+    lines = log.read_text().splitlines()
+    assert [line.split(' ', 2)[2] for line in lines] == [
+        '$ echo startup',
+        '[stdout] startup',
+        '$ echo event',
+        '[stdout] event',
+        '$ echo exit >&2',
+        '[stderr] exit',
+    ]
@@ -502,3 +502,166 @@ def test_that_stowed_templates_are_also_watched(three_watchable_files):
     assert Retry()(lambda: target.read_text() == 'value')
 
     module_manager.exit()
+
+
+def test_recompiling_templates_depending_on_modified_template(tmpdir):
+    """Templates including a modified template should be recompiled."""
+    tmpdir = Path(tmpdir)
+    templates = tmpdir / 'templates'
+    templates.mkdir()
+    partial = templates / 'partial'
+    partial.write_text('old')
+    (templates / 'template').write_text("{% include 'partial' %}")
+    targets = tmpdir / 'targets'
+
+    modules = {
+        'module_name': {
+            'on_startup': {
+                'compile': {
+                    'content': str(templates),
+                    'target': str(targets),
+                    'include': r'(template)',
+                },
+            },
+        },
+    }
+    module_manager = ModuleManager(
+        config={'modules': {'reprocess_modified_files': True}},
+        modules=modules,
+    )
+    module_manager.execute(action='all', block='on_startup')
+    assert (targets / 'template').read_text() == 'old'
+
+    partial.write_text('new')
+    module_manager.recompile_modified_template(modified=partial)
+    assert (targets / 'template').read_text() == 'new'
+
+
+def test_stowing_created_and_deleted_files(tmpdir):
+    """Created and deleted content files should be stowed incrementally."""
+    tmpdir = Path(tmpdir)
+    content = tmpdir / 'content'
+    content.mkdir()
+    (content / 'existing').touch()
+    targets = tmpdir / 'targets'
+
+    modules = {
+        'module_name': {
+            'on_startup': {
+                'stow': {
+                    'content': str(content),
+                    'target': str(targets),
+                },
+            },
+        },
+    }
+    module_manager = ModuleManager(
+        config={'modules': {'reprocess_modified_files': True}},
+        modules=modules,
+        context=Context({'key': 'value'}),
+    )
+    module_manager.execute(action='all', block='on_startup')
+    assert (targets / 'existing').is_symlink()
+
+    (content / 'new').touch()
+    (content / 'template.new').write_text('{{ key }}')
+    module_manager.file_system_created(content / 'new')
+    module_manager.file_system_created(content / 'template.new')
+    assert (targets / 'new').resolve() == content / 'new'
+    assert (targets / 'new').read_text() == 'value'
+
+    # Stale symlinks of deleted files are removed
+    (content / 'existing').unlink()
+    module_manager.file_system_deleted(content / 'existing')
+    assert not (targets / 'existing').is_symlink()
+    assert (targets / 'new').read_text() == 'value'
+
+
+@pytest.mark.skipif(MACOS, reason='Flaky on MacOS')
+@pytest.mark.slow
+def test_moving_stowed_files(test_config_directory):
+    """Moved content files should be unstowed and stowed anew."""
+    content = test_config_directory / 'stowed.tmp'
+    targets = test_config_directory / 'stow_targets.tmp'
+    for directory in (content, targets):
+        if directory.exists():
+            shutil.rmtree(directory)
+    content.mkdir()
+    (content / 'old_name').write_text('content')
+
+    modules = {
+        'module_name': {
+            'on_startup': {
+                'stow': {
+                    'content': str(content),
+                    'target': str(targets),
+                },
+            },
+        },
+    }
+    module_manager = ModuleManager(
+        config={'modules': {'reprocess_modified_files': True}},
+        modules=modules,
+    )
+    try:
+        module_manager.finish_tasks()
+        assert (targets / 'old_name').is_symlink()
+
+        (content / 'old_name').rename(content / 'new_name')
+        retry = Retry()
+        assert retry(lambda: (targets / 'new_name').is_symlink())
+        assert retry(lambda: not (targets / 'old_name').is_symlink())
+        assert (targets / 'new_name').read_text() == 'content'
+    finally:
+        module_manager.exit()
+        module_manager.directory_watcher.stop()
+        shutil.rmtree(content)
+        shutil.rmtree(targets)
+
+
+def test_restowing_only_modified_files(tmpdir, monkeypatch):
+    """Modified stowed files should be restowed without the rest."""
+    tmpdir = Path(tmpdir)
+    content = tmpdir / 'content'
+    content.mkdir()
+    (content / 'template.other').write_text('other')
+    targets = tmpdir / 'targets'
+
+    modules = {
+        'module_name': {
+            'on_startup': {
+                'stow': {
+                    'content': str(content),
+                    'target': str(targets),
+                },
+            },
+        },
+    }
+    module_manager = ModuleManager(
+        config={'modules': {'reprocess_modified_files': True}},
+        modules=modules,
+        context=Context({'key': 'value'}),
+    )
+    module_manager.execute(action='all', block='on_startup')
+    assert (targets / 'other').read_text() == 'other'
+
+    stow_action = module_manager.modules['module_name'] \
+        .action_blocks['on_startup']._stow_actions[0]
+    monkeypatch.setattr(
+        stow_action,
+        'execute',
+        lambda *args, **kwargs: pytest.fail('Whole directory stowed'),
+    )
+
+    # A created file is typically followed by a modified event
+    (content / 'template.new').write_text('{{ key }}')
+    module_manager.file_system_created(content / 'template.new')
+    module_manager.recompile_modified_template(content / 'template.new')
+    assert (targets / 'new').read_text() == 'value'
+
+    (content / 'template.other').write_text('{{ key }} modified')
+    (targets / 'other').write_text('untouched')
+    (targets / 'new').write_text('untouched')
+    module_manager.recompile_modified_template(content / 'template.other')
+    assert (targets / 'other').read_text() == 'value modified'
+    assert (targets / 'new').read_text() == 'untouched'
@@ -7,10 +7,20 @@ from pathlib import Path
 import pytest
 from jinja2 import UndefinedError
 
+from astrality import compiler
 from astrality.compiler import (
+    PersistentBytecodeCache,
+    ShellFilterCache,
+    TemplateDependencies,
+    TemplateGraph,
     compile_template,
     compile_template_to_string,
+    create_jinja_environment,
+    invalidate_jinja_environments,
     jinja_environment,
+    shell_filter_cache,
+    stream_template,
+    template_graph,
 )
 from astrality.context import Context
 
@@ -28,6 +38,417 @@ def jinja_test_env(test_templates_folder):
     )
 
 
+def test_reuse_of_cached_jinja_environments(test_templates_folder):
+    """Identical arguments should return the same environment object."""
+    env1 = jinja_environment(test_templates_folder, Path('/'))
+    env2 = jinja_environment(test_templates_folder, Path('/'))
+    assert env1 is env2
+
+    other_env = jinja_environment(test_templates_folder, Path('/tmp'))
+    assert other_env is not env1
+
+
+def test_invalidation_of_cached_jinja_environments(tmpdir):
+    """Invalidated environments should be created anew."""
+    tmpdir = Path(tmpdir)
+    env = jinja_environment(tmpdir, Path('/'))
+    other_env = jinja_environment(tmpdir.parent, Path('/'))
+
+    invalidate_jinja_environments(templates_folder=tmpdir)
+    assert jinja_environment(tmpdir, Path('/')) is not env
+    assert jinja_environment(tmpdir.parent, Path('/')) is other_env
+
+    invalidate_jinja_environments()
+    assert jinja_environment(tmpdir.parent, Path('/')) is not other_env
+
+
+def test_recompilation_of_modified_template_with_cached_environment(tmpdir):
+    """Modified templates should be reloaded by cached environments."""
+    template = Path(tmpdir) / 'template'
+    template.write_text('{{ key }}')
+    assert compile_template_to_string(template, {'key': 'one'}) == 'one'
+
+    template.write_text('new {{ key }}')
+    os.utime(template, (0, template.stat().st_mtime + 10))
+    assert compile_template_to_string(template, {'key': 'one'}) == 'new one'
+
+
+def test_persisting_template_bytecode(tmpdir, patch_xdg_directory_standard):
+    """Compiled templates should be persisted in $XDG_DATA_HOME."""
+    tmpdir = Path(tmpdir)
+    template = tmpdir / 'template'
+    template.write_text('{{ key }}')
+
+    env = create_jinja_environment(tmpdir, Path('/'))
+    assert env.get_template('template').render(key='value') == 'value'
+
+    bytecode_directory = patch_xdg_directory_standard / 'bytecode'
+    assert len(list(bytecode_directory.glob('*.cache'))) == 1
+
+    # A new environment should be able to use the persisted bytecode
+    new_env = create_jinja_environment(tmpdir, Path('/'))
+    assert new_env.get_template('template').render(key='value') == 'value'
+
+
+def test_ignoring_corrupt_bytecode_cache_entries(tmpdir):
+    """Unreadable cache entries should be treated as cache misses."""
+    tmpdir = Path(tmpdir)
+    template = tmpdir / 'template'
+    template.write_text('{{ key }}')
+    cache_directory = tmpdir / 'cache'
+    cache_directory.mkdir()
+
+    env = create_jinja_environment(tmpdir, Path('/'))
+    env.bytecode_cache = PersistentBytecodeCache(directory=cache_directory)
+    env.get_template('template')
+
+    for cache_file in cache_directory.glob('*.cache'):
+        cache_file.write_bytes(b'corrupt')
+
+    new_env = create_jinja_environment(tmpdir, Path('/'))
+    new_env.bytecode_cache = env.bytecode_cache
+    assert new_env.get_template('template').render(key='value') == 'value'
+
+
+def test_pruning_bytecode_cache_above_size_cap(tmpdir):
+    """The oldest cache entries should be removed when exceeding size cap."""
+    cache_directory = Path(tmpdir)
+    for number in range(3):
+        entry = cache_directory / f'{number}.cache'
+        entry.write_bytes(b'x' * 10)
+        os.utime(entry, (number, number))
+
+    cache = PersistentBytecodeCache(directory=cache_directory, max_size=25)
+    cache.prune()
+
+    assert sorted(path.name for path in cache_directory.glob('*.cache')) \
+        == ['1.cache', '2.cache']
+
+
+def test_bytecode_cache_is_scanned_once_below_size_cap(tmpdir, monkeypatch):
+    """The cache directory should only be rescanned when exceeding the cap."""
+    tmpdir = Path(tmpdir)
+    for number in range(5):
+        (tmpdir / f'template{number}').write_text(f'{number} {{{{ key }}}}')
+
+    cache = PersistentBytecodeCache(directory=tmpdir / 'cache')
+    scans = []
+    prune = cache.prune
+    monkeypatch.setattr(cache, 'prune', lambda: scans.append(prune()))
+
+    env = create_jinja_environment(tmpdir, Path('/'))
+    env.bytecode_cache = cache
+    for number in range(5):
+        env.get_template(f'template{number}')
+    assert len(scans) == 1
+
+    # Entries written after exceeding the cap cause another scan
+    cache.max_size = 0
+    (tmpdir / 'new_template').write_text('{{ key }}')
+    env.get_template('new_template')
+    assert len(scans) == 2
+    assert list((tmpdir / 'cache').glob('*.cache')) == []
+
+
+class TestTemplateDependencies:
+    """Tests for recording dependencies of template compilations."""
+
+    def test_recording_context_reads(self, tmpdir):
+        """Only the context values read by the template should be recorded."""
+        template = Path(tmpdir) / 'template'
+        template.write_text('{{ colors.primary }} {{ undefined_key }}')
+        context = Context({
+            'colors': {'primary': 'red', 'secondary': 'blue'},
+            'fonts': {1: 'Hack'},
+        })
+
+        dependencies = TemplateDependencies()
+        result = compile_template_to_string(
+            template=template,
+            context=context,
+            dependencies=dependencies,
+        )
+        assert result == 'red '
+        assert set(dependencies.context.keys()) == {
+            ('colors', 'primary'),
+            ('undefined_key',),
+        }
+        assert dependencies.templates == {
+            str(template): template.stat().st_mtime_ns,
+        }
+        assert not dependencies.volatile
+
+        assert dependencies.up_to_date(context)
+
+        context['fonts'] = {1: 'FuraCode'}
+        assert dependencies.up_to_date(context)
+
+        context['undefined_key'] = 'now defined'
+        assert not dependencies.up_to_date(context)
+
+    def test_changed_context_values_are_detected(self, tmpdir):
+        """Replaced context sections should be compared by value."""
+        template = Path(tmpdir) / 'template'
+        template.write_text('{{ colors.primary }}')
+        context = Context({'colors': {'primary': 'red'}})
+
+        dependencies = TemplateDependencies()
+        compile_template_to_string(template, context, dependencies=dependencies)
+
+        context['colors'] = {'primary': 'red', 'secondary': 'blue'}
+        assert dependencies.up_to_date(context)
+
+        context['colors'] = {'primary': 'blue'}
+        assert not dependencies.up_to_date(context)
+
+    def test_included_templates_are_recorded(self, tmpdir):
+        """Modification of included templates should be detected."""
+        tmpdir = Path(tmpdir)
+        (tmpdir / 'partial').write_text('{{ key }}')
+        template = tmpdir / 'template'
+        template.write_text('{% include "partial" %}')
+
+        dependencies = TemplateDependencies()
+        compile_template_to_string(
+            template=template,
+            context={'key': 'value'},
+            dependencies=dependencies,
+        )
+        assert str(tmpdir / 'partial') in dependencies.templates
+        assert dependencies.up_to_date({'key': 'value'})
+
+        os.utime(tmpdir / 'partial', (0, 0))
+        assert not dependencies.up_to_date({'key': 'value'})
+
+    def test_using_context_generations(self, tmpdir):
+        """Changes should be detected through context generations."""
+        template = Path(tmpdir) / 'template'
+        template.write_text(
+            '{{ colors.primary }}{% for font in fonts %}{{ font }}{% endfor %}'
+            '{{ names|join }}',
+        )
+        context = Context({
+            'colors': {'primary': 'red'},
+            'fonts': {1: 'Hack'},
+            'names': ['one'],
+        })
+
+        dependencies = TemplateDependencies(generation=context.generation)
+        compile_template_to_string(template, context, dependencies=dependencies)
+        assert dependencies.up_to_date(context)
+
+        # Values set to equal values are not changes
+        context['colors'] = {'primary': 'red'}
+        assert dependencies.up_to_date(context)
+
+        # Nested changes of iterated contexts
+        context['fonts'][2] = 'Fira'
+        assert not dependencies.up_to_date(context)
+        context['fonts'] = {1: 'Hack'}
+        assert dependencies.up_to_date(context)
+
+        # Lists modified in place
+        context['names'].append('two')
+        assert not dependencies.up_to_date(context)
+
+    def test_shell_filter_makes_compilation_volatile(self, tmpdir):
+        """Shell command output might change, so should always recompile."""
+        template = Path(tmpdir) / 'template'
+        template.write_text('{{ "echo hi" | shell }}')
+
+        dependencies = TemplateDependencies()
+        compile_template_to_string(template, {}, dependencies=dependencies)
+        assert dependencies.volatile
+        assert not dependencies.up_to_date({})
+
+
+class TestTemplateGraph:
+    """Tests for the graph of templates referencing other templates."""
+
+    def test_transitive_dependents(self):
+        """Dependents of dependents should be included."""
+        graph = TemplateGraph()
+        graph.update(Path('/base'), {Path('/partial')})
+        graph.update(Path('/child'), {Path('/base'), Path('/macros')})
+        graph.update(Path('/other'), set())
+
+        assert graph.dependents(Path('/partial')) == {
+            Path('/base'),
+            Path('/child'),
+        }
+        assert graph.dependents(Path('/macros')) == {Path('/child')}
+        assert graph.dependents(Path('/child')) == set()
+
+        # Updated references should replace old ones
+        graph.update(Path('/base'), set())
+        assert graph.dependents(Path('/partial')) == set()
+
+    def test_reference_cycles(self):
+        """Cyclic references should not cause infinite loops."""
+        graph = TemplateGraph()
+        graph.update(Path('/a'), {Path('/b')})
+        graph.update(Path('/b'), {Path('/a')})
+        assert graph.dependents(Path('/a')) == {Path('/b')}
+
+    def test_recording_references_of_loaded_templates(self, tmpdir):
+        """References should be found when templates are loaded."""
+        tmpdir = Path(tmpdir)
+        (tmpdir / 'partial').write_text('partial')
+        (tmpdir / 'base').write_text(
+            "{% include 'partial' %}{% block body %}{% endblock %}",
+        )
+        (tmpdir / 'child').write_text(
+            "{% extends 'base' %}{% block body %}child{% endblock %}",
+        )
+
+        result = compile_template_to_string(tmpdir / 'child', {})
+        assert result == 'partialchild'
+        assert template_graph.dependents(tmpdir / 'partial') == {
+            tmpdir / 'base',
+            tmpdir / 'child',
+        }
+
+    def test_references_are_parsed_once_and_only_when_needed(
+        self,
+        tmpdir,
+        monkeypatch,
+    ):
+        """Templates should only be parsed for references when changed."""
+        tmpdir = Path(tmpdir)
+        (tmpdir / 'partial').write_text('partial')
+        template = tmpdir / 'template'
+        template.write_text("{% include 'partial' %}")
+
+        parsed = []
+        find_referenced_templates = compiler.meta.find_referenced_templates
+
+        def counting_find(ast):
+            parsed.append(ast)
+            return find_referenced_templates(ast)
+
+        monkeypatch.setattr(
+            compiler.meta,
+            'find_referenced_templates',
+            counting_find,
+        )
+
+        # Loading templates does not parse them for references
+        for _ in range(2):
+            invalidate_jinja_environments()
+            assert compile_template_to_string(template, {}) == 'partial'
+        assert parsed == []
+
+        dependents = {template}
+        assert template_graph.dependents(tmpdir / 'partial') == dependents
+        assert len(parsed) == 2
+
+        # Unchanged templates are not parsed again
+        invalidate_jinja_environments()
+        compile_template_to_string(template, {})
+        assert template_graph.dependents(tmpdir / 'partial') == dependents
+        assert len(parsed) == 2
+
+        template.write_text("{% include 'partial' %}!")
+        compile_template_to_string(template, {})
+        assert template_graph.dependents(tmpdir / 'partial') == dependents
+        assert len(parsed) == 3
+
+
+class TestShellFilterCache:
+    """Tests for caching results of the shell template filter."""
+
+    @pytest.fixture(autouse=True)
+    def reset_shell_filter_cache(self):
+        yield
+        shell_filter_cache.configure(ttl=0)
+
+    @pytest.fixture
+    def counting_template(self, tmpdir):
+        """Template which counts the number of times it has run a command."""
+        template = Path(tmpdir) / 'template'
+        template.write_text(
+            "{{ 'echo run >> runs && wc -l < runs' | shell }}\n"
+            "{{ 'echo run >> runs && wc -l < runs' | shell(cache=False) }}",
+        )
+        return template
+
+    def test_caching_of_shell_filter_results(self, counting_template):
+        """Cached commands should only be run once."""
+        shell_filter_cache.configure(ttl=60)
+
+        compile_template_to_string(counting_template, {})
+        dependencies = TemplateDependencies()
+        result = compile_template_to_string(
+            counting_template,
+            {},
+            dependencies=dependencies,
+        )
+        assert result.split() == ['1', '3']
+        assert shell_filter_cache.hits == 1
+        assert shell_filter_cache.misses == 1
+
+        # Results might change when they expire
+        assert dependencies.volatile
+
+    def test_caching_shell_filter_results_forever(self, counting_template):
+        """Templates should not be volatile when commands only run once."""
+        shell_filter_cache.configure(ttl='forever')
+        counting_template.write_text("{{ 'echo hi' | shell }}")
+
+        dependencies = TemplateDependencies()
+        compile_template_to_string(
+            counting_template,
+            {},
+            dependencies=dependencies,
+        )
+        assert not dependencies.volatile
+
+    def test_disabled_shell_filter_cache(self, counting_template):
+        """Commands should always be run by default."""
+        compile_template_to_string(counting_template, {})
+        result = compile_template_to_string(counting_template, {})
+        assert result.split() == ['3', '4']
+        assert shell_filter_cache.hits == 0
+        assert shell_filter_cache.misses == 0
+
+    def test_failing_commands_are_not_cached(self, tmpdir):
+        """Fallback values should not be cached."""
+        shell_filter_cache.configure(ttl='forever')
+        template = Path(tmpdir) / 'template'
+        template.write_text("{{ 'exit 1' | shell(1, 'fallback') }}")
+
+        dependencies = TemplateDependencies()
+        result = compile_template_to_string(
+            template,
+            {},
+            dependencies=dependencies,
+        )
+        assert result == 'fallback'
+        assert dependencies.volatile
+        assert shell_filter_cache.get('exit 1', Path(tmpdir)) is None
+
+    def test_expiry_of_cached_results(self, monkeypatch):
+        """Results should expire after the configured number of seconds."""
+        now = 100.0
+        monkeypatch.setattr('astrality.compiler.time.monotonic', lambda: now)
+
+        cache = ShellFilterCache(ttl=10)
+        cache.set('command', Path('/'), 'result')
+        assert cache.get('command', Path('/')) == 'result'
+        assert cache.get('command', Path('/tmp')) is None
+
+        now = 111.0
+        assert cache.get('command', Path('/')) is None
+        assert (cache.hits, cache.misses) == (1, 2)
+
+    def test_invalid_time_to_live(self, caplog):
+        """Invalid configuration should disable the cache."""
+        cache = ShellFilterCache()
+        cache.configure(ttl='sometimes')
+        assert not cache.enabled
+        assert 'shell_filter_cache_ttl' in caplog.text
+
+
 def test_rendering_environment_variables(jinja_test_env):
     template = jinja_test_env.get_template('env_vars')
     assert template.render() == \
@@ -162,6 +583,98 @@ def test_handling_of_undefined_context(tmpdir, caplog):
     assert "'this' is undefined" in caplog.record_tuples[0][2]
 
 
+def test_unchanged_compilation_target_is_not_rewritten(tmpdir):
+    """Targets already containing the compilation result should be kept."""
+    tmpdir = Path(tmpdir)
+    template = tmpdir / 'template'
+    template.write_text('{{ key }}')
+    target = tmpdir / 'target'
+
+    compile_template(template, target, {'key': 'one'}, tmpdir)
+    os.utime(target, (0, 0))
+
+    compile_template(template, target, {'key': 'one'}, tmpdir)
+    assert target.stat().st_mtime == 0
+
+    compile_template(template, target, {'key': 'two'}, tmpdir)
+    assert target.read_text() == 'two'
+    assert target.stat().st_mtime != 0
+
+
+def test_forced_rewrite_of_unchanged_compilation_target(tmpdir):
+    """Unchanged targets should be rewritten if skip_unchanged is False."""
+    tmpdir = Path(tmpdir)
+    template = tmpdir / 'template'
+    template.write_text('content')
+    target = tmpdir / 'target'
+    target.write_text('content')
+    os.utime(target, (0, 0))
+
+    compile_template(template, target, {}, tmpdir, skip_unchanged=False)
+    assert target.stat().st_mtime != 0
+
+
+def test_permissions_of_unchanged_compilation_target_are_applied(tmpdir):
+    """Permissions should be applied even if the content is unchanged."""
+    tmpdir = Path(tmpdir)
+    template = tmpdir / 'template'
+    template.write_text('content')
+    template.chmod(0o644)
+    target = tmpdir / 'target'
+
+    compile_template(template, target, {}, tmpdir)
+    target.chmod(0o600)
+
+    compile_template(template, target, {}, tmpdir, permissions='u+x')
+    assert (target.stat().st_mode & 0o777) == 0o744
+
+
+def test_streaming_compilation_of_large_template(tmpdir):
+    """Streamed compilations should be identical to ordinary ones."""
+    tmpdir = Path(tmpdir)
+    template = tmpdir / 'template'
+    template.write_text(
+        '{% for number in range(20000) %}{{ number }} {{ color }}\n'
+        '{% endfor %}',
+    )
+    template.chmod(0o640)
+    streamed_target = tmpdir / 'streamed'
+    target = tmpdir / 'target'
+    context = {'color': 'ø'}
+
+    stream_template(
+        template,
+        streamed_target,
+        context,
+        tmpdir,
+        permissions='u+x',
+        buffer_size=100,
+    )
+    compile_template(template, target, context, tmpdir, permissions='u+x')
+    assert streamed_target.read_bytes() == target.read_bytes()
+    assert (streamed_target.stat().st_mode & 0o777) == 0o740
+
+    # Unchanged targets should not be rewritten
+    os.utime(streamed_target, (0, 0))
+    stream_template(template, streamed_target, context, tmpdir)
+    assert streamed_target.stat().st_mtime == 0
+    assert len(list(tmpdir.iterdir())) == 3
+
+
+def test_streaming_compilation_error_keeps_target(tmpdir):
+    """Targets should be left intact if rendering fails midway."""
+    tmpdir = Path(tmpdir)
+    template = tmpdir / 'template'
+    template.write_text('partial content {{ 1 / 0 }}')
+    target = tmpdir / 'target'
+    target.write_text('original')
+
+    with pytest.raises(ZeroDivisionError):
+        stream_template(template, target, {}, tmpdir)
+    assert target.read_text() == 'original'
+    assert sorted(tmpdir.iterdir()) == [target, template]
+
+
 def test_writing_template_file_with_default_permissions(tmpdir):
     tmpdir = Path(tmpdir)
     template = tmpdir / 'template'
@@ -232,3 +745,17 @@ def test_writing_template_file_with_invalid_permissions(tmpdir):
         permissions=permissions,
     )
     assert (target.stat().st_mode & 0o777) == 0o732
+
+
+def test_shell_filter_is_run_on_every_compilation(tmpdir):
+    """Literal shell commands should not be evaluated once and reused."""
+    tmpdir = Path(tmpdir)
+    template = tmpdir / 'template'
+    template.write_text("{{ 'cat output' | shell }}")
+    output = tmpdir / 'output'
+
+    output.write_text('old')
+    assert compile_template_to_string(template, Context()) == 'old'
+
+    output.write_text('new')
+    assert compile_template_to_string(template, Context()) == 'new'
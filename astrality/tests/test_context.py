@@ -1,11 +1,18 @@
 """Tests for Context class."""
+from copy import deepcopy
 from math import inf
 from pathlib import Path
 import shutil
 
 import pytest
 
-from astrality.context import Context
+from astrality.context import (
+    MISSING,
+    Context,
+    RecordingContext,
+    lookup,
+    recording_view,
+)
 
 
 class TestContextClass:
@@ -41,6 +48,28 @@ class TestContextClass:
         config[3] = 'string_value'
         assert config._max_key == 3
 
+    def test_integer_index_resolution_after_reassignment(self):
+        config = Context({1: 'one', 2: 'two'})
+        assert config[3] == 'two'
+        assert config.get(3) == 'two'
+
+        config[1] = 'uno'
+        assert config[3] == 'two'
+
+        config[2] = 'dos'
+        assert config[3] == 'dos'
+        assert config.get(3.5) == 'dos'
+        assert config.get('three') is None
+
+    def test_contexts_are_slotted(self):
+        config = Context({'section': {1: 'one'}})
+        with pytest.raises(AttributeError):
+            config.attribute = 'value'
+
+        duplicate = deepcopy(config)
+        assert duplicate == config
+        assert duplicate['section'][2] == 'one'
+
     def test_getting_item_from_empty_config(self):
         config = Context()
         with pytest.raises(KeyError):
@@ -191,6 +220,36 @@ class TestContextClass:
         expected_result = Context({'key1': 1, 'key2': 2, 'key3': 0})
         assert context1 == expected_result
 
+    def test_copies_are_independent(self):
+        """Modifying either copy should leave the other intact."""
+        context = Context({'key1': 1, 'section': {2: 'two'}})
+        copy = context.copy()
+        assert copy == context
+
+        copy['key1'] = 'modified'
+        copy['key2'] = 2
+        assert context == Context({'key1': 1, 'section': {2: 'two'}})
+
+        context['key1'] = 'original'
+        assert copy['key1'] == 'modified'
+
+        # Copies are shallow
+        assert copy['section'] is context['section']
+
+        # Integer index resolution should be copied
+        assert Context(copy)['section'][5] == 'two'
+        assert copy.copy()['section'][3] == 'two'
+
+    def test_copy_shares_content_until_modified(self):
+        """Copying should not copy the underlying dictionary."""
+        context = Context({'key': 'value'})
+        copy = context.copy()
+        assert copy._dict is context._dict
+
+        copy['key'] = 'new_value'
+        assert copy._dict is not context._dict
+        assert context['key'] == 'value'
+
 
 def test_importing_context_from_compiled_yml_file():
     """YAML files should be importable into the context."""
@@ -267,3 +326,154 @@ def test_instantiating_with_directory_path(tmpdir):
             1: 'primary_value',
         },
     })
+
+
+class TestContextGenerations:
+    """Tests for tracking changes of context values."""
+
+    def test_journal_of_changes(self):
+        """Changed keys should be recorded in the change journal."""
+        context = Context({'colors': {1: 'red'}, 'fonts': {1: 'Hack'}})
+        generation = context.generation
+        assert context.changes_since(generation) == set()
+
+        context['colors'] = {1: 'blue'}
+        context.update({'new': 'value', 'fonts': {1: 'Hack'}})
+        assert context.changes_since(generation) == {('colors',), ('new',)}
+
+        generation = context.generation
+        context.import_context(
+            from_path=Path(__file__).parent / 'test_config' / 'test.yml',
+            from_section='section1',
+        )
+        assert context.changes_since(generation) == {('section1',)}
+
+    def test_journal_allocated_on_first_use(self, monkeypatch):
+        """Changes made before the journal is allocated should be known."""
+        monkeypatch.setattr(Context, 'journal_size', 2)
+        generation = Context().generation
+        context = Context({'one': 1, 'two': 2})
+        assert context._journal is None
+
+        context['two'] = 'two'
+        assert context.changes_since(generation) == {('one',), ('two',)}
+
+        context['three'] = 3
+        assert context.changes_since(generation) is None
+
+        context = Context({'one': 1, 'two': 2, 'three': 3})
+        assert context.changes_since(generation) is None
+
+    def test_discarded_journal_entries(self, monkeypatch):
+        """Changes no longer in the journal should be reported as unknown."""
+        monkeypatch.setattr(Context, 'journal_size', 2)
+        context = Context()
+        generation = context.generation
+        context['one'] = 1
+        context['two'] = 2
+        assert context.changes_since(generation) == {('one',), ('two',)}
+
+        context['three'] = 3
+        assert context.changes_since(generation) is None
+        assert context.changes_since(context.generation) == set()
+
+    def test_changed_since_for_key_paths(self):
+        """Changes of nested contexts should be detected."""
+        context = Context({
+            'colors': {'primary': 'red', 'secondary': 'blue'},
+            'numbered': {1: 'one'},
+        })
+        generation = context.generation
+        colors = context['colors']
+
+        colors['primary'] = 'green'
+        assert context.changed_since(('colors', 'primary'), generation)
+        assert not context.changed_since(('colors', 'secondary'), generation)
+        assert context.changed_since(('colors',), generation)
+        assert not context.changed_since(('numbered',), generation)
+        assert not context.changed_since(('missing', 'key'), generation)
+
+        # New greatest integer keys change integer index resolution
+        assert not context.changed_since(('numbered', 3), generation)
+        context['numbered'][2] = 'two'
+        assert context.changed_since(('numbered', 3), generation)
+        assert not context.changed_since(('numbered', 1), generation)
+
+    def test_generations_of_copies(self):
+        """Changes of copies should not appear in the original."""
+        context = Context({'key': 'value'})
+        generation = context.generation
+        copy = context.copy()
+        copy['key'] = 'new_value'
+
+        assert copy.changes_since(generation) == {('key',)}
+        assert context.changes_since(generation) == set()
+        assert not context.changed_since(('key',), generation)
+
+
+class TestRecordingContext:
+    """Tests for recording which context values are read."""
+
+    def test_recording_nested_reads(self):
+        """Only the nested key paths actually read should be recorded."""
+        context = Context({
+            'colors': {'primary': 'CACCFD', 'secondary': 'BACBEB'},
+            'fonts': {1: 'Hack'},
+        })
+        reads = {}
+        view = RecordingContext(context, reads)
+
+        assert view['colors']['primary'] == 'CACCFD'
+        assert view['fonts'][2] == 'Hack'
+        assert reads == {
+            ('colors', 'primary'): 'CACCFD',
+            ('fonts', 2): 'Hack',
+        }
+
+    def test_recording_missing_keys(self):
+        """Non-existent key paths should be recorded as missing."""
+        reads = {}
+        view = RecordingContext(Context({'colors': {}}), reads)
+
+        with pytest.raises(KeyError):
+            view['colors']['primary']
+        assert reads == {('colors', 'primary'): MISSING}
+
+    def test_recording_iteration_as_read_of_entire_context(self):
+        """Using a context as a whole should record a copy of it."""
+        context = Context({'colors': {'primary': 'CACCFD'}})
+        reads = {}
+        view = RecordingContext(context, reads)
+
+        assert list(view['colors'].items()) == [('primary', 'CACCFD')]
+        context['colors']['primary'] = 'changed'
+        assert reads == {('colors',): {'primary': 'CACCFD'}}
+
+    def test_attribute_access_of_keys_is_not_recorded(self):
+        """Jinja tries attribute access first, which should be ignored."""
+        reads = {}
+        view = RecordingContext(Context({'items_key': 1}), reads)
+
+        with pytest.raises(AttributeError):
+            view.items_key
+        assert reads == {}
+
+    def test_recording_view_of_top_level_values(self):
+        """Top level non-context values are recorded immediately."""
+        reads = {}
+        view = recording_view(
+            context=Context({'key': 'value', 'section': {'a': 1}}),
+            reads=reads,
+        )
+        assert reads == {('key',): 'value'}
+        assert view['section']['a'] == 1
+        assert reads == {('key',): 'value', ('section', 'a'): 1}
+
+
+def test_lookup_of_key_paths():
+    """Key paths should be resolved with integer index resolution."""
+    context = Context({'section': {1: 'one', 'key': 'value'}})
+    assert lookup(context, ('section', 'key')) == 'value'
+    assert lookup(context, ('section', 2)) == 'one'
+    assert lookup(context, ('section', 'key', 'deeper')) is MISSING
+    assert lookup(context, ('non_existent',)) is MISSING
@@ -115,3 +115,38 @@ def test_filesystem_watcher(watch_dir):
     # Both the touch event and the write event are considered of interest
     assert retry(lambda: event_saver.argument == test_file2)
     assert event_saver.called == 2
+
+
+@pytest.mark.skipif(MACOS, reason='Flaky on MacOS')
+@pytest.mark.slow
+def test_created_deleted_and_moved_files(tmpdir):
+    """Moved files should be reported as deleted and then created."""
+    watched_directory = Path(tmpdir)
+    events = []
+    dir_watcher = DirectoryWatcher(
+        directory=watched_directory,
+        on_modified=lambda path: None,
+        on_created=lambda path: events.append(('created', path)),
+        on_deleted=lambda path: events.append(('deleted', path)),
+    )
+    dir_watcher.start()
+
+    try:
+        retry = Retry()
+        test_file = watched_directory / 'test_file'
+        test_file.touch()
+        assert retry(lambda: events == [('created', test_file)])
+
+        moved_file = watched_directory / 'moved_file'
+        test_file.rename(moved_file)
+        assert retry(lambda: events[1:] == [
+            ('deleted', test_file),
+            ('created', moved_file),
+        ])
+
+        # Directories are not of interest
+        moved_file.unlink()
+        (watched_directory / 'directory').mkdir()
+        assert retry(lambda: events[3:] == [('deleted', moved_file)])
+    finally:
+        dir_watcher.stop()
@@ -1,7 +1,11 @@
 """Tests for requirements module."""
 
 from pathlib import Path
+import time
 
+import pytest
+
+from astrality import shell
 from astrality.requirements import Requirement
 from astrality.module import Module
 
@@ -155,3 +159,26 @@ def test_recursive_module_requirements():
     assert Requirement.pop_missing_module_dependencies(
         modules={'A': moduleA, 'B': moduleB, 'C': moduleC},
     ) == {}
+
+
+@pytest.mark.parametrize('limit,concurrent', [(1, False), (3, True)])
+def test_shell_requirements_are_limited(tmpdir, limit, concurrent):
+    """Shell requirements should be checked concurrently if allowed."""
+    shell.set_max_concurrent_commands(limit)
+    try:
+        start = time.perf_counter()
+        assert Module.valid_module(
+            name='test',
+            config={'requires': [
+                {'shell': 'sleep 0.3'},
+                {'shell': 'sleep 0.3'},
+                {'shell': 'sleep 0.3; false'},
+            ]},
+            requires_timeout=2,
+            requires_working_directory=Path(tmpdir),
+        ) is False
+        duration = time.perf_counter() - start
+    finally:
+        shell.set_max_concurrent_commands(1)
+
+    assert (duration < 0.6) is concurrent
@@ -0,0 +1,223 @@
+"""Tests for the shell command execution module."""
+
+import subprocess
+import threading
+from pathlib import Path
+
+import pytest
+
+from astrality import shell
+from astrality.shell import Coprocess
+from astrality.utils import run_shell
+
+
+@pytest.fixture
+def coprocess(tmpdir):
+    """Shell coprocess running commands in temporary directory."""
+    coprocess = Coprocess(working_directory=Path(tmpdir))
+    yield coprocess
+    coprocess.close()
+
+
+@pytest.fixture
+def coprocesses():
+    """Enable execution of shell commands by coprocesses."""
+    shell.use_coprocesses(True)
+    yield
+    shell.use_coprocesses(False)
+
+
+class TestCoprocess:
+    """Tests for persistent shell coprocesses."""
+
+    def test_running_commands(self, coprocess, tmpdir):
+        """Output, exit codes and working directory should be kept apart."""
+        assert coprocess.run('echo hello', timeout=1) == (0, 'hello\n', '')
+        assert coprocess.run('printf a; exit 3', timeout=1) == (3, 'a', '')
+        assert coprocess.run('echo error >&2', timeout=1) == (0, '', 'error\n')
+        assert coprocess.run('pwd', timeout=1)[1] == f'{tmpdir}\n'
+
+    def test_commands_do_not_change_coprocess_state(self, coprocess):
+        """Each command should be run in its own subshell."""
+        coprocess.run('cd / && export VARIABLE=value', timeout=1)
+        assert coprocess.run('pwd', timeout=1)[1] != '/\n'
+        assert coprocess.run('echo "$VARIABLE"', timeout=1)[1] == '\n'
+
+        coprocess.run('exit 1', timeout=1)
+        assert coprocess.alive()
+
+    def test_commands_can_not_read_following_commands(self, coprocess):
+        """Standard input should not be inherited from the coprocess."""
+        assert coprocess.run('cat', timeout=1) == (0, '', '')
+
+    def test_invalid_syntax(self, coprocess):
+        """Syntax errors should not leave the coprocess waiting for input."""
+        returncode, _, stderr = coprocess.run("echo 'unmatched", timeout=1)
+        assert returncode != 0
+        assert stderr
+        assert coprocess.run('echo ok', timeout=1) == (0, 'ok\n', '')
+
+    def test_output_of_background_processes(self, coprocess):
+        """Background processes should not write into later command output."""
+        coprocess.run(
+            '(for i in 1 2 3; do echo bg$i; echo err$i >&2; sleep 0.1; done) &',
+            timeout=1,
+        )
+        assert coprocess.run('sleep 0.25; echo real', timeout=1) \
+            == (0, 'real\n', '')
+        assert coprocess.run('echo error >&2', timeout=1) == (0, '', 'error\n')
+
+    def test_timeout(self, coprocess):
+        """Timeouts should be raised as for subprocesses."""
+        with pytest.raises(subprocess.TimeoutExpired):
+            coprocess.run('sleep 1', timeout=0.1)
+
+
+def test_run_shell_with_coprocesses(coprocesses, tmpdir, caplog):
+    """Semantics of run_shell should not depend on execution backend."""
+    tmpdir = Path(tmpdir)
+    assert run_shell('echo hi', working_directory=tmpdir) == 'hi'
+    assert run_shell('exit 1', fallback='fallback') == 'fallback'
+    assert run_shell('sleep 1', timeout=0.1, fallback='slow') == 'slow'
+    assert 'used more than 0.1 seconds' in caplog.text
+
+    # Coprocesses should be reused, but replaced after timeouts
+    coprocess = shell._coprocess(tmpdir)
+    run_shell('true', working_directory=tmpdir)
+    assert shell._coprocess(tmpdir) is coprocess
+
+    run_shell('sleep 1', timeout=0.1, working_directory=tmpdir)
+    assert shell._coprocess(tmpdir) is not coprocess
+
+
+@pytest.fixture
+def concurrent_commands():
+    """Allow three shell commands to be executed concurrently."""
+    shell.set_max_concurrent_commands(3)
+    yield
+    shell.set_max_concurrent_commands(1)
+
+
+class TestSubmittingCommands:
+    """Tests for concurrent execution of submitted shell commands."""
+
+    def test_concurrency_limit(self, concurrent_commands, tmpdir):
+        """At most the configured number of commands should run at once."""
+        command = 'echo start >> log; sleep 0.3; echo end >> log'
+        futures = [
+            shell.submit(command, timeout=2, working_directory=Path(tmpdir))
+            for _ in range(4)
+        ]
+        assert [future.result() for future in futures] == [(0, '', '')] * 4
+
+        log = (Path(tmpdir) / 'log').read_text().split()
+        assert log[:4] == ['start'] * 3 + ['end']
+
+    def test_timed_out_commands_free_their_slot(self, tmpdir):
+        """Commands left running after timeouts should not block others."""
+        tmpdir = Path(tmpdir)
+        slow = shell.submit('sleep 1', timeout=0.1, working_directory=tmpdir)
+        fast = shell.submit('echo fast', timeout=0.5, working_directory=tmpdir)
+        with pytest.raises(subprocess.TimeoutExpired):
+            slow.result()
+        assert fast.result() == (0, 'fast\n', '')
+
+    def test_invalid_limit(self, caplog):
+        """Invalid limits should execute one command at a time."""
+        shell.set_max_concurrent_commands('many')
+        assert shell._max_concurrent_commands == 1
+        assert 'Invalid max_concurrent_commands "many"' in caplog.text
+
+    def test_run_shell_is_not_limited(self, tmpdir):
+        """Commands waited for directly, such as shell filters, run at once."""
+        command = 'echo start >> log; sleep 0.3; echo end >> log'
+        threads = [
+            threading.Thread(
+                target=run_shell,
+                kwargs={'command': command, 'working_directory': Path(tmpdir)},
+            )
+            for _ in range(3)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        log = (Path(tmpdir) / 'log').read_text().split()
+        assert log == ['start'] * 3 + ['end'] * 3
+
+
+class TestOutputCapture:
+    """Tests for reading command output while commands are running."""
+
+    def test_output_larger_than_pipe_buffer(self, tmpdir):
+        """Commands should not block on full pipes."""
+        command = "head -c 300000 /dev/zero | tr '\\0' a; echo error >&2"
+        returncode, stdout, stderr = shell.execute(
+            command,
+            timeout=2,
+            working_directory=Path(tmpdir),
+        )
+        assert returncode == 0
+        assert stdout == 'a' * 300000
+        assert stderr == 'error\n'
+
+    def test_bounded_output_tail(self, tmpdir, monkeypatch, caplog):
+        """Only the end of the output should be kept in memory."""
+        monkeypatch.setattr(shell, 'output_tail_size', 10)
+        _, stdout, _ = shell.execute(
+            'seq 100',
+            timeout=1,
+            working_directory=Path(tmpdir),
+        )
+        assert stdout == '98\n99\n100\n'
+        assert 'exceeded 10 bytes' in caplog.text
+
+    def test_writing_output_log(self, tmpdir):
+        """All output should be written to the output log."""
+        output_log = shell.OutputLog(path=Path(tmpdir) / 'logs' / 'test.log')
+        shell.execute(
+            'echo one; echo two >&2; printf three',
+            timeout=1,
+            working_directory=Path(tmpdir),
+            output_log=output_log,
+        )
+        output_log.close()
+
+        lines = output_log.path.read_text().splitlines()
+        assert lines[0].endswith('$ echo one; echo two >&2; printf three')
+        assert sorted(line.split(' ', 2)[2] for line in lines[1:]) == [
+            '[stderr] two',
+            '[stdout] one',
+            '[stdout] three',
+        ]
+
+
+def test_rotation_of_output_log(tmpdir, monkeypatch):
+    """Output logs should be rotated when exceeding their maximum size."""
+    monkeypatch.setattr(shell.OutputLog, 'max_bytes', 100)
+    monkeypatch.setattr(shell.OutputLog, 'backups', 2)
+    path = Path(tmpdir) / 'module.log'
+    output_log = shell.OutputLog(path=path)
+
+    for number in range(10):
+        output_log.write('stdout', f'line {number}\n'.encode())
+    output_log.close()
+
+    assert sorted(file.name for file in Path(tmpdir).iterdir()) == [
+        'module.log',
+        'module.log.1',
+        'module.log.2',
+    ]
+    for file in Path(tmpdir).iterdir():
+        assert file.stat().st_size <= 100
+    assert path.read_text().endswith('[stdout] line 9\n')
+
+
+def test_module_output_log(patch_xdg_directory_standard):
+    """Module output logs should be placed in the XDG data directory."""
+    output_log = shell.module_output_log('github::user/repo::module')
+    assert output_log.path == (
+        patch_xdg_directory_standard / 'logs' / 'github__user_repo__module.log'
+    )
+    assert shell.module_output_log('github::user/repo::module') is output_log
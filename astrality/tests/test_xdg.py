@@ -44,3 +44,14 @@ def test_retrieving_data_resource(patch_xdg_directory_standard):
     resource.write_text('hello')
     refetched_resource = xdg.data('modules/test.tmp')
     assert refetched_resource.read_text() == 'hello'
+
+
+def test_retrieving_data_directory_resource(patch_xdg_directory_standard):
+    """The data_directory method should create directory in data home."""
+    xdg = XDG()
+    resource = xdg.data_directory('cache/bytecode')
+    assert resource == patch_xdg_directory_standard / 'cache' / 'bytecode'
+    assert resource.is_dir()
+
+    # Retrieving an existing directory should be fine
+    assert xdg.data_directory('cache/bytecode') == resource
@@ -0,0 +1,150 @@
+"""Tests for atomically writing files."""
+
+import errno
+import fcntl
+import os
+from pathlib import Path
+
+import pytest
+
+from astrality.utils import atomic_copy, atomic_hardlink, atomic_write
+
+
+def test_atomic_write_of_new_file(tmpdir):
+    """New files, and parent directories, should be created."""
+    target = Path(tmpdir) / 'directory' / 'target'
+    with atomic_write(path=target) as target_file:
+        target_file.write('content')
+
+    assert target.read_text() == 'content'
+    assert list(target.parent.iterdir()) == [target]
+
+
+def test_atomic_write_leaves_target_intact_on_exception(tmpdir):
+    """Exceptions raised during writing should not touch the target."""
+    target = Path(tmpdir) / 'target'
+    target.write_text('original')
+
+    with pytest.raises(RuntimeError):
+        with atomic_write(path=target) as target_file:
+            target_file.write('partial')
+            raise RuntimeError
+
+    assert target.read_text() == 'original'
+    assert list(Path(tmpdir).iterdir()) == [target]
+
+
+def test_atomic_write_preserves_permissions(tmpdir):
+    """Existing permissions should be kept, unless copied from other file."""
+    tmpdir = Path(tmpdir)
+    target = tmpdir / 'target'
+    target.write_text('original')
+    target.chmod(0o751)
+
+    with atomic_write(path=target, mode='wb', fsync=True) as target_file:
+        target_file.write(b'new')
+    assert (target.stat().st_mode & 0o777) == 0o751
+
+    other_file = tmpdir / 'other'
+    other_file.touch()
+    other_file.chmod(0o640)
+    with atomic_write(path=target, permissions_from=other_file) as target_file:
+        target_file.write('new')
+    assert (target.stat().st_mode & 0o777) == 0o640
+
+
+def test_atomic_write_follows_symlinks(tmpdir):
+    """Symlinks should be kept, and the file pointed to replaced."""
+    tmpdir = Path(tmpdir)
+    real_file = tmpdir / 'real_file'
+    real_file.write_text('original')
+    symlink = tmpdir / 'symlink'
+    symlink.symlink_to(real_file)
+
+    with atomic_write(path=symlink) as target_file:
+        target_file.write('new')
+
+    assert symlink.is_symlink()
+    assert real_file.read_text() == 'new'
+
+
+def test_atomic_copy(tmpdir):
+    """Content, permissions, and modification time should be copied."""
+    tmpdir = Path(tmpdir)
+    content = tmpdir / 'content'
+    content.write_bytes(b'\x00binary')
+    content.chmod(0o700)
+    os.utime(str(content), ns=(1, 10**9))
+    target = tmpdir / 'target'
+    target.write_text('original')
+
+    atomic_copy(content=content, target=target)
+    assert target.read_bytes() == b'\x00binary'
+    assert (target.stat().st_mode & 0o777) == 0o700
+    assert target.stat().st_mtime_ns == 10**9
+
+
+def test_atomic_copy_with_reflink(tmpdir):
+    """Reflinked copies should have the same content as regular copies."""
+    tmpdir = Path(tmpdir)
+    content = tmpdir / 'content'
+    content.write_bytes(os.urandom(2**20 + 1))
+    target = tmpdir / 'target'
+    target.write_text('original')
+
+    atomic_copy(content=content, target=target, reflink=True)
+    assert target.read_bytes() == content.read_bytes()
+    assert not os.path.samefile(str(content), str(target))
+
+
+def test_atomic_copy_with_unsupported_reflink(tmpdir, monkeypatch):
+    """Unsupported reflinks should fall back to regular copying."""
+    tmpdir = Path(tmpdir)
+    content = tmpdir / 'content'
+    content.write_bytes(b'content')
+    target = tmpdir / 'target'
+
+    def unsupported(*args, **kwargs):
+        raise OSError(errno.EOPNOTSUPP, 'Operation not supported')
+
+    monkeypatch.setattr(fcntl, 'ioctl', unsupported)
+    monkeypatch.setattr(os, 'copy_file_range', unsupported, raising=False)
+    atomic_copy(content=content, target=target, reflink=True)
+    assert target.read_bytes() == b'content'
+
+
+def test_atomic_hardlink(tmpdir):
+    """Targets should be replaced by hard links."""
+    tmpdir = Path(tmpdir)
+    content = tmpdir / 'content'
+    content.write_text('content')
+    target = tmpdir / 'directory' / 'target'
+
+    atomic_hardlink(content=content, target=target)
+    assert os.path.samefile(str(content), str(target))
+
+    target.unlink()
+    target.write_text('original')
+    atomic_hardlink(content=content, target=target)
+    assert os.path.samefile(str(content), str(target))
+    assert sorted(target.parent.iterdir()) == [target]
+
+    # Linking again is a no-op
+    atomic_hardlink(content=content, target=target)
+    assert os.path.samefile(str(content), str(target))
+
+
+def test_atomic_hardlink_across_filesystems(tmpdir, monkeypatch):
+    """Files should be copied when hard links are not possible."""
+    tmpdir = Path(tmpdir)
+    content = tmpdir / 'content'
+    content.write_text('content')
+    target = tmpdir / 'target'
+
+    def cross_device_link(*args, **kwargs):
+        raise OSError(errno.EXDEV, 'Invalid cross-device link')
+
+    monkeypatch.setattr(os, 'link', cross_device_link)
+    atomic_hardlink(content=content, target=target)
+    assert target.read_text() == 'content'
+    assert not os.path.samefile(str(content), str(target))
@@ -0,0 +1,57 @@
+"""Tests for changing file modes without the chmod shell command."""
+
+import os
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from astrality.utils import chmod, parse_permissions
+
+
+@pytest.mark.parametrize('permissions', [
+    '755', '0644', '4755', '7',
+    'u+x', 'uo+x', 'go-w', 'a=r', 'ug=rw,o=', 'u=rwx,g=u,o=g-w',
+    '+x', '-w', '=r', 'a+X', 'g+X', 'u+s', 'g+s', 'o+t', '+t', 'u-s,a-t',
+    'ug+rw-x', 'o=u', 'u=',
+])
+@pytest.mark.parametrize('mode', [0o644, 0o751, 0o4700, 0o000])
+def test_parsing_permissions_like_chmod(permissions, mode, tmpdir):
+    """Resulting file modes should be identical to those of chmod."""
+    path = Path(tmpdir) / 'file'
+    path.touch()
+    os.chmod(path, mode)
+    subprocess.run(['chmod', permissions, str(path)], check=True)
+    expected = path.stat().st_mode & 0o7777
+
+    assert parse_permissions(permissions, mode) == expected
+
+
+def test_conditional_execute_permission_of_directories():
+    """The X permission always applies to directories."""
+    assert parse_permissions('a+X', 0o644, directory=True) == 0o755
+    assert parse_permissions('a+X', 0o644) == 0o644
+
+
+@pytest.mark.parametrize('permissions', [
+    '', '8', '12345', 'invalid_argument', 'u+q', 'ux', 'u+x,', 'z=r',
+])
+def test_invalid_permissions(permissions):
+    """Invalid permissions should raise ValueError."""
+    with pytest.raises(ValueError):
+        parse_permissions(permissions, 0o644)
+
+
+def test_chmod(tmpdir):
+    """File modes of existing files should be changed."""
+    path = Path(tmpdir) / 'file'
+    path.touch()
+    path.chmod(0o600)
+
+    chmod(path=path, permissions='g+r')
+    assert path.stat().st_mode & 0o777 == 0o640
+
+    with pytest.raises(ValueError):
+        chmod(path=path, permissions='invalid')
+    with pytest.raises(OSError):
+        chmod(path=Path(tmpdir) / 'does_not_exist', permissions='644')
@@ -4,8 +4,10 @@ import os
 from pathlib import Path
 import pytest
 
+from astrality import compiler
 from astrality.config import user_configuration
-from astrality.utils import compile_yaml
+from astrality.context import Context
+from astrality.utils import _section_index, compile_yaml, compile_yaml_section
 
 
 @pytest.yield_fixture
@@ -48,3 +50,178 @@ class TestUsingConfigFilesWithPlaceholders:
         user_conf, *_ = user_configuration(dir_with_compilable_files)
         assert user_conf['key1'] == 'test_value'
         assert user_conf['key2'] == 'test'
+
+
+class TestCompileYAMLCache:
+    """Tests for caching of compiled YAML templates."""
+
+    @pytest.fixture
+    def compilations(self, monkeypatch):
+        """Return list of templates compiled to string."""
+        compilations = []
+        compile_template_to_string = compiler.compile_template_to_string
+
+        def recording_compile(template, *args, **kwargs):
+            compilations.append(template)
+            return compile_template_to_string(template, *args, **kwargs)
+
+        monkeypatch.setattr(
+            compiler,
+            'compile_template_to_string',
+            recording_compile,
+        )
+        return compilations
+
+    def test_cache_hit_when_nothing_has_changed(self, tmpdir, compilations):
+        """Unchanged templates with unchanged context should not recompile."""
+        template = Path(tmpdir) / 'context.yml'
+        template.write_text('key: {{ section.value }}')
+        context = Context({'section': {'value': 1, 'other': 2}})
+
+        assert compile_yaml(path=template, context=context) == {'key': 1}
+        context['other_section'] = {'value': 3}
+        assert compile_yaml(path=template, context=context) == {'key': 1}
+        assert compile_yaml(
+            path=template,
+            context={'section': {'value': 1}},
+        ) == {'key': 1}
+        assert compilations == [template]
+
+    def test_cache_miss_on_context_change(self, tmpdir, compilations):
+        """Changed context values read by the template should recompile."""
+        template = Path(tmpdir) / 'context.yml'
+        template.write_text('key: {{ section.value }}')
+        context = Context({'section': {'value': 1}})
+
+        assert compile_yaml(path=template, context=context) == {'key': 1}
+        context['section'] = {'value': 2}
+        assert compile_yaml(path=template, context=context) == {'key': 2}
+        assert len(compilations) == 2
+
+    def test_cache_miss_on_modified_template(self, tmpdir, compilations):
+        """Modified template files should be recompiled."""
+        template = Path(tmpdir) / 'context.yml'
+        template.write_text('key: {{ 1 }}')
+        assert compile_yaml(path=template, context={}) == {'key': 1}
+
+        template.write_text('key: {{ 22 }}')
+        assert compile_yaml(path=template, context={}) == {'key': 22}
+        assert len(compilations) == 2
+
+    def test_templates_using_shell_filter_are_not_cached(
+        self,
+        tmpdir,
+        compilations,
+    ):
+        """Shell filter results can change at any time."""
+        template = Path(tmpdir) / 'context.yml'
+        template.write_text('key: {{ "echo 1" | shell }}')
+
+        compile_yaml(path=template, context={})
+        compile_yaml(path=template, context={})
+        assert len(compilations) == 2
+
+    def test_cached_data_is_not_modified_by_caller(self, tmpdir):
+        """The returned datastructure should be safe to modify."""
+        template = Path(tmpdir) / 'context.yml'
+        template.write_text('key:\n  - 1\n  - 2')
+
+        data = compile_yaml(path=template, context={})
+        data['key'].append(3)
+        assert compile_yaml(path=template, context={}) == {'key': [1, 2]}
+
+    def test_yaml_without_template_syntax_is_not_compiled(
+        self,
+        tmpdir,
+        compilations,
+    ):
+        """Plain YAML files should be loaded directly."""
+        template = Path(tmpdir) / 'context.yml'
+        template.write_text('key: {value: 1}\nlist: [a, b]\n')
+        assert compile_yaml(path=template, context={}) == {
+            'key': {'value': 1},
+            'list': ['a', 'b'],
+        }
+        assert compilations == []
+
+        template.write_text('key: 1  {# comment #}\n')
+        assert compile_yaml(path=template, context={}) == {'key': 1}
+        assert compilations == [template]
+
+
+class TestCompileYAMLSection:
+    """Tests for compiling single sections of YAML templates."""
+
+    def test_only_requested_section_is_compiled(self, tmpdir, monkeypatch):
+        """Other sections should be neither rendered nor parsed."""
+        template = Path(tmpdir) / 'context.yml'
+        template.write_text(
+            '# Color schemes\n'
+            'dark:\n'
+            '  background: {{ colors.black }}\n'
+            '\n'
+            'light:\n'
+            '  background: {{ colors.white }}\n'
+            '  list: [1, 2]\n'
+            'broken: {{ undefined.attribute }}\n'
+            '  invalid: [yaml\n',
+        )
+        monkeypatch.setattr(compiler, 'compile_template_to_string', None)
+        context = Context({'colors': {'black': 'x000', 'white': 'xFFF'}})
+
+        assert compile_yaml_section(
+            path=template,
+            section='light',
+            context=context,
+        ) == {'background': 'xFFF', 'list': [1, 2]}
+        assert compile_yaml_section(
+            path=template,
+            section='dark',
+            context=context,
+        ) == {'background': 'x000'}
+
+        context['colors'] = {'black': 'x111'}
+        assert compile_yaml_section(
+            path=template,
+            section='dark',
+            context=context,
+        ) == {'background': 'x111'}
+
+    def test_missing_section(self, tmpdir):
+        """Missing sections should raise KeyError."""
+        template = Path(tmpdir) / 'context.yml'
+        template.write_text('section: 1')
+
+        with pytest.raises(KeyError):
+            compile_yaml_section(path=template, section='other', context={})
+
+    @pytest.mark.parametrize(
+        'content',
+        [
+            '{% set value = 2 %}\ndefault: 1\nsection: {{ value }}\n',
+            'default: &value 2\nsection: *value\n',
+            '{default: 1, section: 2}\n',
+            '"section": 2\n',
+            'true: 1\nsection: 2\n',
+        ],
+    )
+    def test_sections_depending_on_each_other(self, tmpdir, content):
+        """Sections which can not be split up should be loaded in full."""
+        template = Path(tmpdir) / 'context.yml'
+        template.write_text(content)
+
+        assert compile_yaml_section(
+            path=template,
+            section='section',
+            context={},
+        ) == 2
+
+    def test_section_index(self, tmpdir):
+        """Byte offsets of top-level sections should be indexed."""
+        template = Path(tmpdir) / 'context.yml'
+        content = b'a:\n  b: 1\n\n# c\nc.d-e: 2\n'
+        template.write_bytes(content)
+
+        index = _section_index(path=template, file_stat=template.stat())
+        assert index == {'a': (0, 15), 'c.d-e': (15, 24)}
+        assert content[slice(*index['c.d-e'])] == b'c.d-e: 2\n'
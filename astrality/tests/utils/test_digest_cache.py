@@ -0,0 +1,75 @@
+"""Tests for the persisted file digest cache."""
+
+import hashlib
+import json
+from pathlib import Path
+
+from astrality.utils import DigestCache
+
+
+def test_digest_of_file(tmpdir):
+    """Digests should be SHA-256 hexdigests of the file content."""
+    path = Path(tmpdir) / 'file'
+    path.write_bytes(b'content')
+
+    digest_cache = DigestCache(path=Path(tmpdir) / 'digests.json')
+    assert digest_cache.digest(path) == hashlib.sha256(b'content').hexdigest()
+
+
+def test_persisting_digests(tmpdir):
+    """Digests should be reused until the file is modified."""
+    path = Path(tmpdir) / 'file'
+    path.write_bytes(b'content')
+    digests_path = Path(tmpdir) / 'digests.json'
+
+    digest_cache = DigestCache(path=digests_path)
+    digest_cache.update(path=path, digest='cached')
+    assert digest_cache.digest(path) == 'cached'
+
+    # Nothing is written before write() is invoked
+    assert not digests_path.exists()
+    digest_cache.write()
+
+    digest_cache = DigestCache(path=digests_path)
+    assert digest_cache.digest(path) == 'cached'
+
+    path.write_bytes(b'new content')
+    assert digest_cache.digest(path) \
+        == hashlib.sha256(b'new content').hexdigest()
+
+
+def test_corrupt_digest_file_is_ignored(tmpdir):
+    """Unreadable digest files should result in an empty cache."""
+    path = Path(tmpdir) / 'file'
+    path.write_bytes(b'content')
+    digests_path = Path(tmpdir) / 'digests.json'
+    digests_path.write_text('{not json')
+
+    digest_cache = DigestCache(path=digests_path)
+    assert digest_cache.digest(path) == hashlib.sha256(b'content').hexdigest()
+    digest_cache.write()
+    assert DigestCache(path=digests_path).digest(path) \
+        == hashlib.sha256(b'content').hexdigest()
+
+
+def test_pruning_stale_digests(tmpdir):
+    """Digests of deleted or changed files should not be persisted."""
+    digests_path = Path(tmpdir) / 'digests.json'
+    unchanged, changed, deleted = (
+        Path(tmpdir) / name
+        for name
+        in ('unchanged', 'changed', 'deleted')
+    )
+    for path in (unchanged, changed, deleted):
+        path.write_bytes(b'content')
+
+    digest_cache = DigestCache(path=digests_path)
+    for path in (unchanged, changed, deleted):
+        digest_cache.update(path=path, digest='cached')
+
+    changed.write_bytes(b'new content')
+    deleted.unlink()
+    digest_cache.write()
+
+    digests = json.loads(digests_path.read_text())
+    assert list(digests) == [str(unchanged)]
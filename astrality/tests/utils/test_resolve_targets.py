@@ -1,8 +1,14 @@
 """Tests for utils.resolve_targets."""
 
 from pathlib import Path
+import types
 
-from astrality.utils import resolve_targets
+from astrality.utils import (
+    iterate_targets,
+    partition_targets,
+    resolve_target,
+    resolve_targets,
+)
 
 
 def test_resolving_non_existent_file():
@@ -115,3 +121,137 @@ def test_renaming_based_on_include(tmpdir):
         file2: Path('/a/b/2'),
         file3: Path('/a/b/recursive/3'),
     }
+
+
+def test_resolving_targets_in_same_order_as_glob(tmpdir):
+    """Files should be walked depth first, as with Path.glob('**/*')."""
+    temp_dir = Path(tmpdir)
+    for directory in ('a/b/c', 'a/d', 'e'):
+        (temp_dir / directory).mkdir(parents=True)
+        for filename in ('file1', 'file2'):
+            (temp_dir / directory / filename).touch()
+    (temp_dir / 'file3').touch()
+
+    globbed = [
+        file
+        for file
+        in temp_dir.glob('**/*')
+        if not file.is_dir()
+    ]
+    assert list(resolve_targets(temp_dir, Path('/a'), '.+')) == globbed
+
+
+def test_symlinks_to_directories_are_not_followed(tmpdir):
+    """Symlinked files should be included, but not symlinked directories."""
+    temp_dir = Path(tmpdir)
+    content = temp_dir / 'content'
+    content.mkdir()
+    (temp_dir / 'directory').mkdir()
+    (temp_dir / 'directory' / 'file').touch()
+    (temp_dir / 'file').touch()
+
+    (content / 'linked_directory').symlink_to(temp_dir / 'directory')
+    (content / 'linked_file').symlink_to(temp_dir / 'file')
+    (content / 'broken_link').symlink_to(temp_dir / 'does_not_exist')
+
+    targets = resolve_targets(content=content, target=Path('/a'), include='.+')
+    assert targets == {
+        content / 'linked_file': Path('/a/linked_file'),
+        content / 'broken_link': Path('/a/broken_link'),
+    }
+
+
+def test_iterating_targets_lazily(tmpdir):
+    """Target pairs should be yielded while the directory is walked."""
+    temp_dir = Path(tmpdir)
+    (temp_dir / 'template.file').touch()
+
+    pairs = iterate_targets(
+        content=temp_dir,
+        target=Path('/a'),
+        include=r'template\.(.+)',
+    )
+    assert isinstance(pairs, types.GeneratorType)
+    assert list(pairs) == [(temp_dir / 'template.file', Path('/a/file'))]
+
+
+def test_partitioning_targets(tmpdir):
+    """Partitions should be equal to resolving each include separately."""
+    temp_dir = Path(tmpdir)
+    (temp_dir / 'directory').mkdir()
+    for name in ('template.a', 'b', 'directory/template.c', 'directory/d'):
+        (temp_dir / name).touch()
+
+    includes = (r'template\.(.+)', r'(?!template\..+).+', r'.+')
+    partitions = partition_targets(
+        content=temp_dir,
+        target=Path('/a'),
+        includes=includes,
+    )
+    assert partitions == [
+        resolve_targets(content=temp_dir, target=Path('/a'), include=include)
+        for include
+        in includes
+    ]
+    assert partitions[0] == {
+        temp_dir / 'template.a': Path('/a/a'),
+        temp_dir / 'directory' / 'template.c': Path('/a/directory/c'),
+    }
+    assert partitions[1] == {
+        temp_dir / 'b': Path('/a/b'),
+        temp_dir / 'directory' / 'd': Path('/a/directory/d'),
+    }
+
+    content_file = temp_dir / 'template.a'
+    assert partition_targets(
+        content=content_file,
+        target=Path('/a/template.a'),
+        includes=includes,
+    ) == [
+        {content_file: Path('/a/a')},
+        {},
+        {content_file: Path('/a/template.a')},
+    ]
+
+
+def test_resolving_target_of_single_content_file(tmpdir):
+    """Single files should be resolved as when walking the directory."""
+    temp_dir = Path(tmpdir)
+    (temp_dir / 'directory').mkdir()
+    for name in ('template.a', 'b', 'directory/template.c'):
+        (temp_dir / name).touch()
+
+    include = r'template\.(.+)'
+    targets = resolve_targets(
+        content=temp_dir,
+        target=Path('/a'),
+        include=include,
+    )
+    for content_file in (
+        temp_dir / 'template.a',
+        temp_dir / 'b',
+        temp_dir / 'directory' / 'template.c',
+    ):
+        assert resolve_target(
+            content_file=content_file,
+            content=temp_dir,
+            target=Path('/a'),
+            include=include,
+        ) == targets.get(content_file)
+
+    # Files outside of the content directory have no target
+    assert resolve_target(
+        content_file=Path('/template.a'),
+        content=temp_dir,
+        target=Path('/a'),
+        include=include,
+    ) is None
+
+    # Content files are resolved as by resolve_targets
+    content_file = temp_dir / 'template.a'
+    assert resolve_target(
+        content_file=content_file,
+        content=content_file,
+        target=temp_dir,
+        include=include,
+    ) == temp_dir / 'a'
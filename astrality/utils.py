@@ -1,14 +1,40 @@
 """General utility functions which are used across the application."""
 
+from contextlib import contextmanager
+import copy
+import fcntl
+from functools import lru_cache, partial
+import hashlib
 from io import StringIO
+import json
 import logging
+import os
 import re
+import shutil
+import stat
 import subprocess
+import threading
 from pathlib import Path
-from typing import Any, Dict, List, TypeVar, Union
+from tempfile import NamedTemporaryFile
+from typing import (
+    IO,
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Pattern,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+)
 
-from astrality import compiler
+from astrality import compiler, shell
 from astrality.context import Context
+from astrality.xdg import XDG
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +58,7 @@ def run_shell(
     working_directory: Path = Path.home(),
     allow_error_codes: bool = False,
     log_success: bool = True,
+    output_log: Optional[shell.OutputLog] = None,
 ) -> str:
     """
     Return the standard output of a shell command.
@@ -39,45 +66,85 @@ def run_shell(
     If the shell command has a non-zero exit code or times out, the function
     returns the `fallback` argument instead of the standard output.
 
+    The command is executed by the calling thread, and is therefore not
+    limited by :func:`astrality.shell.set_max_concurrent_commands`. This
+    keeps, for instance, concurrently rendered templates using the ``shell``
+    filter from waiting on each other.
+
     :param command: Shell command to be executed.
     :param timeout: How long to wait for return of command.
     :param fallback: Default return value on timeout/error codes.
     :param working_directory: Command working directory.
     :param allow_error_codes: If error codes should return fallback.
     :param log_success: If successful commands stdout should be logged.
+    :param output_log: If given, all output of the command is written to this
+        log, see :class:`astrality.shell.OutputLog`.
     :return: Stdout of command, or `fallback` on error/timeout.
     """
-    process = subprocess.Popen(
-        command,
-        cwd=working_directory,
-        shell=True,
-        universal_newlines=True,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
+    return _shell_output(
+        result=partial(
+            shell.execute,
+            command=command,
+            timeout=0.1 if timeout == 0 else timeout,
+            working_directory=working_directory,
+            output_log=output_log,
+        ),
+        command=command,
+        timeout=timeout,
+        fallback=fallback,
+        allow_error_codes=allow_error_codes,
+        log_success=log_success,
     )
-    try:
-        # We add just a small extra wait in case users specify 0 seconds,
-        # in order to not print an error when a command is really quick.
-        if timeout == 0:
-            process.wait(timeout=0.1)
-        else:
-            process.wait(timeout=timeout)
 
-        for error_line in process.stderr:
-            logger.error(str(error_line))
 
-        if process.returncode != 0 and not allow_error_codes:
-            logger.error(
-                f'Command "{command}" exited with non-zero return code: ' +
-                str(process.returncode),
-            )
-            return fallback
-        else:
-            stdout = process.communicate()[0].strip('\n')
-            if log_success and stdout:
-                logger.info(stdout)
-            return stdout
+def start_shell(
+    command: str,
+    timeout: Union[int, float] = 2,
+    fallback: Any = '',
+    working_directory: Path = Path.home(),
+    allow_error_codes: bool = False,
+    log_success: bool = True,
+    output_log: Optional[shell.OutputLog] = None,
+) -> Callable[[], Any]:
+    """
+    Start shell command, returning function which waits for its output.
+
+    Several commands can be started before waiting for any of them, in order
+    to execute them concurrently. Errors and output are logged when waited
+    for, such that log messages are kept in order.
 
+    See :func:`run_shell` for the arguments and the eventual return value.
+    """
+    # We add just a small extra wait in case users specify 0 seconds,
+    # in order to not print an error when a command is really quick.
+    future = shell.submit(
+        command=command,
+        timeout=0.1 if timeout == 0 else timeout,
+        working_directory=working_directory,
+        output_log=output_log,
+    )
+    return partial(
+        _shell_output,
+        result=future.result,
+        command=command,
+        timeout=timeout,
+        fallback=fallback,
+        allow_error_codes=allow_error_codes,
+        log_success=log_success,
+    )
+
+
+def _shell_output(
+    result: Callable[[], shell.ShellResult],
+    command: str,
+    timeout: Union[int, float],
+    fallback: Any,
+    allow_error_codes: bool,
+    log_success: bool,
+) -> Any:
+    """Wait for shell command result, returning its output or fallback."""
+    try:
+        returncode, stdout, stderr = result()
     except subprocess.TimeoutExpired:
         if timeout == 0:
             return fallback
@@ -89,6 +156,418 @@ def run_shell(
         )
         return fallback
 
+    for error_line in stderr.splitlines(keepends=True):
+        logger.error(error_line)
+
+    if returncode != 0 and not allow_error_codes:
+        logger.error(
+            f'Command "{command}" exited with non-zero return code: ' +
+            str(returncode),
+        )
+        return fallback
+
+    stdout = stdout.strip('\n')
+    if log_success and stdout:
+        logger.info(stdout)
+    return stdout
+
+
+# The file mode creation mask of this process, used for new files
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+@contextmanager
+def atomic_write(
+    path: Path,
+    mode: str = 'w',
+    fsync: bool = False,
+    permissions_from: Optional[Path] = None,
+) -> Iterator[IO]:
+    """
+    Return file object which atomically replaces file at `path` when closed.
+
+    Content is written to a temporary file next to `path`, which is renamed
+    into place when the with block exits. Programs reading `path` will
+    therefore never observe partially written content. If an exception is
+    raised within the with block, `path` is left untouched. Symlinks at `path`
+    are followed, replacing the file they point to.
+
+    :param path: Path to file to be written.
+    :param mode: File mode, either 'w' or 'wb'.
+    :param fsync: If True, flush file content and rename to disk before
+        returning.
+    :param permissions_from: File to copy permission bits from. If not
+        provided, the permission bits of any existing file at `path` are kept.
+    """
+    path = Path(os.path.realpath(path))
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    temp_file = NamedTemporaryFile(
+        mode=mode,
+        dir=str(path.parent),
+        prefix=f'.{path.name}.',
+        suffix='.tmp',
+        delete=False,
+    )
+    try:
+        with temp_file:
+            yield temp_file
+            temp_file.flush()
+            if fsync:
+                os.fsync(temp_file.fileno())
+
+        if permissions_from:
+            shutil.copymode(str(permissions_from), temp_file.name)
+        elif path.exists():
+            shutil.copymode(str(path), temp_file.name)
+        else:
+            os.chmod(temp_file.name, 0o666 & ~_UMASK)
+
+        os.replace(temp_file.name, str(path))
+
+        if fsync:
+            directory = os.open(str(path.parent), os.O_RDONLY)
+            try:
+                os.fsync(directory)
+            finally:
+                os.close(directory)
+    except BaseException:
+        try:
+            os.remove(temp_file.name)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_copy(content: Path, target: Path, reflink: bool = False) -> None:
+    """
+    Copy file content, permission bits, and times, atomically replacing target.
+
+    :param content: File to be copied.
+    :param target: Path to copy destination.
+    :param reflink: If True, try to let the copy share data blocks with
+        `content`, falling back to a regular copy if not supported.
+    """
+    content_stat = os.stat(str(content))
+    with open(content, 'rb') as content_file, atomic_write(
+        path=target,
+        mode='wb',
+        permissions_from=content,
+    ) as target_file:
+        if reflink:
+            _clone(source=content_file, destination=target_file)
+        else:
+            shutil.copyfileobj(content_file, target_file)
+
+    os.utime(
+        str(target),
+        ns=(content_stat.st_atime_ns, content_stat.st_mtime_ns),
+    )
+
+
+# Linux ioctl request for cloning a file, i.e. _IOW(0x94, 9, int)
+_FICLONE = 0x40049409
+
+
+def _clone(source: IO, destination: IO) -> None:
+    """
+    Copy content of source file to empty destination file, without user space.
+
+    Copy-on-write clones are attempted first, as supported by Btrfs and XFS.
+    Otherwise the kernel is asked to copy the data, and finally the content is
+    copied by reading and writing the files.
+
+    :param source: File opened for binary reading.
+    :param destination: Empty file opened for binary writing.
+    """
+    try:
+        fcntl.ioctl(destination.fileno(), _FICLONE, source.fileno())
+        return
+    except OSError:
+        pass
+
+    try:
+        remaining = os.fstat(source.fileno()).st_size
+        while remaining > 0:
+            copied = os.copy_file_range(
+                source.fileno(),
+                destination.fileno(),
+                remaining,
+            )
+            if copied == 0:
+                break
+            remaining -= copied
+        return
+    except (AttributeError, OSError):
+        # Not supported by platform or filesystems, start all over again
+        source.seek(0)
+        destination.seek(0)
+        destination.truncate()
+
+    shutil.copyfileobj(source, destination)
+
+
+def same_file(first: Path, second: Path) -> bool:
+    """
+    Return True if both paths refer to the same existing file.
+
+    :param first: Path to first file.
+    :param second: Path to second file.
+    :return: False if the files differ, or if either does not exist.
+    """
+    try:
+        return os.path.samefile(str(first), str(second))
+    except OSError:
+        return False
+
+
+def atomic_hardlink(content: Path, target: Path) -> None:
+    """
+    Atomically replace target with hard link to content.
+
+    If hard links are not supported, for instance when `content` and `target`
+    are located on different filesystems, `content` is copied instead.
+
+    :param content: File to be linked to.
+    :param target: Path to hard link.
+    """
+    target = Path(os.path.realpath(target))
+    if same_file(content, target):
+        return
+
+    target.parent.mkdir(parents=True, exist_ok=True)
+    temp_link = target.parent / f'.{target.name}.{os.urandom(4).hex()}.tmp'
+    try:
+        os.link(str(content), str(temp_link))
+    except OSError as error:
+        logger.debug(
+            f'Could not hard link "{target}" to "{content}": {error}. '
+            'Copying instead.',
+        )
+        atomic_copy(content=content, target=target)
+        return
+
+    try:
+        os.replace(str(temp_link), str(target))
+    except OSError:
+        temp_link.unlink()
+        raise
+
+
+class DigestCache:
+    """
+    Persisted cache of file content digests.
+
+    Digests are stored together with the modification time and size of the
+    file they were computed from, and are only recomputed when either of
+    these have changed. Looking up the digest of an unchanged file therefore
+    only costs a single stat.
+
+    :param path: Path to JSON file used for persisting digests. If not
+        provided, ``$XDG_DATA_HOME/astrality/copy_digests.json`` is used.
+    """
+
+    _digests: Dict[str, List[Any]]
+
+    def __init__(self, path: Optional[Path] = None) -> None:
+        """Construct digest cache, deferring reading until first use."""
+        self._path = path
+        self._modified = False
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> Path:
+        """Return path to file persisting the digests."""
+        if self._path is None:
+            self._path = XDG().data_home / 'copy_digests.json'
+        return self._path
+
+    def digest(
+        self,
+        path: Path,
+        file_stat: Optional[os.stat_result] = None,
+    ) -> str:
+        """
+        Return hexadecimal SHA-256 digest of file content.
+
+        :param path: Path to file.
+        :param file_stat: Stat result of file, retrieved if not provided.
+        :return: Cached digest if the file is unchanged, else new digest.
+        """
+        file_stat = file_stat or path.stat()
+        key = str(path)
+        with self._lock:
+            cached = self._load().get(key)
+        if cached and cached[:2] == [file_stat.st_mtime_ns, file_stat.st_size]:
+            return cached[2]
+
+        sha256 = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for chunk in iter(partial(file.read, 2**20), b''):
+                sha256.update(chunk)
+
+        digest = sha256.hexdigest()
+        self.update(path=path, digest=digest, file_stat=file_stat)
+        return digest
+
+    def update(
+        self,
+        path: Path,
+        digest: str,
+        file_stat: Optional[os.stat_result] = None,
+    ) -> None:
+        """
+        Store known digest of file, for instance after having copied it.
+
+        :param path: Path to file.
+        :param digest: Digest of file content.
+        :param file_stat: Stat result of file, retrieved if not provided.
+        """
+        file_stat = file_stat or path.stat()
+        with self._lock:
+            self._load()[str(path)] = \
+                [file_stat.st_mtime_ns, file_stat.st_size, digest]
+            self._modified = True
+
+    def write(self) -> None:
+        """
+        Persist digests if any have been added since last write.
+
+        Digests of files which no longer exist, or which have been changed
+        since their digest was computed, are dropped before writing.
+        """
+        with self._lock:
+            if not self._modified:
+                return
+
+            for key, (mtime_ns, size, _) in list(self._digests.items()):
+                try:
+                    file_stat = os.stat(key)
+                except OSError:
+                    del self._digests[key]
+                    continue
+                if (file_stat.st_mtime_ns, file_stat.st_size) \
+                        != (mtime_ns, size):
+                    del self._digests[key]
+
+            with atomic_write(path=self.path) as digests_file:
+                json.dump(self._digests, digests_file)
+            self._modified = False
+
+    def _load(self) -> Dict[str, List[Any]]:
+        """Return digests, reading them from disk on first access."""
+        if not hasattr(self, '_digests'):
+            try:
+                with open(self.path) as digests_file:
+                    self._digests = json.load(digests_file)
+            except (OSError, ValueError):
+                self._digests = {}
+        return self._digests
+
+
+#: Digest cache shared by all copy actions
+digest_cache = DigestCache()
+
+
+# Permission bits affected by each user class in symbolic file modes
+_CLASS_BITS = {
+    'u': stat.S_ISUID | stat.S_IRWXU,
+    'g': stat.S_ISGID | stat.S_IRWXG,
+    'o': stat.S_ISVTX | stat.S_IRWXO,
+}
+_OCTAL_MODE = re.compile(r'[0-7]{1,4}')
+_SYMBOLIC_CLAUSE = re.compile(r'([ugoa]*)((?:[-+=](?:[ugo]|[rwxXst]*))+)')
+_SYMBOLIC_OPERATION = re.compile(r'([-+=])([ugo]|[rwxXst]*)')
+
+
+def parse_permissions(
+    permissions: str,
+    mode: int,
+    directory: bool = False,
+) -> int:
+    """
+    Return file mode resulting from applying chmod permissions to a mode.
+
+    Permissions are given either as octal digits, such as '755', or as comma
+    separated symbolic clauses, such as 'u+x,go-w' or 'a=r'. As with chmod, if
+    no user class is given in a clause, the bits set in the umask are left
+    unaffected.
+
+    :param permissions: Octal or symbolic permissions, as accepted by chmod.
+    :param mode: File mode which permissions are applied to.
+    :param directory: True if the file mode belongs to a directory.
+    :return: New file mode permission bits.
+    :raises ValueError: If permissions are invalid.
+    """
+    if _OCTAL_MODE.fullmatch(permissions):
+        return int(permissions, 8)
+
+    mode = stat.S_IMODE(mode)
+    for clause in permissions.split(','):
+        match = _SYMBOLIC_CLAUSE.fullmatch(clause)
+        if not match:
+            raise ValueError(f'Invalid file mode: "{permissions}"')
+
+        who, operations = match.groups()
+        if not who or 'a' in who:
+            affected = _CLASS_BITS['u'] | _CLASS_BITS['g'] | _CLASS_BITS['o']
+        else:
+            affected = sum(_CLASS_BITS[user_class] for user_class in set(who))
+        if not who:
+            affected &= ~_UMASK
+
+        for operator, perms in _SYMBOLIC_OPERATION.findall(operations):
+            bits = 0
+            if perms in ('u', 'g', 'o'):
+                # Copy permissions from other user class
+                shift = {'u': 6, 'g': 3, 'o': 0}[perms]
+                bits = ((mode >> shift) & 0o7) * 0o111
+            else:
+                for perm in perms:
+                    if perm == 'r':
+                        bits |= 0o444
+                    elif perm == 'w':
+                        bits |= 0o222
+                    elif perm == 'x':
+                        bits |= 0o111
+                    elif perm == 'X' and (directory or mode & 0o111):
+                        bits |= 0o111
+                    elif perm == 's':
+                        bits |= stat.S_ISUID | stat.S_ISGID
+                    elif perm == 't':
+                        bits |= stat.S_ISVTX
+
+            bits &= affected
+            if operator == '+':
+                mode |= bits
+            elif operator == '-':
+                mode &= ~bits
+            else:
+                mode = (mode & ~affected) | bits
+
+    return mode
+
+
+def chmod(path: Path, permissions: str) -> None:
+    """
+    Change file mode of path in the same way as the chmod shell command.
+
+    :param path: Path to file or directory.
+    :param permissions: Octal or symbolic permissions, see
+        :func:`parse_permissions`.
+    :raises ValueError: If permissions are invalid.
+    :raises OSError: If the file mode could not be changed.
+    """
+    current = os.stat(path)
+    mode = parse_permissions(
+        permissions=permissions,
+        mode=current.st_mode,
+        directory=stat.S_ISDIR(current.st_mode),
+    )
+    if mode != stat.S_IMODE(current.st_mode):
+        os.chmod(path, mode)
+
 
 T = TypeVar('T')
 
@@ -127,33 +606,201 @@ def resolve_targets(
     :param include: Regular expression string for filtering/renaming content.
     :return: Dictionary with content file keys and target file values.
     """
-    targets: Dict[Path, Path] = {}
-    if content.is_file():
-        if target.is_dir():
-            targets[content] = target / content.name
-        else:
-            targets[content] = target
+    return dict(iterate_targets(
+        content=content,
+        target=target,
+        include=include,
+    ))
 
-    else:
-        for file in content.glob('**/*'):
-            if file.is_dir():
-                continue
-            target_file = target / file.relative_to(content)
-            targets[file] = target_file
 
-    include_pattern = re.compile(include)
-    filtered_targets: Dict[Path, Path] = {}
-    for content_file, target_file in targets.items():
-        match = include_pattern.fullmatch(target_file.name)
+def iterate_targets(
+    content: Path,
+    target: Path,
+    include: str,
+) -> Iterator[Tuple[Path, Path]]:
+    """
+    Yield content/target file path pairs while walking `content`.
+
+    See :func:`resolve_targets` for the meaning of the parameters. Pairs are
+    yielded in the same order as by :func:`resolve_targets`, and the caller
+    can start processing pairs before the entire directory has been walked.
+
+    :return: Iterator of (content file, target file) tuples.
+    """
+    include_pattern = _include_pattern(include)
+    for content_file, name, target_directory in _candidates(content, target):
+        match = include_pattern.fullmatch(name)
         if not match:
             continue
 
         # If there is no group match, keep the name, else, use last group
-        renamed_target_file = target_file.parent \
-            / match.group(match.lastindex or 0)
-        filtered_targets[content_file] = renamed_target_file
+        yield (
+            Path(content_file),
+            target_directory / match.group(match.lastindex or 0),
+        )
+
+
+def resolve_target(
+    content_file: Path,
+    content: Path,
+    target: Path,
+    include: str,
+) -> Optional[Path]:
+    """
+    Return target path of a single content file, without walking `content`.
+
+    The result is equal to ``resolve_targets(content, target,
+    include).get(content_file)``, as long as `content_file` is a file.
+
+    :param content_file: File within `content`, or `content` itself.
+    :param content: Path to content, either directory or file.
+    :param target: Path to target, either directory or file.
+    :param include: Regular expression used to filter and rename files.
+    :return: Path to target file, or None if `content_file` is not included.
+    """
+    if content_file == content:
+        if target.is_dir():
+            target = target / content.name
+        name, target_directory = target.name, target.parent
+    else:
+        try:
+            relative_path = content_file.relative_to(content)
+        except ValueError:
+            return None
+        name = content_file.name
+        target_directory = target / relative_path.parent
+
+    match = _include_pattern(include).fullmatch(name)
+    if not match:
+        return None
+    return target_directory / match.group(match.lastindex or 0)
+
+
+def partition_targets(
+    content: Path,
+    target: Path,
+    includes: Sequence[str],
+) -> List[Dict[Path, Path]]:
+    """
+    Resolve targets for several include patterns with a single directory walk.
+
+    The result is equal to ``[resolve_targets(content, target, include) for
+    include in includes]``, but `content` is only walked once, each file
+    being matched against all the include patterns.
+
+    :param content: Path to content, either directory or file.
+    :param target: Path to target, either directory or file.
+    :param includes: Regular expressions used to partition content files.
+    :return: One dictionary of content/target file pairs per include pattern.
+    """
+    include_patterns = [_include_pattern(include) for include in includes]
+    partitions: List[Dict[Path, Path]] = [{} for _ in includes]
+    for content_file, name, target_directory in _candidates(content, target):
+        content_path = None
+        for include_pattern, partition in zip(include_patterns, partitions):
+            match = include_pattern.fullmatch(name)
+            if not match:
+                continue
+
+            content_path = content_path or Path(content_file)
+            partition[content_path] = \
+                target_directory / match.group(match.lastindex or 0)
+
+    return partitions
+
+
+def _candidates(
+    content: Path,
+    target: Path,
+) -> Iterator[Tuple[str, str, Path]]:
+    """
+    Yield all content files together with their unfiltered target locations.
+
+    :param content: Path to content, either directory or file.
+    :param target: Path to target, either directory or file.
+    :return: Iterator of (content file, target name, target directory) tuples.
+    """
+    if content.is_file():
+        if target.is_dir():
+            target = target / content.name
+        yield str(content), target.name, target.parent
+        return
+
+    for entry, target_directory in _walk(content=content, target=target):
+        yield entry.path, entry.name, target_directory
+
+
+@lru_cache(maxsize=128)
+def _include_pattern(include: str) -> Pattern:
+    """Return compiled include regular expression."""
+    return re.compile(include)
+
+
+def _walk(
+    content: Path,
+    target: Path,
+) -> Iterator[Tuple[os.DirEntry, Path]]:
+    """
+    Yield all files within directory, recursively.
+
+    Directories are walked depth first, yielding the files of each directory
+    before descending into its subdirectories. Symlinks to directories are
+    neither yielded nor followed, as is the case for ``content.glob('**/*')``.
+    Directories which can not be read are skipped.
+
+    :param content: Directory to be walked.
+    :param target: Target directory corresponding to `content`.
+    :return: Iterator of (file entry, target directory) tuples.
+    """
+    directories: List[Tuple[str, Path]] = [(str(content), target)]
+    while directories:
+        directory, target_directory = directories.pop()
+        try:
+            with os.scandir(directory) as entries:
+                subdirectories = []
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirectories.append(
+                            (entry.path, target_directory / entry.name),
+                        )
+                    elif not entry.is_dir():
+                        yield entry, target_directory
+        except OSError:
+            continue
+
+        # Reversed, such that subdirectories are popped in scandir order
+        directories.extend(reversed(subdirectories))
+
+
+# Delimiters of jinja2 blocks, variables, and comments
+_JINJA_SYNTAX = re.compile(rb'\{[{%#]')
+
+# Top-level keys of YAML mappings which can be located without parsing
+_TOP_LEVEL_KEY = re.compile(rb'([A-Za-z_][\w.-]*)[ \t]*:(?:[ \t]|\r?\n|$)')
+
+# Syntax which might make top-level YAML sections depend on each other, i.e.
+# jinja2 blocks and comments, YAML anchors and aliases, and document markers.
+_SECTION_DEPENDENCIES = re.compile(
+    rb'\{[%#]|(?:^|[\s\[{,])[&*][^\s\[\]{},]|^(?:---|\.\.\.)',
+    re.MULTILINE,
+)
+
+# Byte offset ranges of top-level sections within YAML files
+SectionIndex = Dict[str, Tuple[int, int]]
+
 
-    return filtered_targets
+class _CompiledYAML(NamedTuple):
+    """Cached result of compiling a YAML template, see compile_yaml()."""
+
+    modified: int
+    size: int
+    dependencies: Optional['compiler.TemplateDependencies']
+    data: Any
+
+
+_compiled_yaml: Dict[Tuple[Path, Optional[str]], _CompiledYAML] = {}
+_section_indices: Dict[Path, Tuple[int, int, Optional[SectionIndex]]] = {}
+_compiled_yaml_lock = threading.Lock()
 
 
 def compile_yaml(
@@ -163,21 +810,192 @@ def compile_yaml(
     """
     Return datastructure from compiled YAML jinja2 template.
 
+    Files without any jinja2 syntax are loaded directly, without being
+    compiled as templates.
+
+    Compilation results are cached by file path, modification time, and size,
+    together with the context values read by the template. Repeated
+    compilations of unchanged templates with unchanged context values are
+    therefore served from the cache, only requiring the template files to be
+    stat-ed. Templates using the shell filter are always recompiled.
+
+    :param path: YAML template file path.
+    :param context: Jinja2 context.
+    """
+    # The cached datastructure must not be modified by the caller
+    return copy.deepcopy(_compile_yaml(path=path, context=context))
+
+
+def compile_yaml_section(
+    path: Path,
+    section: str,
+    context: Context,
+) -> Any:
+    """
+    Return top-level section of datastructure from compiled YAML template.
+
+    Only the requested section is compiled and loaded, as long as the
+    sections of the file are independent of each other. Otherwise the entire
+    file is compiled, see :func:`compile_yaml`.
+
     :param path: YAML template file path.
+    :param section: Top-level key of the section.
     :param context: Jinja2 context.
+    :raises KeyError: If the file has no such section.
     """
-    if not path.is_file():  # pragma: no cover
+    return copy.deepcopy(
+        _compile_yaml(path=path, context=context, section=section),
+    )
+
+
+def _compile_yaml(
+    path: Path,
+    context: Context,
+    section: Optional[str] = None,
+) -> Any:
+    """Return cached compilation of YAML template, or section thereof."""
+    try:
+        file_stat = os.stat(path)
+    except OSError:  # pragma: no cover
+        file_stat = None
+
+    if file_stat is None or not stat.S_ISREG(file_stat.st_mode):
         error_msg = f'Could not load config file "{path}".'
         logger.critical(error_msg)
         raise FileNotFoundError(error_msg)
 
-    config_string = compiler.compile_template_to_string(
-        template=path,
-        context=context,
-        shell_command_working_directory=path.parent,
-    )
+    with _compiled_yaml_lock:
+        cached = _compiled_yaml.get((path, section))
+
+    template_known = False
+    if cached is not None \
+            and cached.modified == file_stat.st_mtime_ns \
+            and cached.size == file_stat.st_size:
+        if cached.dependencies is None \
+                or cached.dependencies.up_to_date(context):
+            logger.debug(
+                f'[compile_yaml] Using cached compilation of "{path}".',
+            )
+            return cached.data
+        template_known = True
+
+    content: Optional[bytes]
+    if section is not None:
+        index = _section_index(path=path, file_stat=file_stat)
+        if index is None or section not in index:
+            return _compile_yaml(path=path, context=context)[section]
+
+        start, end = index[section]
+        with open(path, 'rb') as yaml_file:
+            yaml_file.seek(start)
+            content = yaml_file.read(end - start)
+    elif template_known:
+        # No need to scan the file content for template syntax again
+        content = None
+    else:
+        with open(path, 'rb') as yaml_file:
+            content = yaml_file.read()
+
+    dependencies: Optional[compiler.TemplateDependencies]
+    if content is not None and not _JINJA_SYNTAX.search(content):
+        dependencies = None
+        data = load(content, Loader=Loader)
+    else:
+        dependencies = compiler.TemplateDependencies(
+            generation=(
+                context.generation if isinstance(context, Context) else None
+            ),
+        )
+        if section is None:
+            config_string = compiler.compile_template_to_string(
+                template=path,
+                context=context,
+                shell_command_working_directory=path.parent,
+                dependencies=dependencies,
+            )
+        else:
+            config_string = compiler.compile_source_to_string(
+                source=content.decode('utf-8'),  # type: ignore
+                templates_folder=path.parent,
+                context=context,
+                dependencies=dependencies,
+            )
+        data = load(StringIO(config_string), Loader=Loader)
+
+    if section is not None:
+        if not isinstance(data, dict) or list(data) != [section]:
+            # The key is not parsed as a plain string, or the section has
+            # been rendered into something else.
+            return _compile_yaml(path=path, context=context)[section]
+        data = data[section]
+
+    with _compiled_yaml_lock:
+        _compiled_yaml[(path, section)] = _CompiledYAML(
+            modified=file_stat.st_mtime_ns,
+            size=file_stat.st_size,
+            dependencies=dependencies,
+            data=data,
+        )
 
-    return load(StringIO(config_string), Loader=Loader)
+    return data
+
+
+def _section_index(
+    path: Path,
+    file_stat: os.stat_result,
+) -> Optional[SectionIndex]:
+    """
+    Return byte offset ranges of top-level sections in YAML file.
+
+    :param path: Path to YAML file.
+    :param file_stat: Result of stat-ing the file, used for caching.
+    :return: Dictionary with top-level keys and (start, end) offset values,
+        or None if the sections can not be compiled independently.
+    """
+    with _compiled_yaml_lock:
+        cached = _section_indices.get(path)
+    if cached is not None \
+            and cached[:2] == (file_stat.st_mtime_ns, file_stat.st_size):
+        return cached[2]
+
+    with open(path, 'rb') as yaml_file:
+        content = yaml_file.read()
+
+    index: Optional[SectionIndex] = {}
+    if _SECTION_DEPENDENCIES.search(content):
+        index = None
+
+    section: Optional[str] = None
+    start = position = 0
+    for line in content.splitlines(keepends=True):
+        if index is None:
+            break
+
+        if line[:1] not in b' \t\r\n#':
+            match = _TOP_LEVEL_KEY.match(line)
+            if not match:
+                # Not a top-level mapping key, such as flow style mappings,
+                # sequences, quoted keys, or multi-line scalars.
+                index = None
+                break
+
+            if section is not None:
+                index[section] = (start, position)
+            section = match.group(1).decode()
+            start = position
+
+        position += len(line)
+
+    if index is not None and section is not None:
+        index[section] = (start, position)
+
+    with _compiled_yaml_lock:
+        _section_indices[path] = (
+            file_stat.st_mtime_ns,
+            file_stat.st_size,
+            index,
+        )
+    return index
 
 
 def load_yaml(path: Path) -> Any:
@@ -199,7 +1017,7 @@ def dump_yaml(path: Path, data: Dict) -> None:
     :param data: Data to be dumped to file.
     """
     str_data = yaml_str(data)
-    with open(path, 'w') as yaml_file:
+    with atomic_write(path=path, mode='w') as yaml_file:
         yaml_file.write(str_data)
 
 
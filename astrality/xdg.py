@@ -45,3 +45,14 @@ class XDG:
         resource_path.parent.mkdir(parents=True, exist_ok=True)
         resource_path.touch(exist_ok=True)
         return resource_path
+
+    def data_directory(self, resource: str) -> Path:
+        """
+        Return directory resource of application.
+
+        :param resource: Relative string path, i.e. $XDG_DATA_HOME/<resource>.
+        :return: Path to created data directory.
+        """
+        resource_path = self.data_home / resource
+        resource_path.mkdir(parents=True, exist_ok=True)
+        return resource_path